@@ -2,6 +2,10 @@
 ASGI config for Qtime project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Async views (the live availability stream at available-times/stream/ and
+the availability, catalog and profile reads) run on the event loop here;
+serve it with an ASGI server, e.g. ``uvicorn Qtime.asgi:application``.
+``manage.py bench_async_reads`` compares the two entry points.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +16,15 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Qtime.settings')
+# Run the async read views on the event loop (Qtime/async_views.py).
+os.environ.setdefault('QTIME_ASYNC_API_VIEWS', '1')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.OPENAPI_SCHEMA_BUILD_ON_STARTUP:
+    from Qtime.schema import get_artifact  # noqa: E402
+
+    # Load (or build once per code version) the OpenAPI schema before serving.
+    get_artifact()
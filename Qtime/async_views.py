@@ -0,0 +1,91 @@
+"""
+Async request handling for DRF views, for the ASGI entry point.
+
+DRF's request pipeline is synchronous. With ``settings.ASYNC_API_VIEWS``
+on (Qtime/asgi.py turns it on), AsyncAPIViewMixin makes a view's
+``dispatch()`` a coroutine:
+
+- the sync-only steps (authentication, permissions, throttling and the
+  conditional GET check, all in ``initial()``) run in a worker thread via
+  sync_to_async, so a JWT user lookup never blocks the event loop;
+- a handler's async counterpart (``aget`` for ``get``, or ``alist`` for a
+  viewset's ``list`` action) runs on the event loop and awaits the async
+  ORM and cache; handlers without one (e.g. writes) run in a worker thread.
+
+Under ASGI a request then only holds a thread while a query actually runs,
+instead of for its whole lifetime. Under WSGI the setting is off and the
+view is a plain DRF view running its sync handlers, with no event loop
+spun up per request.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.functional import classproperty
+
+
+class AsyncAPIViewMixin:
+    """
+    Serve an APIView or ViewSet asynchronously under ASGI. Place it directly
+    before the DRF base class, after mixins that wrap ``dispatch()``. Views
+    keep sync handlers for WSGI and add ``a``-prefixed async ones.
+    """
+
+    @classproperty
+    def view_is_async(cls) -> bool:
+        # Read when the URLconf builds the view.
+        return settings.ASYNC_API_VIEWS
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        view = super().as_view(*args, **kwargs)
+        # ViewSets build a plain function around dispatch(); mark it so
+        # Django awaits the coroutine it returns.
+        if cls.view_is_async and not iscoroutinefunction(view):
+            markcoroutinefunction(view)
+        return view
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_async_handler(self, request):
+        """
+        The async counterpart of the handler for this request, if the view has one.
+        """
+        name = getattr(self, 'action', None) or request.method.lower()
+        handler = getattr(self, f"a{name}", None)
+        return handler if iscoroutinefunction(handler) else None
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+                async_handler = self.get_async_handler(request)
+            else:
+                handler, async_handler = self.http_method_not_allowed, None
+
+            if async_handler is not None:
+                response = await async_handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def apaginate_queryset(self, queryset):
+        """
+        Async counterpart of ``paginate_queryset()``.
+        """
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
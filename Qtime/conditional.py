@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+class NotModified(Exception):
+    """
+    Short-circuits a view once the request's validators match.
+    """
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for read endpoints.
+
+    Views implement ``get_conditional_validators(request)`` and return an
+    ``(etag, last_modified)`` pair computed without loading the rows they
+    serve (a change counter, a timestamp already in memory, ...). The check
+    runs after authentication and permissions, so a 304 never leaks
+    anything, and before the handler, so it costs no row fetches.
+    """
+
+    def get_conditional_validators(self, request) -> tuple[str | None, datetime | None]:
+        raise NotImplementedError
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_etag, self.conditional_last_modified = None, None
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        etag, last_modified = self.get_conditional_validators(request)
+        self.conditional_etag = quote_etag(etag) if etag else None
+        self.conditional_last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(
+            request,
+            etag=self.conditional_etag,
+            last_modified=self.conditional_last_modified,
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if getattr(self, 'conditional_etag', None):
+                response.headers['ETag'] = self.conditional_etag
+            if getattr(self, 'conditional_last_modified', None):
+                response.headers['Last-Modified'] = http_date(self.conditional_last_modified)
+        return response
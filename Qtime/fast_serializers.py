@@ -0,0 +1,148 @@
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from Qtime.renderers import FastJSONRenderer
+from Qtime.sparse_fields import check_fields, requested_fields
+
+# Fields whose to_representation() returns database values (str, int, bool) unchanged.
+IDENTITY_FIELDS = (serializers.BooleanField, serializers.CharField, serializers.IntegerField, serializers.ReadOnlyField)
+
+
+class FastListSerializer:
+    """
+    Read-only fast path for the list output of a ModelSerializer.
+
+    Each readable field is compiled once into an ORM lookup plus a converter
+    (the field's own ``to_representation``, or nothing where that would
+    return the database value unchanged). Rows are then fetched as flat
+    tuples with ``values_list`` and turned into dicts by index, skipping
+    model instantiation and per-row field traversal while producing exactly
+    what the serializer would.
+
+    With ``fields`` only those output fields are compiled, so the joins and
+    columns of the others are never part of the query.
+
+    Only plain and dotted model-field sources and primary key related
+    fields are supported; anything else raises ImproperlyConfigured.
+    """
+
+    def __init__(self, serializer_class: type[serializers.ModelSerializer], fields=None) -> None:
+        model = serializer_class.Meta.model
+        declared = serializer_class().fields
+        if fields is not None:
+            check_fields(fields, declared)
+
+        self.lookups, plan = [], []
+        for name, field in declared.items():
+            if field.write_only or isinstance(field, serializers.HiddenField):
+                continue
+            if fields is not None and name not in fields:
+                continue
+            lookup = self._lookup(model, field)
+            if lookup not in self.lookups:
+                self.lookups.append(lookup)
+            plan.append((name, self.lookups.index(lookup), self._converter(field)))
+        self.plan = tuple(plan)
+
+    @staticmethod
+    def _lookup(model, field) -> str:
+        if field.source == '*' or isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+            raise ImproperlyConfigured(f"{field.field_name}: only model field sources are supported.")
+
+        path = field.source.split('.')
+        current = model
+        for index, part in enumerate(path):
+            try:
+                model_field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(f"{field.field_name}: {field.source!r} is not a model field path.")
+            if model_field.is_relation and index < len(path) - 1:
+                current = model_field.related_model
+        return '__'.join(path)
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                return field.pk_field.to_representation
+            return None  # values_list already yields the related id
+        if isinstance(field, (serializers.RelatedField, serializers.FileField)):
+            raise ImproperlyConfigured(f"{field.field_name}: {type(field).__name__} is not supported.")
+        if isinstance(field, IDENTITY_FIELDS):
+            return None
+        return field.to_representation
+
+    def prepare(self, queryset: QuerySet, extra=()) -> QuerySet:
+        """
+        Narrow the queryset to the compiled lookups (plus ``extra`` ones,
+        e.g. pagination ordering) as named tuples.
+        """
+        lookups = self.lookups + [lookup for lookup in extra if lookup not in self.lookups]
+        return queryset.values_list(*lookups, named=True)
+
+    def to_representation(self, rows) -> list[dict]:
+        plan = self.plan
+        data = []
+        for row in rows:
+            item = {}
+            for name, index, convert in plan:
+                value = row[index]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+
+@lru_cache(maxsize=256)
+def get_fast_serializer(serializer_class: type[serializers.ModelSerializer], fields: frozenset | None = None) -> FastListSerializer:
+    """
+    Compiled FastListSerializer for a serializer class and ``?fields=`` set.
+    Bounded, since the field sets come from the query string.
+    """
+    return FastListSerializer(serializer_class, fields)
+
+
+class FastListMixin:
+    """
+    Serve ``list()`` through FastListSerializer and FastJSONRenderer.
+    Filtering, pagination and ``?fields=`` work as before; the response
+    bytes are the same.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get_fast_serializer(self) -> FastListSerializer:
+        fields = requested_fields(self.request)
+        return get_fast_serializer(self.get_serializer_class(), frozenset(fields) if fields else None)
+
+    def get_fast_rows(self, queryset) -> QuerySet:
+        ordering = getattr(self.paginator, 'ordering', ())
+        return self.get_fast_serializer().prepare(queryset, extra=[field.lstrip('-') for field in ordering])
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_serializer()
+        rows = self.get_fast_rows(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.to_representation(page))
+        return Response(fast.to_representation(rows))
+
+    async def alist(self, request, *args, **kwargs):
+        """
+        ``list()`` for async views (see Qtime/async_views.py): the page is
+        read with the async ORM.
+        """
+        fast = self.get_fast_serializer()
+        # django-filter validates (and looks up) filter values synchronously.
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        rows = self.get_fast_rows(queryset)
+
+        page = await self.apaginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.to_representation(page))
+        return Response(fast.to_representation([row async for row in rows]))
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import has_vary_header, patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used without it
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/vnd.oai.openapi',
+    'text/',
+)
+
+# Compressors buffer output; events must reach the client as they are written.
+UNCOMPRESSED_TYPES = (
+    'text/event-stream',
+)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress text and JSON responses of at least RESPONSE_COMPRESSION_MIN_BYTES.
+
+    Brotli is preferred when the client accepts it and the ``brotli`` package
+    is installed; otherwise Django's gzip handling (including streaming
+    responses and BREACH padding) applies. Responses tied to cookies (session,
+    CSRF) always get gzip, since brotli output cannot be padded against
+    BREACH. Small bodies are sent as they are, since compressing them costs
+    more CPU than it saves on the wire.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith(UNCOMPRESSED_TYPES):
+            return response
+        if not response.streaming and len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (
+            brotli is not None
+            and not response.streaming
+            and not response.has_header('Content-Encoding')
+            and not response.cookies
+            and not has_vary_header(response, 'Cookie')
+            and re_accepts_brotli.search(accept_encoding)
+        ):
+            return self._brotli(response)
+        return super().process_response(request, response)
+
+    def _brotli(self, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=settings.RESPONSE_COMPRESSION_BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
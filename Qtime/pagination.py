@@ -0,0 +1,176 @@
+import base64
+import json
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (seek) pagination.
+
+    Rows are ordered by ``ordering`` (which must end in a unique field) and each
+    page continues strictly after the last row of the previous one, so the
+    database walks an index instead of counting an OFFSET, and rows inserted
+    mid-scan never shift or repeat items on later pages.
+
+    Plain sequences (e.g. computed rows) are paginated the same way in memory.
+    Querysets may order by ``-field`` to page newest first; sequences are
+    always ascending.
+    """
+    ordering: tuple = ('start_time', 'id')
+    # None: API_PAGE_SIZE / API_MAX_PAGE_SIZE, read per request.
+    page_size: int | None = None
+    max_page_size: int | None = None
+    page_size_query_param: str = 'page_size'
+    cursor_query_param: str = 'cursor'
+    invalid_cursor_message: str = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.seek(queryset, request)
+        if isinstance(page, QuerySet):
+            page = list(page)
+        return self.finish_page(page)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Same as ``paginate_queryset()``, reading the page with the async ORM.
+        """
+        page = self.seek(queryset, request)
+        if isinstance(page, QuerySet):
+            page = [row async for row in page]
+        return self.finish_page(page)
+
+    def seek(self, queryset, request):
+        """
+        Narrow ``queryset`` to the rows of the requested page plus one (to
+        tell whether a next page exists), without reading it.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.order_by(*self.ordering)
+            if position is not None:
+                queryset = queryset.filter(self.after(self.parse_position(position, queryset.model)))
+            return queryset[:self.page_size + 1]
+
+        rows = sorted(queryset, key=self.sort_key)
+        if position is not None and rows:
+            cursor_key = tuple(self.parse_position(position, type(rows[0])))
+            rows = [row for row in rows if self.sort_key(row) > cursor_key]
+        return rows[:self.page_size + 1]
+
+    def finish_page(self, rows: list) -> list:
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.position_of(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request) -> int:
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size or settings.API_PAGE_SIZE
+        return max(1, min(requested, self.max_page_size or settings.API_MAX_PAGE_SIZE))
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def after(self, position: list) -> Q:
+        """
+        Lexicographic "strictly after" condition over the ordering fields.
+        """
+        fields = [field.lstrip('-') for field in self.ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt' for field in self.ordering]
+        return reduce(or_, (
+            Q(**dict(zip(fields[:index], position[:index])), **{f"{fields[index]}__{lookups[index]}": position[index]})
+            for index in range(len(fields))
+        ))
+
+    def parse_position(self, position: list, model) -> list:
+        """
+        Convert the cursor values with the model fields they come from;
+        anything they do not accept is an invalid cursor.
+        """
+        values = []
+        try:
+            for field, value in zip(self.ordering, position):
+                value = self._model_field(model, field.lstrip('-')).to_python(value)
+                if value is None:
+                    raise ValueError(field)
+                if isinstance(value, datetime) and timezone.is_naive(value):
+                    value = timezone.make_aware(value)
+                values.append(value)
+        except (DjangoValidationError, ValueError, TypeError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _model_field(model, path: str):
+        *relations, name = path.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def sort_key(self, instance) -> tuple:
+        if hasattr(instance, '_fields'):
+            # values_list(named=True) rows carry the lookups as attribute names.
+            return tuple(getattr(instance, field.lstrip('-')) for field in self.ordering)
+        key = []
+        for field in self.ordering:
+            value = instance
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            key.append(value)
+        return tuple(key)
+
+    def position_of(self, instance) -> list:
+        return [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in self.sort_key(instance)
+        ]
+
+    def encode_cursor(self, position: list) -> str:
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request) -> list | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
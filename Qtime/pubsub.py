@@ -0,0 +1,136 @@
+"""
+Publish/subscribe for pushing live updates to connected clients.
+
+Publishers are ordinary (sync) request and worker code; subscribers are
+async consumers, e.g. a Server-Sent Events response running on the ASGI
+event loop. The broker in use is ``settings.PUBSUB_BROKER`` (a dotted path
+to a Broker subclass). InMemoryBroker delivers within the current process
+only, which suits a single ASGI worker and tests; a multi-process
+deployment plugs in a broker backed by e.g. Redis pub/sub with the same
+interface.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Queued in place of further messages once a subscriber falls behind; the
+# consumer should tell its client to reload instead of missing updates.
+OVERFLOW = object()
+
+
+class Subscription:
+    """
+    One consumer's queue on a channel. Iterate it (async) to receive messages;
+    ``close()`` unsubscribes.
+    """
+
+    def __init__(self, broker: 'Broker', channel: str, max_queued: int) -> None:
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued + 1)
+        self.overflowed = False
+
+    def deliver(self, message) -> None:
+        """
+        Hand a message over from any thread.
+        """
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:  # event loop closed
+            self.close()
+
+    def _put(self, message) -> None:
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.queue.maxsize - 1:
+            self.overflowed = True
+            message = OVERFLOW
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Interface of a pub/sub broker.
+    """
+
+    def subscribe(self, channel: str) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        raise NotImplementedError
+
+    def publish(self, channel: str, message) -> None:
+        raise NotImplementedError
+
+    def has_subscribers(self, channel: str) -> bool:
+        """
+        Whether publishing to ``channel`` can reach anyone. Publishers use
+        it to skip building messages nobody listens to; brokers that cannot
+        tell keep the default.
+        """
+        return True
+
+
+class InMemoryBroker(Broker):
+    """
+    Process-local broker: subscribers are asyncio queues, publishing is
+    thread-safe and never blocks.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel, settings.PUBSUB_MAX_QUEUED_MESSAGES)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel: str, message) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def has_subscribers(self, channel: str) -> bool:
+        return channel in self._subscribers
+
+
+@lru_cache(maxsize=1)
+def get_broker() -> Broker:
+    return import_string(settings.PUBSUB_BROKER)()
+
+
+def publish_on_commit(channel: str, message) -> None:
+    """
+    Publish once the current transaction commits (right away outside one),
+    so subscribers never see a change that is rolled back.
+    """
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a block of code runs more SQL queries than it is allowed to.
+    """
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block", using: str = 'default'):
+    """
+    Fail if the wrapped block runs more than ``max_queries`` queries.
+
+        with query_budget(4, "available times"):
+            client.get("/api/available-times/")
+
+    The error lists every captured query, so a new lazy relation shows up as
+    the repeated SELECT it causes.
+    """
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+
+    if len(captured) > max_queries:
+        queries = "\n".join(f"  {n}. {q['sql']}" for n, q in enumerate(captured.captured_queries, start=1))
+        raise QueryBudgetExceeded(
+            f"{label} ran {len(captured)} queries, budget is {max_queries}:\n{queries}"
+        )
+
+
+class QueryBudgetMixin:
+    """
+    Declare how many queries a view may run per HTTP method, e.g.
+    ``query_budget = {'GET': 4}``. Budgets are independent of row count, so a
+    serializer that starts touching an unloaded relation breaks them on the
+    first page with more than a handful of rows.
+
+    Enforced when ``settings.QUERY_BUDGET_ENFORCE`` is true (development and
+    test runs); otherwise the view runs untouched.
+    """
+    query_budget: dict[str, int] = {}
+
+    def get_query_budget(self, request) -> int | None:
+        return self.query_budget.get(request.method)
+
+    def dispatch(self, request, *args, **kwargs):
+        budget = self.get_query_budget(request)
+        if budget is None or not settings.QUERY_BUDGET_ENFORCE:
+            return super().dispatch(request, *args, **kwargs)
+
+        label = f"{request.method} {type(self).__name__}"
+        if self.view_is_async:
+            return self._adispatch_within_budget(budget, label, request, *args, **kwargs)
+        with query_budget(budget, label=label):
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch_within_budget(self, budget, label, request, *args, **kwargs):
+        # The sync steps and async ORM calls of one request share a worker
+        # thread (thread-sensitive sync_to_async), so queries are counted
+        # on that thread's connection.
+        budget_context = query_budget(budget, label=label)
+        await sync_to_async(budget_context.__enter__)()
+        try:
+            response = await super().dispatch(request, *args, **kwargs)
+        except BaseException as exc:
+            await sync_to_async(budget_context.__exit__)(type(exc), exc, exc.__traceback__)
+            raise
+        await sync_to_async(budget_context.__exit__)(None, None, None)
+        return response
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin for list endpoints. ``assertBudgetHolds()`` GETs the URL
+    with a real JWT (so the user lookup counts) after seeding ``budget_rows``
+    and then ten times as many rows, and checks that both requests stay
+    within the view's budget and run the same number of queries.
+
+    Budgets are only checked with ``QUERY_BUDGET_ENFORCE`` on, so decorate
+    the test class with ``@override_settings(QUERY_BUDGET_ENFORCE=True)``;
+    the project's test runner (Qtime/test_runner.py) turns it on for the
+    other tests as well.
+    """
+    budget_rows: int = 3
+
+    def assertBudgetHolds(self, view_class, url: str, user, seed, params=None) -> None:
+        """
+        ``seed(count)`` adds ``count`` more rows of whatever the endpoint lists.
+        """
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        headers = {'Authorization': f"Bearer {AccessToken.for_user(user)}"}
+        budget = view_class.query_budget['GET']
+        counts, seeded = [], 0
+        for rows in (self.budget_rows, 10 * self.budget_rows):
+            seed(rows - seeded)
+            seeded = rows
+            # Worst case: every cached part is rebuilt.
+            cache.clear()
+            with query_budget(budget, label=f"GET {url}") as captured:
+                response = self.client.get(url, params, headers=headers)
+            self.assertEqual(response.status_code, 200, response.content)
+            counts.append(len(captured))
+        self.assertEqual(counts[0], counts[1], f"GET {url} runs more queries for more rows")
@@ -0,0 +1,42 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # optional; the stock renderer is used without it
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Only used where its output is byte-identical to JSONRenderer's with the
+    default settings (compact, unicode, strict, no indent). Types orjson
+    would format differently (datetimes, decimals, lazy strings, ...) go
+    through DRF's encoder, and anything orjson rejects falls back to
+    JSONRenderer. Floats in exponent form are written differently
+    (``1e16`` vs ``1e+16``), so keep it to endpoints that carry none.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self._compatible(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            rendered = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these for JavaScript compatibility.
+        return rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+    def _compatible(self, accepted_media_type, renderer_context) -> bool:
+        return (
+            self.compact and not self.ensure_ascii and self.strict
+            and self.get_indent(accepted_media_type, renderer_context or {}) is None
+            and api_settings.COMPACT_JSON and api_settings.UNICODE_JSON and api_settings.STRICT_JSON
+        )
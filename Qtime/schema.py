@@ -0,0 +1,162 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from importlib import import_module
+from pathlib import Path
+
+import drf_spectacular
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+from Qtime.conditional import ConditionalGetMixin
+
+SKIPPED_DIRS = {'__pycache__', 'migrations', 'static', 'media', 'node_modules'}
+
+
+@dataclass(frozen=True)
+class SchemaArtifact:
+    """
+    The rendered OpenAPI schema of one code version.
+    """
+    version: str
+    generated_at: datetime
+    yaml: bytes
+    json: bytes
+
+    def body(self, schema_format: str) -> bytes:
+        return self.json if schema_format == 'json' else self.yaml
+
+
+def _source_dirs() -> list[Path]:
+    """
+    The project package and the installed apps that live under BASE_DIR;
+    virtualenvs and site-packages next to them are never walked.
+    """
+    base_dir = Path(settings.BASE_DIR).resolve()
+    project = Path(import_module(settings.ROOT_URLCONF).__file__).resolve().parent
+    dirs = {project, *(Path(config.path).resolve() for config in apps.get_app_configs())}
+    return sorted(path for path in dirs if path.is_relative_to(base_dir))
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """
+    OPENAPI_SCHEMA_CODE_VERSION if set (e.g. the deployed commit), else a
+    digest of the project's Python sources and schema settings. Computed
+    once per process.
+    """
+    if settings.OPENAPI_SCHEMA_CODE_VERSION:
+        return settings.OPENAPI_SCHEMA_CODE_VERSION
+
+    digest = hashlib.sha256()
+    base_dir = Path(settings.BASE_DIR).resolve()
+    for directory in _source_dirs():
+        for path in sorted(directory.rglob('*.py')):
+            relative = path.relative_to(base_dir)
+            if any(part in SKIPPED_DIRS or part.startswith('.') for part in relative.parts[:-1]):
+                continue
+            digest.update(str(relative).encode())
+            digest.update(path.read_bytes())
+    digest.update(drf_spectacular.__version__.encode())
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode())
+    return digest.hexdigest()[:16]
+
+
+def _paths(version: str) -> dict[str, Path]:
+    directory = Path(settings.OPENAPI_SCHEMA_DIR)
+    return {schema_format: directory / f"openapi-{version}.{schema_format}" for schema_format in ('yaml', 'json')}
+
+
+def build_artifact(version: str | None = None) -> SchemaArtifact:
+    """
+    Generate the schema, write it to OPENAPI_SCHEMA_DIR and drop the files
+    of other versions.
+    """
+    version = version or code_version()
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(urlconf=spectacular_settings.SERVE_URLCONF)
+    schema = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    bodies = {
+        'yaml': OpenApiYamlRenderer().render(schema, renderer_context={}),
+        'json': OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+    paths = _paths(version)
+    directory = Path(settings.OPENAPI_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    for schema_format, path in paths.items():
+        temporary = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+        temporary.write_bytes(bodies[schema_format])
+        os.replace(temporary, path)
+    for stale in directory.glob('openapi-*.*'):
+        if stale not in paths.values() and not stale.name.endswith('.tmp'):
+            stale.unlink(missing_ok=True)
+
+    return _load(version)
+
+
+def _load(version: str) -> SchemaArtifact | None:
+    paths = _paths(version)
+    try:
+        bodies = {schema_format: path.read_bytes() for schema_format, path in paths.items()}
+        generated_at = datetime.fromtimestamp(paths['yaml'].stat().st_mtime, tz=timezone.utc)
+    except FileNotFoundError:
+        return None
+    return SchemaArtifact(version, generated_at, bodies['yaml'], bodies['json'])
+
+
+_lock = threading.Lock()
+_current: SchemaArtifact | None = None
+
+
+def get_artifact() -> SchemaArtifact:
+    """
+    The artifact for the running code version: from memory, else from disk,
+    else generated once (per process, at most) and written to disk.
+    """
+    global _current
+    version = code_version()
+    if _current is not None and _current.version == version:
+        return _current
+    with _lock:
+        if _current is None or _current.version != version:
+            _current = _load(version) or build_artifact(version)
+    return _current
+
+
+class CachedSpectacularAPIView(ConditionalGetMixin, SpectacularAPIView):
+    """
+    SpectacularAPIView served from the prebuilt artifact as static bytes,
+    with the code version as ETag. Requests for a specific ``?lang=`` or
+    ``?version=`` still generate the schema live.
+    """
+
+    def _is_live(self, request) -> bool:
+        return bool(
+            self.custom_settings or self.api_version or self.urlconf != spectacular_settings.SERVE_URLCONF
+            or request.GET.get('lang') or request.GET.get('version')
+        )
+
+    def get_conditional_validators(self, request):
+        if self._is_live(request):
+            return None, None
+        artifact = get_artifact()
+        return f"{artifact.version}-{request.accepted_renderer.format}", artifact.generated_at
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if self._is_live(request):
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        content_type = f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type
+        response = HttpResponse(get_artifact().body(renderer.format), content_type=content_type)
+        response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        return response
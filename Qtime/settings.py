@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,11 +47,25 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Keyset pagination for list endpoints (see Qtime/pagination.py)
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 500
+
+# Fail requests that exceed a view's declared query_budget (see Qtime/query_budget.py);
+# always on in test runs
+QUERY_BUDGET_ENFORCE = DEBUG
+TEST_RUNNER = 'Qtime.test_runner.TestRunner'
+
+# Serve AsyncAPIViewMixin views on the event loop (see Qtime/async_views.py);
+# Qtime/asgi.py turns it on, WSGI keeps plain sync views
+ASYNC_API_VIEWS = os.environ.get('QTIME_ASYNC_API_VIEWS', '') == '1'
+
 
 
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'Qtime.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,15 +106,24 @@ DATABASES = {
 }
 
 
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django_redis.cache.RedisCache",
-#         "LOCATION": "redis://127.0.0.1:6379/1",
-#         "OPTIONS": {
-#             "CLIENT_CLASS": "django_redis.client.DefaultClient",
-#         }
-#     }
-# }
+# Change counters (Qtime/versioning.py), slot holds and OTP rate limits only
+# work if every worker sees the same cache. Set QTIME_REDIS_URL (e.g.
+# redis://127.0.0.1:6379/1) whenever more than one process serves requests;
+# without it each process has its own LocMemCache and `check --deploy` warns.
+CACHE_REDIS_URL = os.environ.get('QTIME_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
 
 
 # User model
@@ -160,3 +184,90 @@ OTP_LOGIN_ENABLED = False  # Set to True to enable OTP login
 # # OTP Rate Limiting
 OTP_CODE_TTL_SECONDS = 180  # 3 minutes
 OTP_RATE_LIMIT_SECONDS = 180
+
+
+# How many weeks ahead generate_slots fills from schedule templates
+SCHEDULE_GENERATION_WEEKS = 4
+
+# Where AvailableTimeListView reads free slots from:
+# 'rows'    - materialized AvailableTime rows
+# 'virtual' - computed on request from schedule templates minus booked slots (needs numpy)
+AVAILABILITY_MODE = 'rows'
+AVAILABILITY_VIRTUAL_MAX_DAYS = 31
+
+# Alternative slots offered when the requested one is taken
+SUGGESTION_LIMIT = 5
+SUGGESTION_MAX_LIMIT = 20
+
+# Upper bound on slots booked in one batch request
+BATCH_BOOKING_MAX_ITEMS = 20
+
+# Short-lived checkout holds on slots (kept in the cache)
+SLOT_HOLD_SECONDS = 120
+SLOT_HOLD_MAX_SECONDS = 600
+
+# Free slot counts per day/hour; invalidated per day on change, TTL is a safety net
+AVAILABILITY_CALENDAR_MAX_DAYS = 62
+AVAILABILITY_CALENDAR_CACHE_SECONDS = 60 * 60 * 24
+
+# Rendered branch/service catalogs; invalidated by version bump on every write
+CATALOG_CACHE_SECONDS = 60 * 60 * 24
+
+# Streaming appointment exports fetch this many rows per database round trip
+APPOINTMENT_EXPORT_CHUNK_SIZE = 2000
+
+# iCalendar feeds per provider/user; invalidated by version bump when their appointments change
+CALENDAR_FEED_CACHE_SECONDS = 60 * 60 * 24
+CALENDAR_FEED_PAST_DAYS = 30
+
+# Compress JSON/text responses from this size on (brotli if installed, else gzip)
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+RESPONSE_COMPRESSION_BROTLI_QUALITY = 5
+
+# Prebuilt OpenAPI schema (see Qtime/schema.py); rebuilt when the code version changes.
+# Set QTIME_CODE_VERSION (e.g. the deployed commit) to skip hashing the sources.
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'var' / 'openapi'
+OPENAPI_SCHEMA_CODE_VERSION = os.environ.get('QTIME_CODE_VERSION', '')
+OPENAPI_SCHEMA_BUILD_ON_STARTUP = True
+
+# Notification outbox (see notifications/services/outbox.py), drained by `manage.py dispatch_notifications`
+NOTIFICATION_CHANNELS = ('in_app', 'sms')
+NOTIFICATION_DISPATCH_BATCH_SIZE = 100
+NOTIFICATION_DISPATCH_LEASE_SECONDS = 300
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BASE_SECONDS = 30
+NOTIFICATION_RETRY_MAX_SECONDS = 60 * 60
+
+# Appointment reminders (see notifications/services/reminders.py), run by `manage.py send_reminders`.
+# Lead times in minutes; services and branches can override them.
+APPOINTMENT_REMINDER_LEAD_MINUTES = (24 * 60, 120)
+REMINDER_SWEEP_SECONDS = 60
+REMINDER_LOOKAHEAD_SECONDS = 5 * 60
+REMINDER_GRACE_SECONDS = 15 * 60
+
+# Notification inbox: cached unread counters are adjusted in place; TTL is a safety net
+NOTIFICATION_UNREAD_CACHE_SECONDS = 60 * 60 * 24
+NOTIFICATION_RETENTION_DAYS = 90
+
+# Live availability over Server-Sent Events (ASGI only). The in-memory broker
+# reaches subscribers of the same process; swap it for a shared one to run several.
+PUBSUB_BROKER = 'Qtime.pubsub.InMemoryBroker'
+PUBSUB_MAX_QUEUED_MESSAGES = 256
+LIVE_SLOTS_KEEPALIVE_SECONDS = 15
+LIVE_SLOTS_MAX_SECONDS = 5 * 60
+LIVE_SLOTS_RETRY_MS = 3000
+
+# Outgoing SMS (see accounts/services/sms.py). OTP codes are queued in-process and
+# sent by SMS_QUEUE_WORKERS threads (0 sends inline); HTTPBackend reads the SMS_HTTP_* settings.
+SMS_BACKEND = 'accounts.services.sms.ConsoleBackend'
+SMS_HTTP_URL = os.environ.get('SMS_HTTP_URL', '')
+SMS_HTTP_API_KEY = os.environ.get('SMS_HTTP_API_KEY', '')
+SMS_HTTP_SENDER = os.environ.get('SMS_HTTP_SENDER', '')
+SMS_HTTP_TIMEOUT_SECONDS = 5
+SMS_HTTP_POOL_SIZE = 4
+SMS_HTTP_BATCH_SIZE = 50
+SMS_QUEUE_MAX_SIZE = 1000
+SMS_QUEUE_WORKERS = 4
+SMS_MAX_ATTEMPTS = 4
+SMS_RETRY_BASE_SECONDS = 0.5
+SMS_RETRY_MAX_SECONDS = 10
@@ -0,0 +1,86 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_QUERY_PARAM = 'fields'
+
+
+def requested_fields(request) -> tuple[str, ...] | None:
+    """
+    Field names asked for with ``?fields=a,b`` on a read request, in request
+    order without duplicates. None means "all fields".
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    raw = request.query_params.get(FIELDS_QUERY_PARAM, '')
+    names = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    return names or None
+
+
+def check_fields(fields, available) -> None:
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ValidationError({FIELDS_QUERY_PARAM: [f"Unknown field(s): {', '.join(unknown)}."]})
+
+
+def relations_for(serializer_class, fields=None) -> set:
+    """
+    select_related paths the (kept) fields of a serializer read through.
+    """
+    relations = set()
+    for name, field in serializer_class().fields.items():
+        if fields is not None and name not in fields:
+            continue
+        path = field.source.split('.')[:-1] if field.source != '*' else []
+        for depth in range(1, len(path) + 1):
+            relations.add('__'.join(path[:depth]))
+    return relations
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for ``?fields=id,start_time``: on read requests only
+    the named fields are kept. Pass ``fields=`` explicitly to override the
+    query parameter. Writes always see every field.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            fields = requested_fields(self.context.get('request'))
+        if fields is None:
+            return
+        check_fields(fields, self.fields)
+        for name in list(self.fields):
+            if name not in fields:
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin that drops select_related joins the requested fields don't need.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = requested_fields(self.request)
+        joins = queryset.query.select_related
+        if fields is None or not isinstance(joins, dict):
+            return queryset
+
+        serializer_class = self.get_serializer_class()
+        check_fields(fields, serializer_class().fields)
+        needed = relations_for(serializer_class, fields)
+        kept = [path for path in _paths(joins) if path in needed]
+        queryset = queryset.select_related(None)
+        # select_related() with no arguments would follow every relation.
+        return queryset.select_related(*kept) if kept else queryset
+
+
+def _paths(joins: dict, prefix: str = '') -> list[str]:
+    paths = []
+    for name, nested in joins.items():
+        path = f"{prefix}{name}"
+        paths.append(path)
+        paths.extend(_paths(nested, f"{path}__"))
+    return paths
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Run tests with view query budgets enforced (see Qtime/query_budget.py).
+    Django forces DEBUG = False for tests, which would otherwise turn them off.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_ENFORCE = True
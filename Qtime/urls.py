@@ -5,7 +5,8 @@ from rest_framework_simplejwt.views import (
 )
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+from Qtime.schema import CachedSpectacularAPIView
 
 
 
@@ -15,6 +16,7 @@ urlpatterns = [
     # API apps
     path('api/', include('appointments.urls')),
     path('api/', include('branches.urls')),
+    path('api/', include('notifications.urls')),
     path('api/accounts', include('accounts.urls')),
 
     # JWT authentication
@@ -22,7 +24,8 @@ urlpatterns = [
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     # Schema / Documentation
-    path('schema/', SpectacularAPIView.as_view(), name="schema"),
+    # Served from the prebuilt artifact; Swagger and Redoc load it through this URL
+    path('schema/', CachedSpectacularAPIView.as_view(), name="schema"),
     path('swagger/', SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     path('redoc/', SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
 ]
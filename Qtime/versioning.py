@@ -0,0 +1,100 @@
+import time
+
+from django.core.cache import cache
+
+
+def get_version_key(scope: str) -> str:
+    """
+    Construct cache key for the change counter of a scope.
+    """
+    return f"version:{scope}"
+
+
+def get_modified_key(scope: str) -> str:
+    """
+    Construct cache key for the last change time (epoch seconds) of a scope.
+    """
+    return f"version:{scope}:modified"
+
+
+def new_version() -> int:
+    """
+    Starting value of a counter that is missing from the cache.
+
+    Counters live in the cache and can be evicted. Restarting at a fixed
+    number would hand out versions again whose entries may still be cached;
+    the current time in microseconds is above anything issued before, as
+    long as a scope is bumped less than once per microsecond.
+    """
+    return time.time_ns() // 1000
+
+
+def get_version(scope: str) -> int:
+    """
+    Current change counter of a scope.
+    """
+    key = get_version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        seed = new_version()
+        cache.add(key, seed, timeout=None)
+        version = cache.get(key, seed)
+    return version
+
+
+async def aget_version(scope: str) -> int:
+    """
+    Async counterpart of ``get_version()``.
+    """
+    key = get_version_key(scope)
+    version = await cache.aget(key)
+    if version is None:
+        seed = new_version()
+        await cache.aadd(key, seed, timeout=None)
+        version = await cache.aget(key, seed)
+    return version
+
+
+def get_versions(scopes) -> dict[str, int]:
+    """
+    Change counters of many scopes in one cache round trip (two if some are missing).
+    """
+    keys = {get_version_key(scope): scope for scope in scopes}
+    values = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in values]
+    if missing:
+        seed = new_version()
+        for key in missing:
+            cache.add(key, seed, timeout=None)
+        added = cache.get_many(missing)
+        values.update({key: added.get(key, seed) for key in missing})
+    return {keys[key]: version for key, version in values.items()}
+
+
+def get_state(scope: str) -> tuple[int, float]:
+    """
+    Change counter and last change time of a scope in one cache round trip.
+    """
+    version_key, modified_key = get_version_key(scope), get_modified_key(scope)
+    values = cache.get_many([version_key, modified_key])
+    if version_key not in values:
+        seed = new_version()
+        cache.add(version_key, seed, timeout=None)
+        cache.add(modified_key, time.time(), timeout=None)
+        values = cache.get_many([version_key, modified_key])
+        values.setdefault(version_key, seed)
+    return values[version_key], values.get(modified_key, 0.0)
+
+
+def bump_version(scope: str) -> None:
+    """
+    Record a change in a scope. Anything keyed by the old version (cache
+    entries, ETags) is invalidated in O(1) across all workers that share
+    the cache (see CACHES in settings).
+    """
+    key = get_version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), timeout=None)
+    cache.set(get_modified_key(scope), time.time(), timeout=None)
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Qtime.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.OPENAPI_SCHEMA_BUILD_ON_STARTUP:
+    from Qtime.schema import get_artifact  # noqa: E402
+
+    # Load (or build once per code version) the OpenAPI schema before serving.
+    get_artifact()
@@ -119,6 +119,11 @@ class User(AbstractBaseUser, PermissionsMixin):
         blank=True
     )
 
+    updated_at: models.DateTimeField = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Updated at")
+    )
+
     objects: UserManager = UserManager()
 
     USERNAME_FIELD: str = 'phone'
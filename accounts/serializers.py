@@ -1,10 +1,11 @@
 from rest_framework import serializers
+from Qtime.sparse_fields import SparseFieldsetMixin
 from django.utils.translation import gettext_lazy as _
 from .models import User
 from accounts.models import phone_validator
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for viewing and partially updating the authenticated user's profile.
     """
@@ -1,7 +1,320 @@
+"""
+Outgoing SMS.
+
+The provider is reached through a pluggable backend, ``settings.SMS_BACKEND``
+(a dotted path to an SMSBackend subclass):
+
+- ConsoleBackend prints messages (development).
+- LocMemBackend keeps them in ``LocMemBackend.outbox`` (tests); it can be
+  told to fail a number of sends to exercise retries.
+- HTTPBackend posts JSON to ``settings.SMS_HTTP_URL`` over a pool of
+  keep-alive connections, up to SMS_HTTP_BATCH_SIZE messages per request.
+
+``send_sms()`` sends right away and raises on failure; the notification
+outbox uses it and retries on its own. OTP codes go through ``enqueue_sms()``
+instead: SMSQueue is a bounded in-process queue drained by worker threads,
+which batch waiting messages and retry transient failures with backoff, so
+a request only waits for the code to be queued, not for the provider.
+"""
+import http.client
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext as _
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SMSMessage:
+    phone: str
+    text: str
+
+
+class SMSError(Exception):
+    """
+    The provider rejected a send; retrying will not help.
+    """
+
+
+class TransientSMSError(SMSError):
+    """
+    A send failed in a way that may succeed later (timeout, 5xx, rate limit).
+    """
+
+
+class SMSQueueFull(SMSError):
+    """
+    The send queue is at SMS_QUEUE_MAX_SIZE; the provider is not keeping up.
+    """
+
+
+class SMSBackend:
+    """
+    Interface of an SMS provider.
+    """
+    # Messages the provider accepts in one call.
+    max_batch_size: int = 1
+
+    def send_messages(self, messages: list[SMSMessage]) -> None:
+        """
+        Send all ``messages`` or raise SMSError (TransientSMSError if worth retrying).
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class ConsoleBackend(SMSBackend):
+    max_batch_size = 100
+
+    def send_messages(self, messages: list[SMSMessage]) -> None:
+        for message in messages:
+            print(f"[DEBUG] Sending SMS to phone {message.phone}: {message.text}")
+
+
+class LocMemBackend(SMSBackend):
+    """
+    Fake provider: records messages instead of sending them.
+    """
+    max_batch_size = 100
+    outbox: list[SMSMessage] = []
+    # Raise TransientSMSError for this many upcoming sends.
+    failures: int = 0
+
+    def send_messages(self, messages: list[SMSMessage]) -> None:
+        with _locmem_lock:
+            if LocMemBackend.failures > 0:
+                LocMemBackend.failures -= 1
+                raise TransientSMSError("Simulated provider failure.")
+            LocMemBackend.outbox.extend(messages)
+
+
+_locmem_lock = threading.Lock()
+
+
+class HTTPConnectionPool:
+    """
+    Keep-alive connections to one host, reused across threads. A request on
+    a reused connection that the server has meanwhile closed is retried once
+    on a fresh one.
+    """
+
+    def __init__(self, url: str, size: int, timeout: float) -> None:
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host, self.port = parts.hostname, parts.port
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        return self.connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: bytes, headers: dict) -> tuple[int, bytes]:
+        try:
+            connection, reused = self._idle.get_nowait(), True
+        except queue.Empty:
+            connection, reused = self._connect(), False
+
+        while True:
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if not reused:
+                    raise
+                connection, reused = self._connect(), False
+            except Exception:
+                connection.close()
+                raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            try:
+                self._idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        return response.status, data
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HTTPBackend(SMSBackend):
+    """
+    JSON over HTTP(S): ``{"sender": ..., "messages": [{"to": ..., "text": ...}]}``
+    with a bearer API key. 429 and 5xx responses are transient; other
+    non-2xx responses are rejections.
+    """
+
+    def __init__(self) -> None:
+        self.url = urlsplit(settings.SMS_HTTP_URL)
+        self.max_batch_size = settings.SMS_HTTP_BATCH_SIZE
+        self.pool = HTTPConnectionPool(
+            settings.SMS_HTTP_URL, settings.SMS_HTTP_POOL_SIZE, settings.SMS_HTTP_TIMEOUT_SECONDS
+        )
+
+    def send_messages(self, messages: list[SMSMessage]) -> None:
+        body = json.dumps({
+            'sender': settings.SMS_HTTP_SENDER,
+            'messages': [{'to': message.phone, 'text': message.text} for message in messages],
+        }).encode()
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f"Bearer {settings.SMS_HTTP_API_KEY}",
+        }
+        try:
+            status, data = self.pool.request('POST', self.url.path or '/', body, headers)
+        except (OSError, http.client.HTTPException) as exc:
+            raise TransientSMSError(f"{type(exc).__name__}: {exc}") from exc
+
+        if status == 429 or status >= 500:
+            raise TransientSMSError(f"Provider answered {status}.")
+        if not 200 <= status < 300:
+            raise SMSError(f"Provider answered {status}: {data[:200]!r}")
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+@lru_cache(maxsize=1)
+def get_backend() -> SMSBackend:
+    return import_string(settings.SMS_BACKEND)()
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Seconds to wait after the given number of failed attempts: exponential, capped, with jitter.
+    """
+    delay = min(settings.SMS_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.SMS_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1)
+
+
+def send_batch(messages: list[SMSMessage], backend: SMSBackend | None = None) -> bool:
+    """
+    Send ``messages`` with up to SMS_MAX_ATTEMPTS tries. Returns whether they were sent.
+    """
+    backend = backend or get_backend()
+    for attempt in range(1, settings.SMS_MAX_ATTEMPTS + 1):
+        try:
+            backend.send_messages(messages)
+            return True
+        except TransientSMSError as exc:
+            if attempt == settings.SMS_MAX_ATTEMPTS:
+                logger.error("Giving up on %d SMS after %d attempts: %s", len(messages), attempt, exc)
+                return False
+            time.sleep(retry_delay(attempt))
+        except SMSError as exc:
+            logger.error("SMS to %s rejected: %s", ", ".join(message.phone for message in messages), exc)
+            return False
+
+
+class SMSQueue:
+    """
+    Bounded queue of outgoing messages, drained by daemon worker threads
+    started on first use (and again in a forked child). Each worker takes
+    the next message plus whatever else is waiting, up to the backend's
+    batch size, and sends them in one call.
+    """
+
+    def __init__(self, max_size: int, workers: int) -> None:
+        self.workers = workers
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def put(self, message: SMSMessage) -> None:
+        """
+        Queue a message; raises SMSQueueFull instead of blocking.
+        """
+        self._start()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            raise SMSQueueFull("SMS queue is full.") from None
+
+    def join(self) -> None:
+        """
+        Block until every queued message was sent or given up on.
+        """
+        self._queue.join()
+
+    def _start(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            for n in range(self.workers):
+                threading.Thread(target=self._work, name=f"sms-worker-{n}", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _work(self) -> None:
+        backend = get_backend()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < backend.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                send_batch(batch, backend)
+            except Exception:
+                logger.exception("Unexpected error sending %d SMS.", len(batch))
+            finally:
+                for _message in batch:
+                    self._queue.task_done()
+
+
+@lru_cache(maxsize=1)
+def get_queue() -> SMSQueue:
+    return SMSQueue(settings.SMS_QUEUE_MAX_SIZE, settings.SMS_QUEUE_WORKERS)
+
+
+def enqueue_sms(phone: str, message: str) -> None:
+    """
+    Hand a message to the send queue and return right away. With
+    SMS_QUEUE_WORKERS = 0 it is sent in the calling thread instead.
+    Raises SMSQueueFull when the queue is full.
+    """
+    sms = SMSMessage(phone, str(message))
+    if not settings.SMS_QUEUE_WORKERS:
+        send_batch([sms])
+        return
+    get_queue().put(sms)
+
+
 def send_otp_sms(phone: str, code: str) -> None:
     """
-    Send OTP via SMS using provider (placeholder).
-    Replace this with actual SMS provider API.
+    Queue the OTP code for delivery; see ``enqueue_sms()``.
+    """
+    # Rendered here: translation is activated per thread, not in the workers.
+    enqueue_sms(phone, _("Your verification code is {code}").format(code=code))
+
+
+def send_sms(phone: str, message: str) -> None:
+    """
+    Send a text message right away with the configured backend.
+    Raise on failure so callers can retry.
     """
-    print(f"[DEBUG] Sending OTP {code} to phone {phone}")
-    # TODO: Integrate with actual SMS provider here.
\ No newline at end of file
+    get_backend().send_messages([SMSMessage(phone, message)])
@@ -1,3 +1,161 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts import views
+from accounts.models import User
+from accounts.services import sms
+from accounts.utils.otp import get_otp_code, is_rate_limited
+from notifications.models import Notification
+from Qtime.query_budget import QueryBudgetTestMixin
+
+
+@override_settings(QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone='09120000001', full_name="Ali")
+
+    def seed(self, count):
+        # Rows hanging off the user must not be read for the profile.
+        Notification.objects.bulk_create(Notification(user=self.user, message="Hi") for _ in range(count))
+
+    def test_profile(self):
+        self.assertBudgetHolds(views.UserProfileView, '/api/accounts', self.user, self.seed)
+
+
+class ProfileConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone='09120000001', full_name="Ali")
+        self.other = User.objects.create_user(phone='09120000002', full_name="Sara")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_matching_etag_is_304(self):
+        etag = self.client.get('/api/accounts')['ETag']
+
+        response = self.client.get('/api/accounts', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get('/api/accounts')['ETag']
+        self.client.force_authenticate(self.other)
+
+        response = self.client.get('/api/accounts', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['full_name'], "Sara")
+
+    def test_profile_update_changes_etag(self):
+        etag = self.client.get('/api/accounts')['ETag']
+        self.client.patch('/api/accounts', {'full_name': "Ali Reza"}, format='json')
+        self.user.refresh_from_db()
+
+        response = self.client.get('/api/accounts', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['full_name'], "Ali Reza")
+
+
+class GatedBackend(sms.LocMemBackend):
+    """
+    LocMemBackend that records batch sizes and holds every send until ``gate`` is set.
+    """
+    max_batch_size = 3
+    batches: list[int] = []
+    sending = threading.Event()
+    gate = threading.Event()
+
+    def send_messages(self, messages):
+        GatedBackend.sending.set()
+        GatedBackend.gate.wait(timeout=5)
+        GatedBackend.batches.append(len(messages))
+        super().send_messages(messages)
+
+
+@override_settings(
+    SMS_BACKEND='accounts.services.sms.LocMemBackend',
+    SMS_QUEUE_WORKERS=1,
+    SMS_QUEUE_MAX_SIZE=10,
+    SMS_MAX_ATTEMPTS=3,
+    SMS_RETRY_BASE_SECONDS=0,
+    OTP_LOGIN_ENABLED=True,
+)
+class SMSTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for cached in (sms.get_backend, sms.get_queue):
+            cached.cache_clear()
+            self.addCleanup(cached.cache_clear)
+        sms.LocMemBackend.outbox, sms.LocMemBackend.failures = [], 0
+        GatedBackend.batches = []
+        GatedBackend.sending.clear()
+        GatedBackend.gate.clear()
+        # A test failing with the gate closed must not leave workers stuck.
+        self.addCleanup(GatedBackend.gate.set)
+
+    def request_otp(self, phone='09120000001'):
+        return self.client.post('/api/accountsotp/request/', {'phone': phone}, content_type='application/json')
+
+    def test_otp_is_queued_and_sent(self):
+        self.assertEqual(self.request_otp().status_code, 200)
+        sms.get_queue().join()
+
+        code = get_otp_code('09120000001')
+        self.assertEqual(
+            sms.LocMemBackend.outbox, [sms.SMSMessage('09120000001', f"Your verification code is {code}")]
+        )
+
+    @override_settings(SMS_BACKEND='accounts.tests.GatedBackend')
+    def test_waiting_messages_are_sent_in_batches(self):
+        queue = sms.get_queue()
+        queue.put(sms.SMSMessage('09120000001', "1"))
+        self.assertTrue(GatedBackend.sending.wait(timeout=5))
+        for n in range(2, 6):
+            queue.put(sms.SMSMessage('09120000001', str(n)))
+
+        GatedBackend.gate.set()
+        queue.join()
+
+        self.assertEqual(GatedBackend.batches, [1, 3, 1])
+        self.assertEqual([message.text for message in sms.LocMemBackend.outbox], ["1", "2", "3", "4", "5"])
+
+    def test_transient_failures_are_retried_with_backoff(self):
+        sms.LocMemBackend.failures = 2
+        with mock.patch('accounts.services.sms.time.sleep') as sleep:
+            self.assertTrue(sms.send_batch([sms.SMSMessage('09120000001', "Hi")]))
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(len(sms.LocMemBackend.outbox), 1)
+
+        sms.LocMemBackend.failures = 3
+        with mock.patch('accounts.services.sms.time.sleep'), self.assertLogs('accounts.services.sms', 'ERROR'):
+            self.assertFalse(sms.send_batch([sms.SMSMessage('09120000001', "Hi")]))
+        self.assertEqual(len(sms.LocMemBackend.outbox), 1)
+
+    @override_settings(SMS_RETRY_BASE_SECONDS=1, SMS_RETRY_MAX_SECONDS=3)
+    def test_retry_delay_is_exponential_capped_and_jittered(self):
+        for attempts, (low, high) in {1: (0.5, 1), 2: (1, 2), 3: (1.5, 3), 6: (1.5, 3)}.items():
+            with self.subTest(attempts=attempts):
+                self.assertTrue(low <= sms.retry_delay(attempts) <= high)
+
+    @override_settings(SMS_BACKEND='accounts.tests.GatedBackend', SMS_QUEUE_MAX_SIZE=1)
+    def test_full_queue_answers_503(self):
+        queue = sms.get_queue()
+        queue.put(sms.SMSMessage('09120000002', "held by the worker"))
+        self.assertTrue(GatedBackend.sending.wait(timeout=5))
+        queue.put(sms.SMSMessage('09120000003', "fills the queue"))
+
+        response = self.request_otp()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIsNone(get_otp_code('09120000001'))
+        self.assertFalse(is_rate_limited('09120000001'))
+        GatedBackend.gate.set()
+        queue.join()
+        self.assertEqual(self.request_otp().status_code, 200)
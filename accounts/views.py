@@ -15,10 +15,13 @@ from accounts.utils.otp import (
     is_rate_limited,
     set_rate_limit
 )
-from accounts.services.sms import send_otp_sms
+from accounts.services.sms import SMSQueueFull, send_otp_sms
 from accounts.models import User
+from Qtime.async_views import AsyncAPIViewMixin
+from Qtime.conditional import ConditionalGetMixin
+from Qtime.query_budget import QueryBudgetMixin
 """============END OTP imports==========="""
-class UserProfileView(APIView):
+class UserProfileView(ConditionalGetMixin, QueryBudgetMixin, AsyncAPIViewMixin, APIView):
     """
     View for retrieving and updating the authenticated user's profile.
 
@@ -27,14 +30,25 @@ class UserProfileView(APIView):
     """
 
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 1}
+
+    def get_conditional_validators(self, request):
+        # The user row is already loaded by authentication.
+        user = request.user
+        return f"user-{user.pk}-{user.updated_at.timestamp()}", user.updated_at
 
     def get(self, request):
         """
         Return the profile data of the authenticated user.
         """
-        serializer = UserProfileSerializer(request.user)
+        serializer = UserProfileSerializer(request.user, context={'request': request})
         return Response(serializer.data)
 
+    async def aget(self, request):
+        # The user row was loaded by authentication, off the event loop;
+        # serializing it runs no queries.
+        return self.get(request)
+
     def patch(self, request):
         """
         Partially update the profile of the authenticated user.
@@ -88,8 +102,13 @@ class OTPRequestView(APIView):
 
         code = generate_otp_code()
         set_otp_code(phone, code)
+        try:
+            # Only queued here; worker threads talk to the provider.
+            send_otp_sms(phone, code)
+        except SMSQueueFull:
+            delete_otp_code(phone)
+            return Response({"detail": _("Could not send the code right now, please try again.")}, status=503)
         set_rate_limit(phone)
-        send_otp_sms(phone, code)
 
         return Response({"detail": _("OTP code sent successfully.")}, status=200)
 
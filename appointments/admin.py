@@ -1,11 +1,20 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
-from .models import Appointment, AvailableTime
+from django.conf import settings
+from django.utils import timezone
+from notifications.models import OutboxEvent
+from notifications.services import outbox
+from .models import Appointment, AvailableTime, ScheduleException, ScheduleTemplate
+from .services.schedule import generate_slots
 
 
 @admin.action(description=_("Confirm selected appointments"))
 def confirm_appointments(modeladmin, request, queryset):
-    updated = queryset.update(is_confirmed=True)
+    with transaction.atomic():
+        newly_confirmed = list(queryset.filter(is_confirmed=False).select_for_update())
+        updated = queryset.update(is_confirmed=True)
+        outbox.record(OutboxEvent.CONFIRMED, newly_confirmed)
     modeladmin.message_user(request, _("%d appointment(s) confirmed." % updated))
 
 
@@ -32,3 +41,31 @@ class AppointmentAdmin(admin.ModelAdmin):
     @admin.display(description=_("Branch"))
     def branch(self, obj):
         return obj.available_time.branch.name
+
+
+@admin.action(description=_("Generate slots for the selected templates"))
+def generate_template_slots(modeladmin, request, queryset):
+    created = generate_slots(
+        timezone.localdate(),
+        settings.SCHEDULE_GENERATION_WEEKS,
+        templates=queryset.filter(is_active=True)
+    )
+    modeladmin.message_user(request, _("%d slot(s) generated.") % created)
+
+
+@admin.register(ScheduleTemplate)
+class ScheduleTemplateAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'service', 'branch', 'weekday', 'start_time', 'end_time', 'is_active')
+    list_filter = ('is_active', 'weekday', 'branch', 'service')
+    search_fields = ('provider__phone', 'provider__full_name')
+    list_select_related = ('provider', 'service', 'branch')
+    actions = [generate_template_slots]
+
+
+@admin.register(ScheduleException)
+class ScheduleExceptionAdmin(admin.ModelAdmin):
+    list_display = ('date', 'provider', 'branch', 'start_time', 'end_time', 'reason')
+    list_filter = ('branch',)
+    search_fields = ('provider__phone', 'reason')
+    list_select_related = ('provider', 'branch')
+    date_hierarchy = 'date'
@@ -1,5 +1,5 @@
 import django_filters
-from .models import AvailableTime
+from .models import Appointment, AvailableTime
 
 class AvailableTimeFilter(django_filters.FilterSet):
     """
@@ -11,3 +11,18 @@ class AvailableTimeFilter(django_filters.FilterSet):
     class Meta:
         model = AvailableTime
         fields = ['branch', 'provider', 'service', 'start', 'end']
+
+
+class AppointmentFilter(django_filters.FilterSet):
+    """
+    Filter for Appointment based on the slot's provider, branch, service, and start time range.
+    """
+    provider = django_filters.NumberFilter(field_name="available_time__provider")
+    branch = django_filters.NumberFilter(field_name="available_time__branch")
+    service = django_filters.NumberFilter(field_name="available_time__service")
+    start = django_filters.IsoDateTimeFilter(field_name="available_time__start_time", lookup_expr='gte')
+    end = django_filters.IsoDateTimeFilter(field_name="available_time__start_time", lookup_expr='lte')
+
+    class Meta:
+        model = Appointment
+        fields = ['provider', 'branch', 'service', 'is_confirmed', 'start', 'end']
@@ -0,0 +1,172 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+
+DEFAULT_PATHS = ['/api/available-times/', '/api/branches/', '/api/services/', '/api/accounts']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the read endpoints served by the WSGI handler on a fixed thread pool "
+        "(like a threaded WSGI server) with the ASGI handler on one event loop, under "
+        "many concurrent connections. Runs in-process, without network overhead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', help="Repeatable; defaults to the read endpoints.")
+        parser.add_argument('--connections', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--wsgi-workers', type=int, default=8)
+        parser.add_argument('--db-latency-ms', type=float, default=0.0,
+                            help="Added to every query, to model a database across the network.")
+        parser.add_argument('--host', default='localhost', help="Must be allowed by ALLOWED_HOSTS.")
+        parser.add_argument('--mode', choices=('wsgi', 'asgi', 'both'), default='both')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(role='user', is_active=True).first()
+        if user is None:
+            raise CommandError("At least one regular user is required.")
+
+        self.paths = options['paths'] or DEFAULT_PATHS
+        self.host = options['host']
+        self.authorization = f"Bearer {AccessToken.for_user(user)}"
+        latency = options['db_latency_ms'] / 1000
+
+        def add_latency(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def on_connection_created(sender, connection, **kwargs):
+            connection.execute_wrappers.append(add_latency)
+
+        modes = ('wsgi', 'asgi') if options['mode'] == 'both' else (options['mode'],)
+        if 'asgi' in modes and not settings.ASYNC_API_VIEWS:
+            self.stdout.write(self.style.WARNING(
+                "ASYNC_API_VIEWS is off, so ASGI runs the views in worker threads; "
+                "set QTIME_ASYNC_API_VIEWS=1 to measure the async path."
+            ))
+        if 'wsgi' in modes and settings.ASYNC_API_VIEWS:
+            self.stdout.write(self.style.WARNING("ASYNC_API_VIEWS is on, so WSGI runs the views through async_to_sync."))
+
+        if latency:
+            connection_created.connect(on_connection_created)
+        try:
+            # Budgets capture every query; measure the views, not the checks.
+            with override_settings(QUERY_BUDGET_ENFORCE=False):
+                for mode in modes:
+                    latencies, errors, elapsed = asyncio.run(
+                        self._run(mode, options['connections'], options['requests'], options['wsgi_workers'])
+                    )
+                    self._report(mode, latencies, errors, elapsed)
+        finally:
+            connection_created.disconnect(on_connection_created)
+
+    async def _run(self, mode, connections, total, wsgi_workers):
+        if mode == 'wsgi':
+            handler, executor = WSGIHandler(), ThreadPoolExecutor(max_workers=wsgi_workers)
+            request = lambda path: self._wsgi_request(handler, executor, path)
+        else:
+            handler, executor = ASGIHandler(), None
+            request = lambda path: self._asgi_request(handler, path)
+
+        latencies, errors = [], []
+        issued = iter(range(total))
+
+        async def client():
+            for n in issued:
+                started = time.perf_counter()
+                try:
+                    status = await request(self.paths[n % len(self.paths)])
+                except Exception as exc:
+                    errors.append(exc)
+                    continue
+                if status != 200:
+                    errors.append(status)
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        # Warm up code paths and caches before timing.
+        for path in self.paths:
+            await request(path)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(connections)))
+        elapsed = time.perf_counter() - started
+        if executor is not None:
+            executor.shutdown()
+        return latencies, errors, elapsed
+
+    def _report(self, mode, latencies, errors, elapsed):
+        if len(latencies) < 2:
+            raise CommandError(f"{mode}: no successful requests, e.g. {errors[0]!r}.")
+        cuts = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{mode}: requests={len(latencies)} errors={len(errors)} rps={len(latencies) / elapsed:.0f} "
+            f"p50={cuts[49] * 1000:.1f}ms p99={cuts[98] * 1000:.1f}ms"
+        )
+
+    async def _wsgi_request(self, handler, executor, path):
+        def call():
+            url = urlsplit(path)
+            environ = RequestFactory().get(url.path, QUERY_STRING=url.query, HTTP_HOST=self.host,
+                                           HTTP_AUTHORIZATION=self.authorization).environ
+            status = []
+            response = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+            return int(status[0].split()[0])
+
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    async def _asgi_request(self, handler, path):
+        url = urlsplit(path)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': url.path,
+            'raw_path': url.path.encode(),
+            'query_string': url.query.encode(),
+            'root_path': '',
+            'headers': [(b'host', self.host.encode()), (b'authorization', self.authorization.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': (self.host, 80),
+        }
+        finished = asyncio.Event()
+        status = []
+        messages = iter([{'type': 'http.request', 'body': b'', 'more_body': False}])
+
+        async def receive():
+            message = next(messages, None)
+            if message is not None:
+                return message
+            # The client stays connected until the whole response arrived.
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                finished.set()
+
+        await handler(scope, receive, send)
+        finished.set()
+        return status[0]
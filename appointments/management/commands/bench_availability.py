@@ -0,0 +1,81 @@
+import random
+import time
+from datetime import datetime, time as clock, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from appointments.models import AvailableTime, ScheduleTemplate
+from appointments.services.availability import free_slot_starts
+from appointments.services.schedule import generate_slots
+from branches.models import Branch, Service
+
+SLOTS_PER_DAY = 60  # 08:00-18:00 in 10 minute slots
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare row-based and virtual availability on synthetic data. "
+        "Everything is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slots', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=28)
+        parser.add_argument('--booked-ratio', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        days = options['days']
+        providers = max(1, options['slots'] // (SLOTS_PER_DAY * days))
+
+        with transaction.atomic():
+            self._run(providers, days, options['booked_ratio'])
+            transaction.set_rollback(True)
+
+    def _run(self, provider_count, days, booked_ratio):
+        branch = Branch.objects.create(name="Benchmark branch")
+        service = Service.objects.create(name="Benchmark service", duration_minutes=10, price=0)
+        providers = User.objects.bulk_create(
+            User(phone=f"09{n:09d}", role='provider') for n in range(provider_count)
+        )
+        ScheduleTemplate.objects.bulk_create(
+            ScheduleTemplate(
+                provider=provider, service=service, branch=branch,
+                weekday=weekday, start_time=clock(8), end_time=clock(18)
+            )
+            for provider in providers
+            for weekday in range(7)
+        )
+
+        start_date = timezone.localdate() + timedelta(days=1)
+        lower = timezone.make_aware(datetime.combine(start_date, clock.min))
+        upper = lower + timedelta(days=days)
+
+        started = time.perf_counter()
+        materialized = generate_slots(start_date, (days + 6) // 7)
+        materialize_elapsed = time.perf_counter() - started
+
+        slot_ids = list(AvailableTime.objects.values_list('pk', flat=True))
+        booked = random.Random(0).sample(slot_ids, int(len(slot_ids) * booked_ratio))
+        for offset in range(0, len(booked), 50_000):
+            AvailableTime.objects.filter(pk__in=booked[offset:offset + 50_000]).update(is_booked=True)
+
+        started = time.perf_counter()
+        row_free = list(
+            AvailableTime.objects.filter(
+                branch=branch, service=service, is_booked=False,
+                start_time__gte=lower, start_time__lte=upper
+            ).values_list('provider_id', 'start_time')
+        )
+        rows_elapsed = time.perf_counter() - started
+
+        templates = ScheduleTemplate.objects.filter(branch=branch, service=service).select_related('service')
+        started = time.perf_counter()
+        virtual_free = sum(len(starts) for _, starts in free_slot_starts(templates, lower, upper))
+        virtual_elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"providers={provider_count} days={days} slots={materialized} booked={len(booked)}")
+        self.stdout.write(f"rows:    materialize={materialize_elapsed:.2f}s query={rows_elapsed:.2f}s free={len(row_free)}")
+        self.stdout.write(f"virtual: compute={virtual_elapsed:.2f}s free={virtual_free} (no slot rows stored)")
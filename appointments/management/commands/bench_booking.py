@@ -0,0 +1,74 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.models import User
+from appointments.models import Appointment, AvailableTime
+from appointments.services import occupancy
+from appointments.services.booking import SlotUnavailable, booking_engine
+
+
+class Command(BaseCommand):
+    help = "Hammer a single slot from concurrent workers and report won/lost bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slot_id', type=int, help="AvailableTime id to contend on.")
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--rounds', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            slot = AvailableTime.objects.get(pk=options['slot_id'])
+        except AvailableTime.DoesNotExist:
+            raise CommandError("Slot does not exist.")
+
+        users = list(User.objects.filter(role='user')[:options['workers']])
+        if not users:
+            raise CommandError("At least one regular user is required.")
+
+        booking_engine.reset_stats()
+        errors = []
+        started = time.perf_counter()
+
+        for _ in range(options['rounds']):
+            Appointment.objects.filter(available_time=slot).delete()
+            AvailableTime.objects.filter(pk=slot.pk).update(is_booked=False)
+            # Also clear bits left behind by a crashed or pre-occupancy round.
+            occupancy.release(slot.provider_id, slot.start_time, slot.duration_minutes)
+
+            barrier = threading.Barrier(options['workers'])
+            threads = [
+                threading.Thread(
+                    target=self._attempt,
+                    args=(users[i % len(users)], slot.pk, barrier, errors)
+                )
+                for i in range(options['workers'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.perf_counter() - started
+        stats = booking_engine.stats()
+
+        self.stdout.write(
+            f"succeeded={stats.succeeded} lost_race={stats.lost_race} errors={len(errors)} "
+            f"attempts/s={stats.attempts / elapsed:.1f} elapsed={elapsed:.2f}s"
+        )
+        if stats.succeeded > options['rounds']:
+            raise CommandError("Slot was double-booked.")
+
+    @staticmethod
+    def _attempt(user, slot_id, barrier, errors):
+        try:
+            barrier.wait()
+            booking_engine.book(user, slot_id)
+        except SlotUnavailable:
+            pass
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
@@ -0,0 +1,69 @@
+import time
+from datetime import datetime, time as clock, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from appointments.models import AvailableTime
+from appointments.serializers import AvailableTimeSerializer
+from branches.models import Branch, Service
+from Qtime.fast_serializers import FastListSerializer
+from Qtime.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ModelSerializer + JSONRenderer with the values_list fast path on "
+        "synthetic slots. Everything is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(options['rows'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def _run(self, rows, repeat):
+        branch = Branch.objects.create(name="Benchmark branch")
+        service = Service.objects.create(name="Benchmark service", duration_minutes=10, price=0)
+        providers = User.objects.bulk_create(
+            User(phone=f"09{n:09d}", role='provider', full_name=f"Provider {n}") for n in range(20)
+        )
+        start = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), clock(8)))
+        AvailableTime.objects.bulk_create(
+            (
+                AvailableTime(
+                    provider=providers[n % len(providers)], service=service, branch=branch,
+                    start_time=start + timedelta(minutes=10 * (n // len(providers))), duration_minutes=10
+                )
+                for n in range(rows)
+            ),
+            batch_size=5000
+        )
+        queryset = AvailableTime.objects.select_related('provider', 'service', 'branch').order_by('start_time', 'id')
+        fast = FastListSerializer(AvailableTimeSerializer)
+
+        def baseline():
+            return JSONRenderer().render(AvailableTimeSerializer(queryset.all(), many=True).data)
+
+        def fast_path():
+            return FastJSONRenderer().render(fast.to_representation(fast.prepare(queryset.all())))
+
+        if baseline() != fast_path():
+            raise CommandError("Fast path output differs from the serializer's.")
+
+        for label, render in (('serializer', baseline), ('fast path', fast_path)):
+            best = min(self._timed(render) for _ in range(repeat))
+            self.stdout.write(f"{label:<11} {rows / best:>12,.0f} rows/s  ({best:.3f}s for {rows} rows)")
+
+    @staticmethod
+    def _timed(render) -> float:
+        started = time.perf_counter()
+        render()
+        return time.perf_counter() - started
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Qtime.schema import build_artifact, code_version
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema artifact served at /schema/ for the current code version."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        artifact = build_artifact(code_version())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Built schema {artifact.version} ({len(artifact.yaml)} bytes YAML, "
+            f"{len(artifact.json)} bytes JSON) in {elapsed:.2f}s."
+        ))
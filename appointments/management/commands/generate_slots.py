@@ -0,0 +1,38 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from appointments.models import ScheduleTemplate
+from appointments.services.schedule import DEFAULT_BATCH_SIZE, generate_slots
+
+
+class Command(BaseCommand):
+    help = "Generate available time slots from schedule templates. Safe to re-run; only gaps are filled."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help="First day (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument('--weeks', type=int, default=settings.SCHEDULE_GENERATION_WEEKS)
+        parser.add_argument('--provider', type=int, action='append', help="Limit to provider id (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['weeks'] < 1:
+            raise CommandError("--weeks must be at least 1.")
+
+        templates = ScheduleTemplate.objects.filter(is_active=True)
+        if options['provider']:
+            templates = templates.filter(provider_id__in=options['provider'])
+
+        started = time.perf_counter()
+        created = generate_slots(
+            options['start'] or timezone.localdate(),
+            options['weeks'],
+            templates=templates,
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f"Generated {created} slot(s) in {elapsed:.2f}s."))
@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments.services.importer import DEFAULT_BATCH_SIZE, Importer, read_csv, read_ics
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import slots and appointments from a CSV or ICS file. Bad rows are "
+        "reported, not fatal; an interrupted run resumes from its checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ics'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--checkpoint', help="Checkpoint file. Defaults to <path>.checkpoint.")
+        parser.add_argument('--errors', help="Bad row report (CSV). Defaults to <path>.errors.csv.")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint and start over.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        input_format = options['format'] or ('ics' if path.lower().endswith('.ics') else 'csv')
+        checkpoint = options['checkpoint'] or f"{path}.checkpoint"
+        errors = options['errors'] or f"{path}.errors.csv"
+        if options['restart']:
+            for stale in (checkpoint, errors):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+        importer = Importer(path, batch_size=options['batch_size'], checkpoint_path=checkpoint, errors_path=errors)
+        if importer.load_checkpoint():
+            self.stdout.write(f"Resuming after line {importer.progress.line}.")
+
+        started = time.perf_counter()
+        rows = read_ics(path) if input_format == 'ics' else read_csv(path)
+        progress = importer.run(rows)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {progress.slots} slot(s) and {progress.appointments} appointment(s) in {elapsed:.2f}s "
+            f"({progress.existing_slots} row(s) matched existing slots)."
+        ))
+        if progress.bad_rows:
+            self.stdout.write(self.style.WARNING(f"{progress.bad_rows} bad row(s) reported in {errors}."))
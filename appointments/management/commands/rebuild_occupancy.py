@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from appointments.services.occupancy import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild provider occupancy bitmaps from booked slots and appointments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider', type=int, action='append', help="Limit to provider id (repeatable).")
+        parser.add_argument('--since', type=date.fromisoformat, help="Only rebuild days from YYYY-MM-DD on.")
+
+    def handle(self, *args, **options):
+        written = rebuild(provider_ids=options['provider'], since=options['since'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} provider-day bitmap(s)."))
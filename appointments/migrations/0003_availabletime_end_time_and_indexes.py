@@ -0,0 +1,74 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:00
+
+from django.db import migrations, models, transaction
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+# Frozen copy of appointments.models.Minutes as of this migration, so later
+# edits to the model module cannot change what the backfill writes.
+class Minutes(models.Func):
+    output_field = models.DurationField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='(%(expressions)s * 60000000)', **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='make_interval(mins => %(expressions)s)', **extra_context)
+
+
+def backfill_end_time(apps, schema_editor):
+    AvailableTime = apps.get_model('appointments', 'AvailableTime')
+    db_alias = schema_editor.connection.alias
+    queryset = AvailableTime.objects.using(db_alias)
+
+    last_pk = 0
+    while True:
+        # Walk the primary key in fixed-size ranges so each batch is a short
+        # transaction and the table is never locked as a whole.
+        batch = list(
+            queryset.filter(pk__gt=last_pk, end_time__isnull=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        with transaction.atomic(using=db_alias):
+            queryset.filter(pk__gte=batch[0], pk__lte=batch[-1]).update(
+                end_time=models.ExpressionWrapper(
+                    models.F('start_time') + Minutes(models.F('duration_minutes')),
+                    output_field=models.DateTimeField()
+                )
+            )
+        last_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('appointments', '0002_alter_availabletime_duration_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availabletime',
+            name='end_time',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='End time'),
+        ),
+        migrations.RunPython(backfill_end_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='availabletime',
+            name='end_time',
+            field=models.DateTimeField(editable=False, verbose_name='End time'),
+        ),
+        migrations.AddIndex(
+            model_name='availabletime',
+            index=models.Index(fields=['provider', 'is_booked', 'start_time'], name='avail_provider_booked_start'),
+        ),
+        migrations.AddIndex(
+            model_name='availabletime',
+            index=models.Index(fields=['branch', 'service', 'start_time'], name='avail_branch_service_start'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_availabletime_end_time_and_indexes'),
+        ('branches', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], verbose_name='Weekday')),
+                ('start_time', models.TimeField(verbose_name='Start time')),
+                ('end_time', models.TimeField(verbose_name='End time')),
+                ('valid_from', models.DateField(blank=True, null=True, verbose_name='Valid from')),
+                ('valid_until', models.DateField(blank=True, null=True, verbose_name='Valid until')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Is active')),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='branches.branch', verbose_name='Branch')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Provider')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='branches.service', verbose_name='Service')),
+            ],
+            options={
+                'verbose_name': 'Schedule Template',
+                'verbose_name_plural': 'Schedule Templates',
+                'ordering': ['provider', 'weekday', 'start_time'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('start_time__lt', models.F('end_time'))), name='schedule_template_start_before_end')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('start_time', models.TimeField(blank=True, null=True, verbose_name='Start time')),
+                ('end_time', models.TimeField(blank=True, null=True, verbose_name='End time')),
+                ('reason', models.CharField(blank=True, max_length=255, null=True, verbose_name='Reason')),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='branches.branch', verbose_name='Branch')),
+                ('provider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Provider')),
+            ],
+            options={
+                'verbose_name': 'Schedule Exception',
+                'verbose_name_plural': 'Schedule Exceptions',
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['date'], name='schedule_exception_date')],
+            },
+        ),
+    ]
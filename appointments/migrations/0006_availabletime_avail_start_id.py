@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_providerdayoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availabletime',
+            index=models.Index(fields=['start_time', 'id'], name='avail_start_id'),
+        ),
+    ]
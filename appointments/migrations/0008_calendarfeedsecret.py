@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_availabletime_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeedSecret',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('provider', 'Provider'), ('user', 'User')], max_length=10, verbose_name='Feed kind')),
+                ('secret', models.CharField(max_length=32, verbose_name='Secret')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Calendar Feed Secret',
+                'verbose_name_plural': 'Calendar Feed Secrets',
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind'), name='unique_calendar_feed_secret')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_calendarfeedsecret'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availabletime',
+            index=models.Index(fields=['updated_at'], name='avail_updated_at'),
+        ),
+    ]
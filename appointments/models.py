@@ -1,7 +1,125 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Optional
+from notifications.models import OutboxEvent
+from notifications.services import outbox
+
+
+class Minutes(models.Func):
+    """
+    Turn an integer minutes expression into a duration the backend can add
+    to a datetime. Non-native backends store durations as microseconds.
+    """
+    output_field = models.DurationField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='(%(expressions)s * 60000000)', **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='make_interval(mins => %(expressions)s)', **extra_context)
+
+
+def end_time_expression(start_time=None, duration_minutes=None) -> models.Expression:
+    """
+    Database-side ``start_time + duration_minutes`` for set-based writes.
+    Either operand may be overridden with a value or expression.
+    """
+    if start_time is None:
+        start_time = models.F('start_time')
+    elif not hasattr(start_time, 'resolve_expression'):
+        start_time = models.Value(start_time, output_field=models.DateTimeField())
+
+    if duration_minutes is None:
+        duration_minutes = models.F('duration_minutes')
+    elif not hasattr(duration_minutes, 'resolve_expression'):
+        duration_minutes = models.Value(duration_minutes, output_field=models.IntegerField())
+
+    return models.ExpressionWrapper(
+        start_time + Minutes(duration_minutes),
+        output_field=models.DateTimeField()
+    )
+
+
+class AvailableTimeQuerySet(models.QuerySet):
+    """
+    QuerySet that keeps the stored ``end_time`` column in sync on bulk writes
+    and reports the days it touched through ``signals.slots_changed``.
+    """
+
+    def _changed_days(self) -> set:
+        return set(
+            self.annotate(
+                day=TruncDate('start_time', tzinfo=timezone.get_current_timezone())
+            ).order_by().values_list('day', flat=True).distinct()
+        )
+
+    def _send_slots_changed(self, days: set) -> None:
+        from appointments.signals import slots_changed
+
+        if days:
+            slots_changed.send(sender=self.model, days=days)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from appointments.services import live
+        from appointments.signals import local_days
+
+        objs = list(objs)
+        for obj in objs:
+            obj.sync_end_time()
+        created = super().bulk_create(objs, *args, **kwargs)
+        self._send_slots_changed(local_days(obj.start_time for obj in objs))
+        live.publish('created', created)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from appointments.signals import local_days
+
+        objs = list(objs)
+        fields = list(fields)
+        days = set()
+        # auto_now is not applied by bulk_update.
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        if 'updated_at' not in fields:
+            fields.append('updated_at')
+        if {'start_time', 'duration_minutes'} & set(fields):
+            for obj in objs:
+                obj.sync_end_time()
+            if 'end_time' not in fields:
+                fields.append('end_time')
+        if {'start_time', 'is_booked'} & set(fields):
+            days = local_days(obj.start_time for obj in objs)
+            if 'start_time' in fields:
+                days |= self.filter(pk__in=[obj.pk for obj in objs])._changed_days()
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        self._send_slots_changed(days)
+        return rows
+
+    def update(self, **kwargs):
+        if {'start_time', 'duration_minutes'} & kwargs.keys() and 'end_time' not in kwargs:
+            # UPDATE evaluates the right-hand side against the old row, so
+            # the new operands are substituted in rather than re-read.
+            kwargs['end_time'] = end_time_expression(
+                kwargs.get('start_time'),
+                kwargs.get('duration_minutes')
+            )
+
+        kwargs.setdefault('updated_at', timezone.now())
+
+        days = set()
+        if {'start_time', 'is_booked'} & kwargs.keys():
+            days = self._changed_days()
+            if isinstance(kwargs.get('start_time'), datetime):
+                days.add(timezone.localtime(kwargs['start_time']).date())
+
+        rows = super().update(**kwargs)
+        self._send_slots_changed(days)
+        return rows
 
 
 class AvailableTime(models.Model):
@@ -35,11 +153,23 @@ class AvailableTime(models.Model):
         verbose_name=_("Duration (minutes)")
     )
 
+    end_time: models.DateTimeField = models.DateTimeField(
+        editable=False,
+        verbose_name=_("End time")
+    )
+
     is_booked: bool = models.BooleanField(
         default=False,
         verbose_name=_("Is booked")
     )
 
+    updated_at: models.DateTimeField = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Updated at")
+    )
+
+    objects = AvailableTimeQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Available Time")
         verbose_name_plural = _("Available Times")
@@ -50,31 +180,53 @@ class AvailableTime(models.Model):
                 name="unique_provider_time_slot"
             )
         ]
+        indexes = [
+            # Overlap checks and "next free slot" lookups for a provider.
+            models.Index(
+                fields=["provider", "is_booked", "start_time"],
+                name="avail_provider_booked_start"
+            ),
+            # Availability listings filtered by branch and service.
+            models.Index(
+                fields=["branch", "service", "start_time"],
+                name="avail_branch_service_start"
+            ),
+            # Keyset pagination order for unfiltered listings.
+            models.Index(
+                fields=["start_time", "id"],
+                name="avail_start_id"
+            ),
+            # Reminder sweeps pick up slots changed since the last one.
+            models.Index(
+                fields=["updated_at"],
+                name="avail_updated_at"
+            ),
+        ]
 
 
     def __str__(self) -> str:
         return f"Provider {self.provider} - {self.service.name} at {self.start_time}"
 
-    @property
-    def end_time(self) -> str:
+    def sync_end_time(self) -> None:
         """
-        Calculate the end time based on start time and duration.
+        Recalculate the stored end time from start time and duration.
         """
-        return self.start_time + timedelta(minutes=self.duration_minutes)
+        if self.start_time is not None and self.duration_minutes is not None:
+            self.end_time = self.start_time + timedelta(minutes=self.duration_minutes)
 
     def mark_as_booked(self) -> None:
         """
         Mark the time slot as booked.
         """
         self.is_booked = True
-        self.save()
+        self.save(update_fields=['is_booked', 'updated_at'])
 
     def mark_as_available(self) -> None:
         """
         Mark the time slot as available again.
         """
         self.is_booked = False
-        self.save()
+        self.save(update_fields=['is_booked', 'updated_at'])
 
     @classmethod
     def reserve_time_slot(
@@ -90,23 +242,11 @@ class AvailableTime(models.Model):
         """
         end_time = start_time + timedelta(minutes=duration_minutes)
 
-        conflict_exists = cls.objects.filter(
-            provider=provider,
-            branch=branch,
-            service=service,
-            is_booked=True,
-            start_time__lt=end_time,
-        ).annotate(
-            real_end_time=models.ExpressionWrapper(
-                models.F('start_time') + models.ExpressionWrapper(
-                    models.F('duration_minutes') * 60,
-                    output_field=models.DurationField()
-                ),
-                output_field=models.DateTimeField()
-            )
-        ).filter(real_end_time__gt=start_time).exists()
+        # A provider can only be in one place at a time; the occupancy bitmap
+        # answers that for the whole range in a single row lookup.
+        from appointments.services import occupancy
 
-        if conflict_exists:
+        if not occupancy.is_free(provider.pk, start_time, duration_minutes):
             raise ValueError("This time overlaps with an already booked slot.")
 
 
@@ -119,34 +259,50 @@ class AvailableTime(models.Model):
         ).first()
 
         if available_slot and not available_slot.is_booked:
-            available_slot.mark_as_booked()
-            cls.objects.filter(
-                provider=provider,
-                service=service,
-                branch=branch,
-                start_time__gte=start_time,
-                start_time__lt=end_time
-            ).update(is_booked=True)
+            with transaction.atomic():
+                if not occupancy.occupy(provider.pk, start_time, duration_minutes):
+                    raise ValueError("This time overlaps with an already booked slot.")
+                cls.objects.filter(
+                    provider=provider,
+                    service=service,
+                    branch=branch,
+                    start_time__gte=start_time,
+                    start_time__lt=end_time
+                ).update(is_booked=True)
 
             return True
 
         elif not available_slot or available_slot.is_booked:
-            alternative_slots = cls.objects.filter(
-                provider=provider,
-                service=service,
-                branch=branch,
-                is_booked=False,
-                start_time__gt=start_time
-            ).order_by('start_time')  # limit to next 5 available
+            from appointments.services.suggestions import nearest_free_slots
 
-            return list(alternative_slots)
+            return nearest_free_slots(
+                provider,
+                service,
+                branch,
+                start_time,
+                limit=settings.SUGGESTION_LIMIT
+            )
 
     def save(self, *args, **kwargs):
         """
-        Automatically set duration_minutes from the related service.
+        Automatically set duration_minutes from the related service
+        and keep end_time in sync.
         """
-        if self.service:
-            self.duration_minutes = self.service.duration_minutes
+        update_fields = kwargs.get('update_fields')
+        timing_fields = {'service', 'start_time', 'duration_minutes'}
+
+        if update_fields is None or timing_fields & set(update_fields):
+            # Only hit the database for the service when the duration is unknown;
+            # an already-loaded service is always authoritative.
+            if self.service_id and (
+                self.duration_minutes is None
+                or self._meta.get_field('service').is_cached(self)
+            ):
+                self.duration_minutes = self.service.duration_minutes
+            self.sync_end_time()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'duration_minutes', 'end_time'}
+
         super().save(*args, **kwargs)
 
 class Appointment(models.Model):
@@ -179,9 +335,254 @@ class Appointment(models.Model):
         return f"Appointment for {self.user} at {self.available_time.branch.name} with {self.available_time.provider.full_name} on {self.available_time.start_time} for {self.available_time.service}"
 
     def confirm_appointment(self) -> None:
-        self.is_confirmed = True
-        self.save()
+        with transaction.atomic():
+            was_confirmed = self.is_confirmed
+            self.is_confirmed = True
+            self.save()
+            if not was_confirmed:
+                outbox.record(OutboxEvent.CONFIRMED, [self])
 
     def cancel_appointment(self) -> None:
         self.is_confirmed = False
         self.save()
+
+
+class ScheduleTemplate(models.Model):
+    """
+    Weekly working hours of a provider for one service at one branch.
+    provider, service, branch, weekday, start_time, end_time, valid_from, valid_until, is_active
+    """
+    WEEKDAY_CHOICES = (
+        (0, _('Monday')),
+        (1, _('Tuesday')),
+        (2, _('Wednesday')),
+        (3, _('Thursday')),
+        (4, _('Friday')),
+        (5, _('Saturday')),
+        (6, _('Sunday')),
+    )
+
+    provider: 'models.ForeignKey' = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        verbose_name=_("Provider")
+    )
+
+    service: 'models.ForeignKey' = models.ForeignKey(
+        'branches.Service',
+        on_delete=models.CASCADE,
+        verbose_name=_("Service")
+    )
+
+    branch: 'models.ForeignKey' = models.ForeignKey(
+        'branches.Branch',
+        on_delete=models.CASCADE,
+        verbose_name=_("Branch")
+    )
+
+    weekday: int = models.PositiveSmallIntegerField(
+        choices=WEEKDAY_CHOICES,
+        verbose_name=_("Weekday")
+    )
+
+    start_time: models.TimeField = models.TimeField(
+        verbose_name=_("Start time")
+    )
+
+    end_time: models.TimeField = models.TimeField(
+        verbose_name=_("End time")
+    )
+
+    valid_from: Optional[models.DateField] = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name=_("Valid from")
+    )
+
+    valid_until: Optional[models.DateField] = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name=_("Valid until")
+    )
+
+    is_active: bool = models.BooleanField(
+        default=True,
+        verbose_name=_("Is active")
+    )
+
+    class Meta:
+        verbose_name = _("Schedule Template")
+        verbose_name_plural = _("Schedule Templates")
+        ordering = ['provider', 'weekday', 'start_time']
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(start_time__lt=models.F('end_time')),
+                name="schedule_template_start_before_end"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.provider} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+
+    def is_valid_on(self, day) -> bool:
+        """
+        Check whether the template applies to the given date.
+        """
+        return (
+            day.weekday() == self.weekday
+            and (self.valid_from is None or self.valid_from <= day)
+            and (self.valid_until is None or day <= self.valid_until)
+        )
+
+
+class ScheduleException(models.Model):
+    """
+    Day (or part of a day) on which no slots are generated.
+    Leave provider empty for a branch holiday, and both provider and branch
+    empty for a holiday everywhere. Leave the times empty to close the whole day.
+    """
+    provider: Optional['models.ForeignKey'] = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name=_("Provider")
+    )
+
+    branch: Optional['models.ForeignKey'] = models.ForeignKey(
+        'branches.Branch',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name=_("Branch")
+    )
+
+    date: models.DateField = models.DateField(
+        verbose_name=_("Date")
+    )
+
+    start_time: Optional[models.TimeField] = models.TimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Start time")
+    )
+
+    end_time: Optional[models.TimeField] = models.TimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("End time")
+    )
+
+    reason: Optional[str] = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        verbose_name=_("Reason")
+    )
+
+    class Meta:
+        verbose_name = _("Schedule Exception")
+        verbose_name_plural = _("Schedule Exceptions")
+        ordering = ['date']
+        indexes = [
+            models.Index(fields=["date"], name="schedule_exception_date"),
+        ]
+
+    def __str__(self) -> str:
+        scope = self.provider or self.branch or _("Everyone")
+        return f"{scope} off on {self.date}"
+
+    def applies_to(self, provider_id: int, branch_id: int) -> bool:
+        """
+        Check whether the exception covers the given provider at the given branch.
+        """
+        return (
+            (self.provider_id is None or self.provider_id == provider_id)
+            and (self.branch_id is None or self.branch_id == branch_id)
+        )
+
+    def blocks(self, start, end) -> bool:
+        """
+        Check whether the local time range [start, end) falls in the exception.
+        """
+        if self.start_time is None or self.end_time is None:
+            return True
+        return start < self.end_time and self.start_time < end
+
+
+class ProviderDayOccupancy(models.Model):
+    """
+    Booked time of a provider on one local day, one bit per 5-minute block.
+    Derived data: rebuild with ``manage.py rebuild_occupancy``.
+    provider, day, bits
+    """
+    provider: 'models.ForeignKey' = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        verbose_name=_("Provider")
+    )
+
+    day: models.DateField = models.DateField(
+        verbose_name=_("Day")
+    )
+
+    bits: bytes = models.BinaryField(
+        max_length=36,
+        default=bytes(36),
+        verbose_name=_("Occupancy bits")
+    )
+
+    class Meta:
+        verbose_name = _("Provider Day Occupancy")
+        verbose_name_plural = _("Provider Day Occupancies")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "day"],
+                name="unique_provider_day_occupancy"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"Occupancy of {self.provider} on {self.day}"
+
+
+class CalendarFeedSecret(models.Model):
+    """
+    Secret signed into an owner's iCalendar feed token. Replacing it revokes
+    every token handed out before.
+    user, kind, secret
+    """
+    KIND_CHOICES = [
+        ('provider', _("Provider")),
+        ('user', _("User")),
+    ]
+
+    user: 'models.ForeignKey' = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        verbose_name=_("User")
+    )
+
+    kind: models.CharField = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES,
+        verbose_name=_("Feed kind")
+    )
+
+    secret: models.CharField = models.CharField(
+        max_length=32,
+        verbose_name=_("Secret")
+    )
+
+    class Meta:
+        verbose_name = _("Calendar Feed Secret")
+        verbose_name_plural = _("Calendar Feed Secrets")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "kind"],
+                name="unique_calendar_feed_secret"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} feed secret of {self.user}"
@@ -0,0 +1,29 @@
+from Qtime.pagination import KeysetPagination
+
+
+class AvailableTimePagination(KeysetPagination):
+    """
+    Pages of slots in (start_time, id) order.
+    """
+    ordering = ('start_time', 'id')
+
+
+class VirtualAvailableTimePagination(KeysetPagination):
+    """
+    Pages of computed (unsaved) slots, which have no id.
+    """
+    ordering = ('start_time', 'provider_id', 'service_id', 'branch_id')
+
+
+class AppointmentPagination(KeysetPagination):
+    """
+    Pages of appointments in (slot start_time, id) order.
+
+    The order comes from the joined slot, so no single index covers it: each
+    page sorts the matching appointments after the join. Provider lists are
+    narrowed first through the slot's (provider, is_booked, start_time)
+    index and stay small; the unfiltered admin list pays for the sort, which
+    is accepted there rather than copying start_time onto Appointment and
+    keeping it in sync when slots move.
+    """
+    ordering = ('available_time__start_time', 'id')
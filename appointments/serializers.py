@@ -1,33 +1,83 @@
-from rest_framework import serializers
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from Qtime.sparse_fields import SparseFieldsetMixin
+from accounts.models import User
+from branches.models import Branch, Service
 from .models import Appointment, AvailableTime
+from .services.booking import SlotUnavailable, booking_engine
+from .services.calendar_feed import FEED_KINDS
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class SlotBooked(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("This time slot is already booked.")
+    default_code = 'slot_booked'
+
+
+class AppointmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    available_time = serializers.PrimaryKeyRelatedField(queryset=AvailableTime.objects.all(), required=False)
+    # Virtual availability lists slots without an id; those are booked by
+    # provider, service, branch and start time instead of available_time.
+    provider = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(role='provider'), write_only=True, required=False
+    )
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all(), write_only=True, required=False)
+    branch = serializers.PrimaryKeyRelatedField(queryset=Branch.objects.all(), write_only=True, required=False)
+    start_time = serializers.DateTimeField(write_only=True, required=False)
 
     class Meta:
         model = Appointment
-        fields = ['id', 'user', 'available_time', 'is_confirmed']
+        fields = ['id', 'user', 'available_time', 'provider', 'service', 'branch', 'start_time', 'is_confirmed']
         read_only_fields = ['is_confirmed']
+        # The generated (user, available_time) check would make available_time
+        # required; BookingEngine already refuses a slot that is booked.
+        validators = []
 
     def validate_available_time(self, value):
         """
         Validate that the selected available time is not already booked.
         """
         if value.is_booked:
-            raise serializers.ValidationError("This time slot is already booked.")
+            raise SlotBooked()
         return value
 
+    def validate(self, attrs):
+        slot_fields = ('provider', 'service', 'branch', 'start_time')
+        by_time = {name: attrs.pop(name) for name in slot_fields if name in attrs}
+        if 'available_time' in attrs or self.instance is not None:
+            return attrs
+
+        missing = [name for name in slot_fields if name not in by_time]
+        if missing:
+            raise serializers.ValidationError(
+                {'available_time': ["Give available_time, or provider, service, branch and start_time."]}
+            )
+
+        from .services.availability import materialize_slot
+
+        slot = materialize_slot(**by_time)
+        if slot is None:
+            raise serializers.ValidationError({'start_time': ["No free slot starts at this time."]})
+        attrs['available_time'] = self.validate_available_time(slot)
+        return attrs
+
     def create(self, validated_data):
         """
-        Create an appointment and mark the available time as booked.
+        Create an appointment and mark the available time as booked
+        in a single transaction.
         """
-        appointment = Appointment.objects.create(**validated_data)
-        validated_data['available_time'].mark_as_booked()
-        return appointment
+        available_time = validated_data.pop('available_time')
+        user = validated_data.pop('user')
+        try:
+            return booking_engine.book(user, available_time, **validated_data)
+        except SlotUnavailable as exc:
+            raise SlotBooked(str(exc))
 
 
-class AvailableTimeSerializer(serializers.ModelSerializer):
+class AvailableTimeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     provider_name = serializers.CharField(source='provider.full_name', read_only=True)
     service_name = serializers.CharField(source='service.name', read_only=True)
     branch_name = serializers.CharField(source='branch.name', read_only=True)
@@ -39,3 +89,87 @@ class AvailableTimeSerializer(serializers.ModelSerializer):
             'start_time', 'duration_minutes', 'is_booked'
         ]
         read_only_fields = fields
+
+
+class LiveSlotsQuerySerializer(serializers.Serializer):
+    """
+    Query parameters naming a live availability channel.
+    """
+    branch = serializers.PrimaryKeyRelatedField(queryset=Branch.objects.all())
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all())
+    date = serializers.DateField()
+
+
+class SlotSuggestionQuerySerializer(serializers.Serializer):
+    """
+    Query parameters for nearest free slot suggestions.
+    """
+    provider = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(role='provider'))
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all())
+    branch = serializers.PrimaryKeyRelatedField(queryset=Branch.objects.all())
+    start_time = serializers.DateTimeField()
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.SUGGESTION_MAX_LIMIT,
+        default=settings.SUGGESTION_LIMIT
+    )
+    other_providers = serializers.BooleanField(default=False)
+
+
+class BatchBookingSerializer(serializers.Serializer):
+    """
+    Request body for booking several slots at once.
+    """
+    available_times = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=settings.BATCH_BOOKING_MAX_ITEMS
+    )
+    all_or_nothing = serializers.BooleanField(default=True)
+
+
+class BatchBookingResultSerializer(serializers.Serializer):
+    """
+    Per-slot outcome of a batch booking.
+    """
+    available_time = serializers.IntegerField()
+    status = serializers.CharField()
+    appointment = AppointmentSerializer(allow_null=True)
+
+
+class SlotHoldSerializer(serializers.Serializer):
+    """
+    Request body for placing a hold; ``seconds`` is clamped to SLOT_HOLD_MAX_SECONDS.
+    """
+    seconds = serializers.IntegerField(required=False)
+
+
+class SlotHoldResultSerializer(serializers.Serializer):
+    """
+    A placed hold and when it lapses.
+    """
+    available_time = serializers.IntegerField()
+    expires_at = serializers.DateTimeField()
+
+
+class AvailabilityCountSerializer(serializers.Serializer):
+    """
+    Free slots in one day or hour of the availability calendar.
+    """
+    period = serializers.CharField(help_text="Local date for day buckets, local datetime for hour buckets.")
+    free = serializers.IntegerField()
+
+
+class CalendarFeedLinksSerializer(serializers.Serializer):
+    """
+    Feed URLs of the authenticated user; ``provider`` only for providers.
+    """
+    user = serializers.URLField()
+    provider = serializers.URLField(required=False)
+
+
+class CalendarFeedRotateSerializer(serializers.Serializer):
+    """
+    Request body for rotating feeds; every feed of the user if ``kind`` is omitted.
+    """
+    kind = serializers.ChoiceField(choices=FEED_KINDS, required=False)
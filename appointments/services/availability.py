@@ -0,0 +1,190 @@
+"""
+Virtual availability: free slots computed from schedule templates minus
+booked intervals, instead of reading materialized AvailableTime rows.
+
+All interval arithmetic is done on NumPy arrays of epoch seconds.
+
+Virtual slots are listed without an id. Booking one by provider, service,
+branch and start time creates its row first (``materialize_slot``).
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from appointments.models import AvailableTime, ScheduleException, ScheduleTemplate
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def expand_windows(window_starts: np.ndarray, window_ends: np.ndarray, step: int) -> np.ndarray:
+    """
+    Cut every [start, end) window into back-to-back slots of ``step`` seconds
+    and return the slot starts, without a Python-level loop over slots.
+    """
+    counts = np.maximum((window_ends - window_starts) // step, 0)
+    total = int(counts.sum())
+    if not total:
+        return EMPTY
+    first_index = np.repeat(np.cumsum(counts) - counts, counts)
+    offsets = np.arange(total, dtype=np.int64) - first_index
+    return np.repeat(window_starts, counts) + offsets * step
+
+
+def subtract_busy(starts: np.ndarray, duration: int, busy_starts: np.ndarray, busy_ends: np.ndarray) -> np.ndarray:
+    """
+    Drop slot starts whose [start, start + duration) overlaps any busy interval.
+    Busy intervals may overlap each other and need not be sorted.
+    """
+    if not len(starts) or not len(busy_starts):
+        return starts
+
+    order = np.argsort(busy_starts, kind='stable')
+    busy_starts = busy_starts[order]
+    # Running max of the ends is sorted, so one binary search per slot finds
+    # the first busy interval that ends after the slot starts.
+    reach = np.maximum.accumulate(busy_ends[order])
+
+    index = np.searchsorted(reach, starts, side='right')
+    inside = index < len(busy_starts)
+    overlaps = np.zeros(len(starts), dtype=bool)
+    overlaps[inside] = busy_starts[index[inside]] < starts[inside] + duration
+    return starts[~overlaps]
+
+
+def _epoch(day: date, at, tz) -> int:
+    return int(datetime.combine(day, at, tzinfo=tz).timestamp())
+
+
+def _exception_interval(exception: ScheduleException, tz) -> tuple[int, int]:
+    if exception.start_time is None or exception.end_time is None:
+        start = _epoch(exception.date, datetime.min.time(), tz)
+        return start, _epoch(exception.date + timedelta(days=1), datetime.min.time(), tz)
+    return _epoch(exception.date, exception.start_time, tz), _epoch(exception.date, exception.end_time, tz)
+
+
+def free_slot_starts(templates, lower: datetime, upper: datetime) -> list[tuple[ScheduleTemplate, np.ndarray]]:
+    """
+    Return ``(template, starts)`` pairs where ``starts`` holds the epoch
+    seconds of every free slot in [lower, upper] generated by the template.
+    """
+    templates = list(templates)
+    if not templates:
+        return []
+
+    tz = timezone.get_current_timezone()
+    lower_epoch, upper_epoch = int(lower.timestamp()), int(upper.timestamp())
+    first_day, last_day = timezone.localtime(lower, tz).date(), timezone.localtime(upper, tz).date()
+    days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+
+    # Booked intervals are provider-wide: a provider cannot be in two places at once.
+    busy = defaultdict(list)
+    for provider_id, start_time, end_time in AvailableTime.objects.filter(
+        provider_id__in={t.provider_id for t in templates},
+        is_booked=True,
+        start_time__lte=upper,
+        end_time__gt=lower,
+    ).order_by().values_list('provider_id', 'start_time', 'end_time'):
+        busy[provider_id].append((int(start_time.timestamp()), int(end_time.timestamp())))
+
+    exceptions = list(ScheduleException.objects.filter(date__gte=first_day, date__lte=last_day))
+
+    result = []
+    for template in templates:
+        windows = np.array(
+            [
+                (_epoch(day, template.start_time, tz), _epoch(day, template.end_time, tz))
+                for day in days
+                if template.is_valid_on(day)
+            ],
+            dtype=np.int64
+        ).reshape(-1, 2)
+
+        step = template.service.duration_minutes * 60
+        starts = expand_windows(windows[:, 0], windows[:, 1], step)
+        starts = starts[(starts >= lower_epoch) & (starts <= upper_epoch)]
+
+        intervals = busy[template.provider_id] + [
+            _exception_interval(exception, tz)
+            for exception in exceptions
+            if exception.applies_to(template.provider_id, template.branch_id)
+        ]
+        if intervals:
+            blocked = np.array(intervals, dtype=np.int64)
+            starts = subtract_busy(starts, step, blocked[:, 0], blocked[:, 1])
+
+        if len(starts):
+            result.append((template, starts))
+
+    return result
+
+
+def virtual_available_times(branch=None, provider=None, service=None, start=None, end=None) -> list[AvailableTime]:
+    """
+    Free slots as unsaved AvailableTime instances, ordered by start time,
+    so they render through AvailableTimeSerializer like materialized rows.
+    """
+    lower = max(start or timezone.now(), timezone.now())
+    upper = min(
+        end or lower + timedelta(days=settings.AVAILABILITY_VIRTUAL_MAX_DAYS),
+        lower + timedelta(days=settings.AVAILABILITY_VIRTUAL_MAX_DAYS)
+    )
+    if upper < lower:
+        return []
+
+    templates = ScheduleTemplate.objects.filter(is_active=True).select_related('provider', 'service', 'branch')
+    if branch is not None:
+        templates = templates.filter(branch=branch)
+    if provider is not None:
+        templates = templates.filter(provider=provider)
+    if service is not None:
+        templates = templates.filter(service=service)
+
+    slots = []
+    for template, starts in free_slot_starts(templates, lower, upper):
+        duration = template.service.duration_minutes
+        for epoch in starts.tolist():
+            slots.append(AvailableTime(
+                provider=template.provider,
+                service=template.service,
+                branch=template.branch,
+                start_time=datetime.fromtimestamp(epoch, tz=timezone.get_current_timezone()),
+                duration_minutes=duration,
+                is_booked=False,
+            ))
+
+    slots.sort(key=lambda slot: slot.start_time)
+    return slots
+
+
+def materialize_slot(provider, service, branch, start_time: datetime) -> AvailableTime | None:
+    """
+    Return the AvailableTime row of a virtual slot, creating it on first use,
+    so it can be booked like a materialized one. Returns None unless an
+    active template offers that exact start and it is still free.
+    """
+    if start_time <= timezone.now():
+        return None
+
+    templates = ScheduleTemplate.objects.filter(
+        is_active=True, provider=provider, service=service, branch=branch
+    ).select_related('service')
+    epoch = int(start_time.timestamp())
+    if not any(epoch in starts for _template, starts in free_slot_starts(templates, start_time, start_time)):
+        return None
+
+    lookup = {'provider': provider, 'start_time': start_time}
+    defaults = {'service': service, 'branch': branch, 'duration_minutes': service.duration_minutes}
+    try:
+        with transaction.atomic():
+            slot, _created = AvailableTime.objects.get_or_create(**lookup, defaults=defaults)
+    except IntegrityError:
+        # Created concurrently by another booking of the same slot.
+        slot = AvailableTime.objects.get(**lookup)
+
+    if slot.service_id != service.pk or slot.branch_id != branch.pk:
+        return None
+    return slot
@@ -0,0 +1,229 @@
+import threading
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from appointments.models import Appointment, AvailableTime
+from appointments.services import calendar_feed, holds, live, occupancy
+from notifications.models import OutboxEvent
+from notifications.services import outbox
+
+
+class SlotUnavailable(Exception):
+    """
+    Raised when the requested slot was booked by someone else first.
+    """
+
+
+@dataclass
+class BatchItemResult:
+    """
+    Outcome of one slot in a batch booking.
+    status: booked, already_booked, held, overlaps, not_found, duplicate,
+    rolled_back (undone by all-or-nothing) or skipped (not tried because of a hold)
+    """
+    available_time: int
+    status: str
+    appointment: Appointment | None = None
+
+    @property
+    def booked(self) -> bool:
+        return self.status == 'booked'
+
+
+@dataclass
+class BookingStats:
+    """
+    Snapshot of booking outcomes since the process started (or the last reset).
+    """
+    succeeded: int = 0
+    lost_race: int = 0
+
+    @property
+    def attempts(self) -> int:
+        return self.succeeded + self.lost_race
+
+
+class BookingEngine:
+    """
+    Book and release slots without check-then-save races.
+
+    The slot is reserved with a single conditional UPDATE
+    (``... SET is_booked = true WHERE id = %s AND is_booked = false``) and the
+    Appointment row is inserted in the same transaction, so either both are
+    committed or neither is. Whoever loses the race gets ``SlotUnavailable``.
+    The provider's occupancy bitmap is updated in that same transaction, which
+    also rejects slots overlapping another booking of the provider.
+
+    Slots held by another user (see services/holds.py) are refused from the
+    cache before any query runs; a successful booking drops the user's hold.
+
+    Bookings and cancellations queue their notification in the same commit
+    (see notifications/services/outbox.py); nothing is sent inline.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats = BookingStats()
+
+    def book(self, user: 'accounts.User', available_time: AvailableTime | int, **extra_fields) -> Appointment:
+        """
+        Reserve the slot and create the appointment in one commit.
+        """
+        slot_id = getattr(available_time, 'pk', available_time)
+
+        if holds.is_held_by_other(slot_id, user.pk):
+            self._record(lost_race=1)
+            raise SlotUnavailable(_("This time slot is being held by another user."))
+
+        with transaction.atomic():
+            reserved = AvailableTime.objects.filter(
+                pk=slot_id,
+                is_booked=False
+            ).update(is_booked=True)
+
+            if not reserved:
+                self._record(lost_race=1)
+                raise SlotUnavailable(_("This time slot is already booked."))
+
+            if isinstance(available_time, AvailableTime):
+                slot = available_time
+            else:
+                slot = AvailableTime.objects.only(
+                    'provider_id', 'branch_id', 'service_id', 'start_time', 'duration_minutes'
+                ).get(pk=slot_id)
+
+            if not occupancy.occupy(slot.provider_id, slot.start_time, slot.duration_minutes):
+                self._record(lost_race=1)
+                raise SlotUnavailable(_("This time overlaps with an already booked slot."))
+
+            appointment = Appointment.objects.create(
+                user=user,
+                available_time_id=slot_id,
+                **extra_fields
+            )
+            outbox.record(OutboxEvent.BOOKED, [appointment])
+
+        if isinstance(available_time, AvailableTime):
+            available_time.is_booked = True
+            appointment.available_time = available_time
+
+        holds.release_hold(slot_id, user.pk)
+        live.publish('booked', [slot])
+        self._record(succeeded=1)
+        return appointment
+
+    def book_many(self, user: 'accounts.User', slot_ids: list[int], all_or_nothing: bool = True) -> list[BatchItemResult]:
+        """
+        Book several slots for one user in a single transaction.
+
+        Slot rows are locked with SELECT ... FOR UPDATE in primary key order and
+        occupancy rows in (provider, start time) order, so concurrent batches
+        over the same slots queue up instead of deadlocking. All winners are
+        written with one UPDATE and one bulk INSERT. With ``all_or_nothing``
+        any failure rolls the whole batch back.
+
+        Results are returned in request order.
+        """
+        results = {}
+        unique_ids = []
+        held = holds.held_by_others(slot_ids, user.pk)
+        for slot_id in slot_ids:
+            if slot_id in results:
+                results.setdefault(('duplicate', slot_id), BatchItemResult(slot_id, 'duplicate'))
+                continue
+            if slot_id in held:
+                results[slot_id] = BatchItemResult(slot_id, 'held')
+                continue
+            results[slot_id] = None
+            unique_ids.append(slot_id)
+
+        if held and all_or_nothing:
+            # Refused from the cache alone; the database is never touched.
+            for slot_id in unique_ids:
+                results[slot_id] = BatchItemResult(slot_id, 'skipped')
+            self._record(lost_race=len(held))
+            return self._in_request_order(slot_ids, results)
+
+        with transaction.atomic():
+            slots = {
+                slot.pk: slot
+                for slot in AvailableTime.objects.select_for_update().filter(pk__in=unique_ids).order_by('pk')
+            }
+
+            winners = []
+            for slot in sorted(slots.values(), key=lambda slot: (slot.provider_id, slot.start_time, slot.pk)):
+                if slot.is_booked:
+                    results[slot.pk] = BatchItemResult(slot.pk, 'already_booked')
+                elif not occupancy.occupy(slot.provider_id, slot.start_time, slot.duration_minutes):
+                    results[slot.pk] = BatchItemResult(slot.pk, 'overlaps')
+                else:
+                    winners.append(slot)
+            for slot_id in unique_ids:
+                if slot_id not in slots:
+                    results[slot_id] = BatchItemResult(slot_id, 'not_found')
+
+            failed = len(unique_ids) - len(winners)
+            if all_or_nothing and failed:
+                transaction.set_rollback(True)
+                for slot in winners:
+                    results[slot.pk] = BatchItemResult(slot.pk, 'rolled_back')
+                winners = []
+            elif winners:
+                AvailableTime.objects.filter(pk__in=[slot.pk for slot in winners]).update(is_booked=True)
+                appointments = Appointment.objects.bulk_create(
+                    [Appointment(user=user, available_time=slot) for slot in winners]
+                )
+                outbox.record(OutboxEvent.BOOKED, appointments)
+                for slot, appointment in zip(winners, appointments):
+                    slot.is_booked = True
+                    results[slot.pk] = BatchItemResult(slot.pk, 'booked', appointment)
+
+        for slot in winners:
+            holds.release_hold(slot.pk, user.pk)
+        live.publish('booked', winners)
+        if winners:
+            # bulk_create sends no post_save, so the feeds are bumped here.
+            calendar_feed.invalidate(provider_ids=[slot.provider_id for slot in winners], user_ids=[user.pk])
+        self._record(succeeded=len(winners), lost_race=len(unique_ids) - len(winners) + len(held))
+        return self._in_request_order(slot_ids, results)
+
+    @staticmethod
+    def _in_request_order(slot_ids: list[int], results: dict) -> list[BatchItemResult]:
+        ordered, seen = [], set()
+        for slot_id in slot_ids:
+            ordered.append(results[('duplicate', slot_id)] if slot_id in seen else results[slot_id])
+            seen.add(slot_id)
+        return ordered
+
+    def cancel(self, appointment: Appointment) -> None:
+        """
+        Delete the appointment and free its slot in one commit.
+        """
+        slot = appointment.available_time
+        with transaction.atomic():
+            AvailableTime.objects.filter(pk=slot.pk).update(is_booked=False)
+            outbox.record(OutboxEvent.CANCELLED, [appointment])
+            # post_delete releases the provider's occupancy.
+            appointment.delete()
+            live.publish('released', [slot])
+
+    def stats(self) -> BookingStats:
+        """
+        Return a copy of the current counters.
+        """
+        with self._lock:
+            return BookingStats(self._stats.succeeded, self._stats.lost_race)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = BookingStats()
+
+    def _record(self, succeeded: int = 0, lost_race: int = 0) -> None:
+        with self._lock:
+            self._stats.succeeded += succeeded
+            self._stats.lost_race += lost_race
+
+
+booking_engine = BookingEngine()
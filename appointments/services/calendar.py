@@ -0,0 +1,112 @@
+import hashlib
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from appointments.models import AvailableTime
+from Qtime import versioning
+
+BUCKETS = {
+    'day': TruncDay,
+    'hour': TruncHour,
+}
+
+
+def get_day_scope(day: date) -> str:
+    """
+    Construct the versioning scope of one local day.
+    """
+    return f"availability_calendar:{day.isoformat()}"
+
+
+def get_counts_cache_key(bucket: str, filters: tuple, day: date, version: int) -> str:
+    """
+    Construct cache key for the counts of one (filter, day) pair at a version.
+    """
+    digest = hashlib.md5(repr(filters).encode()).hexdigest()
+    return f"availability_calendar:{bucket}:{digest}:{day.isoformat()}:{version}"
+
+
+def invalidate(days) -> None:
+    """
+    Bump the change counter of every given local day once the current
+    transaction commits. Cached counts for those days become unreachable;
+    nothing is scanned. Bumping earlier would let a request in between
+    cache the old counts under the new version.
+    """
+    scopes = {get_day_scope(day) for day in days}
+
+    def bump():
+        for scope in scopes:
+            versioning.bump_version(scope)
+
+    transaction.on_commit(bump)
+
+
+def _local_midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def availability_calendar(first_day: date, last_day: date, bucket: str = 'day', branch=None, provider=None, service=None) -> list[dict]:
+    """
+    Count free slots per local day (or hour) between two local days, inclusive.
+
+    Counts are cached per (filter, day) under that day's change counter, so
+    only days that changed since the last request are recounted, with one
+    GROUP BY over start_time for all of them together.
+    """
+    trunc = BUCKETS[bucket]
+    filters = (
+        getattr(branch, 'pk', branch),
+        getattr(provider, 'pk', provider),
+        getattr(service, 'pk', service),
+    )
+    days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+
+    versions = versioning.get_versions(get_day_scope(day) for day in days)
+    keys = {
+        day: get_counts_cache_key(bucket, filters, day, versions[get_day_scope(day)])
+        for day in days
+    }
+    cached = cache.get_many(list(keys.values()))
+    counts = {day: cached[keys[day]] for day in days if keys[day] in cached}
+
+    missing = [day for day in days if day not in counts]
+    if missing:
+        slots = AvailableTime.objects.filter(
+            is_booked=False,
+            start_time__gte=_local_midnight(missing[0]),
+            start_time__lt=_local_midnight(missing[-1] + timedelta(days=1)),
+        )
+        if filters[0] is not None:
+            slots = slots.filter(branch_id=filters[0])
+        if filters[1] is not None:
+            slots = slots.filter(provider_id=filters[1])
+        if filters[2] is not None:
+            slots = slots.filter(service_id=filters[2])
+
+        fresh = {day: [] for day in missing}
+        rows = slots.annotate(
+            period=trunc('start_time', tzinfo=timezone.get_current_timezone())
+        ).values('period').annotate(free=Count('id')).order_by('period')
+        for row in rows:
+            day = timezone.localtime(row['period']).date()
+            if day in fresh:
+                fresh[day].append((row['period'], row['free']))
+
+        cache.set_many(
+            {keys[day]: periods for day, periods in fresh.items()},
+            timeout=settings.AVAILABILITY_CALENDAR_CACHE_SECONDS
+        )
+        counts.update(fresh)
+
+    return [
+        {'period': period.date() if bucket == 'day' else period, 'free': free}
+        for day in days
+        for period, free in counts[day]
+    ]
@@ -0,0 +1,209 @@
+"""
+iCalendar (.ics) feeds of appointments, one per provider and one per user.
+
+Feeds are addressed by a signed token instead of a login, so calendar apps
+can poll them. The token carries the owner's CalendarFeedSecret for that
+feed; rotating the secret revokes every token issued before. The rendered
+body is cached per owner and version; the version is bumped whenever one
+of the owner's appointments (or the slot behind it) changes, and doubles
+as the feed's ETag.
+"""
+import secrets
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from appointments.models import Appointment, CalendarFeedSecret
+from Qtime import versioning
+
+FEED_KINDS = ('provider', 'user')
+TOKEN_SALT = 'appointments.calendar_feed'
+
+
+def get_secret_cache_key(kind: str, owner_id: int) -> str:
+    """
+    Construct cache key for the current feed secret of an owner.
+    """
+    return f"calendar_feed_secret:{kind}:{owner_id}"
+
+
+def get_secret(kind: str, owner_id: int) -> str | None:
+    """
+    Read-through cache for the owner's feed secret; None if none was issued.
+    Polls check it on every request, so they stay off the database.
+    """
+    key = get_secret_cache_key(kind, owner_id)
+    secret = cache.get(key)
+    if secret is None:
+        secret = CalendarFeedSecret.objects.filter(user_id=owner_id, kind=kind).values_list('secret', flat=True).first()
+        if secret is not None:
+            cache.set(key, secret, timeout=settings.CALENDAR_FEED_CACHE_SECONDS)
+    return secret
+
+
+def get_feed_token(kind: str, owner_id: int) -> str:
+    """
+    Signed, URL-safe token naming one feed, under the owner's current secret.
+    """
+    secret = get_secret(kind, owner_id)
+    if secret is None:
+        secret = CalendarFeedSecret.objects.get_or_create(
+            user_id=owner_id, kind=kind, defaults={'secret': secrets.token_urlsafe(16)}
+        )[0].secret
+    return signing.dumps([kind, owner_id, secret], salt=TOKEN_SALT)
+
+
+def rotate_feed_token(kind: str, owner_id: int) -> str:
+    """
+    Replace the owner's feed secret, revoking every earlier token of that
+    feed, and return a token under the new secret.
+    """
+    secret = secrets.token_urlsafe(16)
+    CalendarFeedSecret.objects.update_or_create(user_id=owner_id, kind=kind, defaults={'secret': secret})
+    key = get_secret_cache_key(kind, owner_id)
+    transaction.on_commit(lambda: cache.set(key, secret, timeout=settings.CALENDAR_FEED_CACHE_SECONDS))
+    return signing.dumps([kind, owner_id, secret], salt=TOKEN_SALT)
+
+
+def read_feed_token(token: str) -> tuple[str, int] | None:
+    """
+    Return (kind, owner id) for a valid, unrevoked token, None otherwise.
+    """
+    try:
+        kind, owner_id, secret = signing.loads(token, salt=TOKEN_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if kind not in FEED_KINDS or not isinstance(owner_id, int):
+        return None
+    if not isinstance(secret, str) or not secrets.compare_digest(secret, get_secret(kind, owner_id) or ''):
+        return None
+    return kind, owner_id
+
+
+def get_scope(kind: str, owner_id: int) -> str:
+    return f"calendar_feed:{kind}:{owner_id}"
+
+
+def get_feed_cache_key(kind: str, owner_id: int, version: int) -> str:
+    """
+    Construct cache key for the rendered feed of an owner at a version.
+    """
+    return f"{get_scope(kind, owner_id)}:{version}"
+
+
+def invalidate(provider_ids=(), user_ids=()) -> None:
+    """
+    Bump the feed version of every given provider and user once the current
+    transaction commits, so a poll in between cannot cache the old rows
+    under the new version.
+    """
+    scopes = {get_scope('provider', pk) for pk in provider_ids} | {get_scope('user', pk) for pk in user_ids}
+
+    def bump():
+        for scope in scopes:
+            versioning.bump_version(scope)
+
+    transaction.on_commit(bump)
+
+
+def _escape(value) -> str:
+    return (
+        str(value or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line: str) -> str:
+    # Content lines are limited to 75 octets; continuations start with a space.
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not parts else 74), len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1  # never split a UTF-8 sequence
+        parts.append(encoded[start:end].decode())
+        start = end
+    return '\r\n '.join(parts)
+
+
+def _ics_time(value) -> str:
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_feed(kind: str, owner_id: int, stamp) -> bytes:
+    """
+    Render the owner's appointments from CALENDAR_FEED_PAST_DAYS ago onward.
+    ``stamp`` is used as DTSTAMP so the same version always renders the same bytes.
+    """
+    owner_filter = {'available_time__provider_id': owner_id} if kind == 'provider' else {'user_id': owner_id}
+    since = timezone.now() - timedelta(days=settings.CALENDAR_FEED_PAST_DAYS)
+    rows = Appointment.objects.filter(
+        available_time__start_time__gte=since, **owner_filter
+    ).order_by('available_time__start_time', 'id').values_list(
+        'id',
+        'is_confirmed',
+        'available_time__start_time',
+        'available_time__end_time',
+        'available_time__service__name',
+        'available_time__branch__name',
+        'available_time__branch__location',
+        'available_time__provider__full_name',
+        'user__full_name',
+        'user__phone',
+    )
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Qtime//Appointments//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{_escape('Qtime appointments')}",
+    ]
+    dtstamp = _ics_time(stamp)
+    for pk, is_confirmed, start, end, service, branch, location, provider, user_name, user_phone in rows.iterator(chunk_size=2000):
+        who = f"{user_name or ''} {user_phone}".strip() if kind == 'provider' else provider
+        lines += [
+            'BEGIN:VEVENT',
+            f"UID:appointment-{pk}@qtime",
+            f"DTSTAMP:{dtstamp}",
+            f"DTSTART:{_ics_time(start)}",
+            f"DTEND:{_ics_time(end)}",
+            f"SUMMARY:{_escape(f'{service} - {who}' if who else service)}",
+            f"LOCATION:{_escape(', '.join(part for part in (branch, location) if part))}",
+            f"STATUS:{'CONFIRMED' if is_confirmed else 'TENTATIVE'}",
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(_fold(line) for line in lines) + '\r\n').encode()
+
+
+def get_state(kind: str, owner_id: int) -> tuple[int, float]:
+    """
+    Feed version and last change time, without touching the database.
+    """
+    return versioning.get_state(get_scope(kind, owner_id))
+
+
+def get_feed(kind: str, owner_id: int) -> bytes:
+    """
+    Read-through cache for the rendered feed at its current version.
+    """
+    version, modified = get_state(kind, owner_id)
+    key = get_feed_cache_key(kind, owner_id, version)
+    body = cache.get(key)
+    if body is None:
+        stamp = datetime.fromtimestamp(modified, tz=dt_timezone.utc)
+        body = render_feed(kind, owner_id, stamp)
+        cache.set(key, body, timeout=settings.CALENDAR_FEED_CACHE_SECONDS)
+    return body
@@ -0,0 +1,105 @@
+import csv
+import json
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+
+# Column name -> lookup, joined in the same SELECT so no row is ever loaded as a model.
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'start_time': 'available_time__start_time',
+    'duration_minutes': 'available_time__duration_minutes',
+    'is_confirmed': 'is_confirmed',
+    'user_id': 'user_id',
+    'user_name': 'user__full_name',
+    'user_phone': 'user__phone',
+    'provider_id': 'available_time__provider_id',
+    'provider_name': 'available_time__provider__full_name',
+    'service_id': 'available_time__service_id',
+    'service_name': 'available_time__service__name',
+    'branch_id': 'available_time__branch_id',
+    'branch_name': 'available_time__branch__name',
+}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+class _Echo:
+    """
+    File-like object whose write() returns the value, so csv.writer yields lines.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_rows(queryset: QuerySet, chunk_size: int | None = None) -> Iterator[tuple]:
+    """
+    Stream appointment rows as tuples in EXPORT_COLUMNS order.
+    Rows are fetched ``chunk_size`` at a time, so memory stays flat however many there are.
+    """
+    return queryset.order_by('available_time__start_time', 'id').values_list(
+        *EXPORT_COLUMNS.values()
+    ).iterator(chunk_size=chunk_size or settings.APPOINTMENT_EXPORT_CHUNK_SIZE)
+
+
+def _localized(rows: Iterable[tuple]) -> Iterator[tuple]:
+    start_index = list(EXPORT_COLUMNS).index('start_time')
+    for row in rows:
+        row = list(row)
+        row[start_index] = timezone.localtime(row[start_index]).isoformat()
+        yield row
+
+
+def csv_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Header line followed by one CSV line per row.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in _localized(rows):
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    One JSON object per line.
+    """
+    columns = list(EXPORT_COLUMNS)
+    for row in _localized(rows):
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+
+
+def render(queryset: QuerySet, export_format: str) -> Iterator[str]:
+    """
+    Lines of the export in the given format ('csv' or 'ndjson').
+    """
+    rows = export_rows(queryset)
+    if export_format == 'ndjson':
+        return ndjson_lines(rows)
+    return csv_lines(rows)
+
+
+async def astream(lines: Iterator[str], batch_size: int | None = None) -> AsyncIterator[str]:
+    """
+    Async iterator over ``lines`` for responses served under ASGI, where a
+    sync iterator would be read to the end into memory before sending.
+    Lines are pulled ``batch_size`` at a time in the thread that runs sync
+    code, so the database cursor stays on its connection, and each batch is
+    yielded as one chunk.
+    """
+    batch_size = batch_size or settings.APPOINTMENT_EXPORT_CHUNK_SIZE
+    next_batch = sync_to_async(lambda: "".join(islice(lines, batch_size)), thread_sensitive=True)
+    try:
+        while chunk := await next_batch():
+            yield chunk
+    finally:
+        # Release the cursor if the client went away mid-export.
+        await sync_to_async(lines.close, thread_sensitive=True)()
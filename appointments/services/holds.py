@@ -0,0 +1,113 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from Qtime import versioning
+
+ACTIVE_UNTIL_KEY = "slot_hold:active_until"
+
+
+def get_hold_cache_key(slot_id: int) -> str:
+    """
+    Construct cache key for the hold on a slot.
+    """
+    return f"slot_hold:{slot_id}"
+
+
+def place_hold(slot_id: int, user_id: int, seconds: int | None = None) -> bool:
+    """
+    Hold a slot for a user for ``seconds`` using an atomic add-if-absent.
+    Re-holding a slot the user already holds extends it.
+    Returns False if someone else holds it.
+    """
+    key = get_hold_cache_key(slot_id)
+    seconds = seconds or settings.SLOT_HOLD_SECONDS
+
+    if _add_hold(key, user_id, seconds):
+        return True
+    if cache.get(key) == user_id:
+        if cache.touch(key, timeout=seconds):
+            _held_until(time.time() + seconds)
+            return True
+        # The hold lapsed between get() and touch(); take it afresh.
+        return _add_hold(key, user_id, seconds)
+    return False
+
+
+def _add_hold(key: str, user_id: int, seconds: int) -> bool:
+    if not cache.add(key, user_id, timeout=seconds):
+        return False
+    _held_until(time.time() + seconds)
+    versioning.bump_version('availability')
+    return True
+
+
+def _held_until(expires_at: float) -> None:
+    # Best-effort high-water mark of hold expiry, so read endpoints know when
+    # listings may still change on their own as holds lapse.
+    if expires_at > (cache.get(ACTIVE_UNTIL_KEY) or 0):
+        cache.set(ACTIVE_UNTIL_KEY, expires_at, timeout=settings.SLOT_HOLD_MAX_SECONDS)
+
+
+def holds_active_until() -> float:
+    """
+    Epoch time after which no hold placed so far can still be active.
+    """
+    return cache.get(ACTIVE_UNTIL_KEY) or 0.0
+
+
+def release_hold(slot_id: int, user_id: int) -> bool:
+    """
+    Release a hold owned by the user. Returns False if the user did not hold it.
+
+    The cache API has no compare-and-delete, so if the hold lapses between
+    the get() and the delete() and another user takes the slot in that gap,
+    their hold is deleted. The slot itself stays safe: bookings are decided
+    by the row lock, holds only keep others from trying.
+    """
+    key = get_hold_cache_key(slot_id)
+    if cache.get(key) != user_id:
+        return False
+    cache.delete(key)
+    versioning.bump_version('availability')
+    return True
+
+
+def get_holder(slot_id: int) -> int | None:
+    """
+    Return the id of the user holding the slot, if any.
+    """
+    return cache.get(get_hold_cache_key(slot_id))
+
+
+def is_held_by_other(slot_id: int, user_id: int) -> bool:
+    """
+    Check if someone other than the user holds the slot.
+    """
+    holder = get_holder(slot_id)
+    return holder is not None and holder != user_id
+
+
+def held_by_others(slot_ids, user_id: int) -> set:
+    """
+    Ids among ``slot_ids`` held by someone other than the user, in one cache round trip.
+    """
+    keys = {get_hold_cache_key(slot_id): slot_id for slot_id in slot_ids}
+    return {
+        keys[key]
+        for key, holder in cache.get_many(list(keys)).items()
+        if holder != user_id
+    }
+
+
+async def aheld_by_others(slot_ids, user_id: int) -> set:
+    """
+    Async counterpart of ``held_by_others()``.
+    """
+    keys = {get_hold_cache_key(slot_id): slot_id for slot_id in slot_ids}
+    return {
+        keys[key]
+        for key, holder in (await cache.aget_many(list(keys))).items()
+        if holder != user_id
+    }
@@ -0,0 +1,404 @@
+"""
+Bulk import of slots and appointments from CSV or ICS files.
+
+Every row describes one slot: provider, branch, service, start time and,
+optionally, duration and the user who booked it. Provider, branch, service
+and user keys are resolved through lookup maps loaded once per import, rows
+are written with bulk_create in batches, bad rows are reported instead of
+aborting the run, and a checkpoint written after every committed batch lets
+an interrupted import pick up where it stopped.
+
+CSV columns: provider, branch, service, start_time, duration_minutes, user,
+is_confirmed. Providers and users are matched by id or phone, branches and
+services by id or (case-insensitive) name.
+
+ICS events: DTSTART plus DTEND or DURATION; X-QTIME-PROVIDER, X-QTIME-BRANCH
+(or LOCATION), X-QTIME-SERVICE (or SUMMARY) and optionally ATTENDEE for the
+user (``tel:`` URIs are accepted).
+"""
+import csv
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterator
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import User
+from appointments.models import Appointment, AvailableTime
+from appointments.services import calendar_feed, occupancy
+from branches.models import Branch, Service
+
+DEFAULT_BATCH_SIZE = 2000
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+_AMBIGUOUS = object()
+
+
+class BadRow(Exception):
+    """
+    Raised for a row that cannot be imported; the message goes to the report.
+    """
+
+
+@dataclass
+class ImportRow:
+    line: int
+    raw: dict
+    provider_id: int | None = None
+    branch_id: int | None = None
+    service_id: int | None = None
+    start_time: datetime | None = None
+    duration_minutes: int | None = None
+    user_id: int | None = None
+    is_confirmed: bool = False
+
+
+@dataclass
+class ImportProgress:
+    """
+    Totals so far; also the checkpoint content (``line`` is the last committed input line).
+    """
+    source: str = ''
+    line: int = 0
+    slots: int = 0
+    existing_slots: int = 0
+    appointments: int = 0
+    bad_rows: int = 0
+    providers: list = field(default_factory=list)
+
+
+def read_csv(path: str) -> Iterator[tuple[int, dict]]:
+    """
+    Yield (line number, row) pairs; line numbers count the header as line 1.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+
+
+def _unfolded(handle) -> Iterator[tuple[int, str]]:
+    # RFC 5545 folds long lines; a leading space or tab continues the previous one.
+    pending, pending_line = None, 0
+    for number, line in enumerate(handle, start=1):
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending_line, pending
+        pending, pending_line = line, number
+    if pending is not None:
+        yield pending_line, pending
+
+
+def _ics_datetime(value: str, params: dict) -> datetime:
+    parsed = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    if value.endswith('Z'):
+        return parsed.replace(tzinfo=ZoneInfo('UTC'))
+    if 'TZID' in params:
+        return parsed.replace(tzinfo=ZoneInfo(params['TZID']))
+    return timezone.make_aware(parsed)
+
+
+_DURATION = re.compile(r'^P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?)?$')
+
+
+def _ics_duration_minutes(value: str) -> int:
+    match = _DURATION.match(value)
+    if not match:
+        raise BadRow(f"unsupported DURATION {value!r}")
+    parts = {key: int(number or 0) for key, number in match.groupdict().items()}
+    return parts['days'] * 24 * 60 + parts['hours'] * 60 + parts['minutes']
+
+
+def read_ics(path: str) -> Iterator[tuple[int, dict]]:
+    """
+    Yield (line number of BEGIN:VEVENT, row) pairs with the same keys as CSV rows.
+    Times are already parsed, so DTSTART with TZID and UTC forms both work.
+    """
+    with open(path, encoding='utf-8-sig') as handle:
+        event, event_line = None, 0
+        for number, line in _unfolded(handle):
+            if line == 'BEGIN:VEVENT':
+                event, event_line = {}, number
+                continue
+            if line == 'END:VEVENT' and event is not None:
+                yield event_line, _ics_row(event)
+                event = None
+                continue
+            if event is None or ':' not in line:
+                continue
+            name, value = line.split(':', 1)
+            name, *raw_params = name.split(';')
+            params = dict(param.split('=', 1) for param in raw_params if '=' in param)
+            event[name.upper()] = (value.strip(), params)
+
+
+def _ics_row(event: dict) -> dict:
+    def value(*names):
+        for name in names:
+            if name in event:
+                return event[name][0]
+        return ''
+
+    row = {
+        'provider': value('X-QTIME-PROVIDER'),
+        'branch': value('X-QTIME-BRANCH', 'LOCATION'),
+        'service': value('X-QTIME-SERVICE', 'SUMMARY'),
+        'user': re.sub(r'^(tel|mailto):', '', value('ATTENDEE'), flags=re.IGNORECASE),
+        'is_confirmed': 'true' if value('STATUS').upper() == 'CONFIRMED' else '',
+    }
+    try:
+        if 'DTSTART' in event:
+            row['start_time'] = _ics_datetime(*event['DTSTART'])
+        if 'DTEND' in event and 'DTSTART' in event:
+            row['duration_minutes'] = int((_ics_datetime(*event['DTEND']) - row['start_time']) / timedelta(minutes=1))
+        elif 'DURATION' in event:
+            row['duration_minutes'] = _ics_duration_minutes(event['DURATION'][0])
+    except (ValueError, KeyError, BadRow) as exc:
+        row['error'] = str(exc)
+    return row
+
+
+def _index(pairs) -> dict:
+    """
+    Map each key to its id; keys shared by several rows map to _AMBIGUOUS.
+    """
+    index = {}
+    for key, pk in pairs:
+        if key in (None, ''):
+            continue
+        key = str(key).lower()
+        index[key] = _AMBIGUOUS if key in index and index[key] != pk else pk
+    return index
+
+
+class LookupMaps:
+    """
+    Provider, user, branch and service keys resolved from memory, loaded once per import.
+    Users are only loaded the first time a row names one.
+    """
+
+    def __init__(self) -> None:
+        providers = list(User.objects.filter(role='provider').values_list('pk', 'phone'))
+        self.providers = _index([(pk, pk) for pk, _ in providers] + [(phone, pk) for pk, phone in providers])
+        branches = list(Branch.objects.values_list('pk', 'name'))
+        self.branches = _index([(pk, pk) for pk, _ in branches] + [(name, pk) for pk, name in branches])
+        services = list(Service.objects.values_list('pk', 'name', 'duration_minutes'))
+        self.services = _index([(pk, pk) for pk, _, _ in services] + [(name, pk) for pk, name, _ in services])
+        self.durations = {pk: duration for pk, _, duration in services}
+        self._users = None
+
+    @property
+    def users(self) -> dict:
+        if self._users is None:
+            users = list(User.objects.values_list('pk', 'phone'))
+            self._users = _index([(pk, pk) for pk, _ in users] + [(phone, pk) for pk, phone in users])
+        return self._users
+
+    @staticmethod
+    def _resolve(index: dict, key: str, label: str) -> int:
+        if not key:
+            raise BadRow(f"missing {label}")
+        pk = index.get(key.lower())
+        if pk is None:
+            raise BadRow(f"unknown {label} {key!r}")
+        if pk is _AMBIGUOUS:
+            raise BadRow(f"ambiguous {label} {key!r}")
+        return pk
+
+    def parse(self, line: int, raw: dict) -> ImportRow:
+        """
+        Turn a raw row into an ImportRow or raise BadRow.
+        """
+        if raw.get('error'):
+            raise BadRow(raw['error'])
+
+        row = ImportRow(line=line, raw=raw)
+        row.provider_id = self._resolve(self.providers, raw.get('provider', ''), 'provider')
+        row.branch_id = self._resolve(self.branches, raw.get('branch', ''), 'branch')
+        row.service_id = self._resolve(self.services, raw.get('service', ''), 'service')
+        if raw.get('user'):
+            row.user_id = self._resolve(self.users, raw['user'], 'user')
+        row.is_confirmed = str(raw.get('is_confirmed', '')).lower() in TRUE_VALUES
+
+        start_time = raw.get('start_time')
+        if isinstance(start_time, str):
+            try:
+                start_time = parse_datetime(start_time)
+            except ValueError:
+                start_time = None
+        if start_time is None:
+            raise BadRow(f"invalid start_time {raw.get('start_time')!r}")
+        row.start_time = timezone.make_aware(start_time) if timezone.is_naive(start_time) else start_time
+
+        duration = raw.get('duration_minutes')
+        try:
+            row.duration_minutes = int(duration) if duration not in (None, '') else self.durations[row.service_id]
+        except ValueError:
+            raise BadRow(f"invalid duration_minutes {duration!r}")
+        if row.duration_minutes <= 0:
+            raise BadRow(f"invalid duration_minutes {duration!r}")
+        return row
+
+
+class Importer:
+    """
+    Import rows in batches of ``batch_size``. Each batch is one transaction:
+    slots are inserted with one bulk_create (existing provider/start pairs are
+    left alone), their ids read back with one range query, and appointments
+    inserted with another bulk_create. Bad rows go to ``errors_path`` and the
+    checkpoint at ``checkpoint_path`` is rewritten after each commit.
+    """
+
+    def __init__(self, source: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 checkpoint_path: str | None = None, errors_path: str | None = None) -> None:
+        self.source = os.path.abspath(source)
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.errors_path = errors_path
+        self.progress = ImportProgress(source=self.source)
+        self._bad = []
+        self._providers = set()
+
+    def load_checkpoint(self) -> bool:
+        """
+        Resume from the checkpoint if it belongs to this source. Returns True if it did.
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path) as handle:
+            saved = ImportProgress(**json.load(handle))
+        if saved.source != self.source:
+            return False
+        self.progress = saved
+        self._providers = set(saved.providers)
+        return True
+
+    def run(self, rows) -> ImportProgress:
+        lookups = LookupMaps()
+        batch = []
+        for line, raw in rows:
+            if line <= self.progress.line:
+                continue
+            try:
+                batch.append(lookups.parse(line, raw))
+            except BadRow as exc:
+                self._bad.append((line, str(exc), raw))
+            if len(batch) + len(self._bad) >= self.batch_size:
+                self._flush(batch, line)
+                batch = []
+        self._flush(batch, None)
+
+        if self._providers:
+            # Historical bookings bypass the booking engine; recompute their bitmaps.
+            occupancy.rebuild(provider_ids=sorted(self._providers))
+        return self.progress
+
+    def _flush(self, batch: list[ImportRow], last_line: int | None) -> None:
+        if batch:
+            with transaction.atomic():
+                self._write(batch)
+        if last_line is None:
+            last_line = max([row.line for row in batch] + [line for line, _, _ in self._bad] + [self.progress.line])
+        self.progress.line = last_line
+        self._report_bad()
+        self._save_checkpoint()
+
+    def _write(self, batch: list[ImportRow]) -> None:
+        provider_ids = {row.provider_id for row in batch}
+        lower = min(row.start_time for row in batch)
+        upper = max(row.start_time for row in batch)
+
+        def slots_in_range():
+            return {
+                (provider_id, start_time): (pk, is_booked)
+                for pk, provider_id, start_time, is_booked in AvailableTime.objects.filter(
+                    provider_id__in=provider_ids, start_time__gte=lower, start_time__lte=upper
+                ).order_by().values_list('pk', 'provider_id', 'start_time', 'is_booked')
+            }
+
+        existing = slots_in_range()
+        new_slots, seen = [], set()
+        for row in batch:
+            key = (row.provider_id, row.start_time)
+            if key in existing or key in seen:
+                self.progress.existing_slots += 1
+                continue
+            seen.add(key)
+            new_slots.append(AvailableTime(
+                provider_id=row.provider_id,
+                branch_id=row.branch_id,
+                service_id=row.service_id,
+                start_time=row.start_time,
+                duration_minutes=row.duration_minutes,
+                is_booked=row.user_id is not None,
+            ))
+        if new_slots:
+            AvailableTime.objects.bulk_create(new_slots, batch_size=self.batch_size, ignore_conflicts=True)
+            self.progress.slots += len(new_slots)
+
+        booked_rows = [row for row in batch if row.user_id is not None]
+        if not booked_rows:
+            return
+
+        slots = slots_in_range() if new_slots else existing
+        slot_ids = {slots[row.provider_id, row.start_time][0] for row in booked_rows}
+        taken = dict(
+            Appointment.objects.filter(available_time_id__in=slot_ids).values_list('available_time_id', 'user_id')
+        )
+
+        appointments = []
+        for row in booked_rows:
+            slot_id = slots[row.provider_id, row.start_time][0]
+            if slot_id in taken:
+                # The same booking imported again is fine; a second user is not.
+                if taken[slot_id] != row.user_id:
+                    self._bad.append((row.line, "slot already has an appointment", row.raw))
+                continue
+            taken[slot_id] = row.user_id
+            appointments.append(Appointment(user_id=row.user_id, available_time_id=slot_id, is_confirmed=row.is_confirmed))
+            self._providers.add(row.provider_id)
+        if not appointments:
+            return
+
+        Appointment.objects.bulk_create(appointments, batch_size=self.batch_size)
+        self.progress.appointments += len(appointments)
+        calendar_feed.invalidate(
+            provider_ids=[row.provider_id for row in booked_rows],
+            user_ids=[appointment.user_id for appointment in appointments],
+        )
+        AvailableTime.objects.filter(
+            pk__in=[appointment.available_time_id for appointment in appointments], is_booked=False
+        ).update(is_booked=True)
+
+    def _report_bad(self) -> None:
+        if not self._bad:
+            return
+        self.progress.bad_rows += len(self._bad)
+        if self.errors_path:
+            new_file = not os.path.exists(self.errors_path)
+            with open(self.errors_path, 'a', newline='', encoding='utf-8') as handle:
+                writer = csv.writer(handle)
+                if new_file:
+                    writer.writerow(['line', 'error', 'row'])
+                for line, error, raw in self._bad:
+                    writer.writerow([line, error, json.dumps(raw, default=str, ensure_ascii=False)])
+        self._bad = []
+
+    def _save_checkpoint(self) -> None:
+        if not self.checkpoint_path:
+            return
+        self.progress.providers = sorted(self._providers)
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, 'w') as handle:
+            json.dump(asdict(self.progress), handle)
+        # Atomic on POSIX, so a crash never leaves a half-written checkpoint.
+        os.replace(temporary, self.checkpoint_path)
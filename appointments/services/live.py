@@ -0,0 +1,106 @@
+"""
+Live availability deltas, one pub/sub channel per (branch, service, local date).
+
+A client opens the stream for a channel, receives a snapshot of the free
+slots once and from then on only small deltas:
+
+- ``booked``: ``{"id": ...}``; the slot is no longer free.
+- ``released``, ``created``, ``updated``: the slot as AvailableTimeSerializer
+  renders it; insert or replace it (drop it if ``is_booked``).
+- ``removed``: ``{"id": ...}``; the slot was deleted.
+
+Deltas are published after the change commits, and only built for channels
+that have subscribers. Bulk edits made with QuerySet.update()/bulk_update()
+outside the booking engine are not pushed; clients pick them up with the
+snapshot when they reconnect.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from appointments.models import AvailableTime
+from appointments.services import holds
+from Qtime.pubsub import get_broker, publish_on_commit
+
+# Deltas that carry only the slot id; the others carry the rendered slot.
+ID_EVENTS = ('booked', 'removed')
+
+
+def get_channel(branch_id: int, service_id: int, day: date) -> str:
+    return f"slots:{branch_id}:{service_id}:{day.isoformat()}"
+
+
+def _channel_of(slot) -> str:
+    return get_channel(slot.branch_id, slot.service_id, timezone.localtime(slot.start_time).date())
+
+
+def publish(event: str, slots) -> None:
+    """
+    Queue an ``event`` delta for each slot on its channel once the current
+    transaction commits. ``slots`` only need id, branch_id, service_id and
+    start_time loaded.
+    """
+    broker = get_broker()
+    by_channel = defaultdict(list)
+    for slot in slots:
+        channel = _channel_of(slot)
+        if slot.pk is not None and broker.has_subscribers(channel):
+            by_channel[channel].append(slot.pk)
+    if not by_channel:
+        return
+
+    if event in ID_EVENTS:
+        for channel, slot_ids in by_channel.items():
+            for slot_id in slot_ids:
+                publish_on_commit(channel, {'event': event, 'data': {'id': slot_id}})
+        return
+
+    def send():
+        from appointments.serializers import AvailableTimeSerializer
+
+        rendered = {
+            slot.pk: AvailableTimeSerializer(slot).data
+            for slot in AvailableTime.objects.select_related('provider', 'service', 'branch').filter(
+                pk__in=[slot_id for slot_ids in by_channel.values() for slot_id in slot_ids]
+            )
+        }
+        for channel, slot_ids in by_channel.items():
+            for slot_id in slot_ids:
+                if slot_id in rendered:
+                    broker.publish(channel, {'event': event, 'data': rendered[slot_id]})
+
+    # The rows are read after commit, so deltas carry the committed state.
+    transaction.on_commit(send)
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def snapshot(branch_id: int, service_id: int, day: date, user_id: int | None) -> list[dict]:
+    """
+    Free slots of a channel as AvailableTimeListView would list them.
+    """
+    from appointments.serializers import AvailableTimeSerializer
+
+    start, end = day_bounds(day)
+    if settings.AVAILABILITY_MODE == 'virtual':
+        from appointments.services.availability import virtual_available_times
+
+        slots = virtual_available_times(branch=branch_id, service=service_id, start=start, end=end)
+    else:
+        slots = list(
+            AvailableTime.objects.filter(
+                is_booked=False,
+                branch_id=branch_id,
+                service_id=service_id,
+                start_time__gte=start,
+                start_time__lt=end,
+            ).select_related('provider', 'service', 'branch').order_by('start_time', 'id')
+        )
+    held = holds.held_by_others([slot.pk for slot in slots if slot.pk], user_id)
+    return AvailableTimeSerializer([slot for slot in slots if slot.pk not in held], many=True).data
@@ -0,0 +1,173 @@
+"""
+Per-provider-day occupancy bitmaps.
+
+Each local day is 288 five-minute blocks; bit ``n`` is set when block ``n``
+is booked. Consecutive days are concatenated into one Python int so range
+checks are plain bit operations, including across midnight.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from appointments.models import AvailableTime, ProviderDayOccupancy
+
+GRANULARITY_MINUTES = 5
+BLOCKS_PER_DAY = 24 * 60 // GRANULARITY_MINUTES
+BYTES_PER_DAY = BLOCKS_PER_DAY // 8
+DAY_MASK = (1 << BLOCKS_PER_DAY) - 1
+
+
+def _to_int(bits: bytes) -> int:
+    return int.from_bytes(bytes(bits), 'little')
+
+
+def _to_bytes(value: int) -> bytes:
+    return value.to_bytes(BYTES_PER_DAY, 'little')
+
+
+def _block_range(start: datetime, duration_minutes: int) -> tuple[date, int, int]:
+    """
+    First local day touched and the [first, last) block offsets from its
+    midnight. Unaligned edges are widened to whole blocks.
+    """
+    local = timezone.localtime(start)
+    day = local.date()
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    offset_minutes = (local - midnight).total_seconds() / 60
+
+    first = int(offset_minutes // GRANULARITY_MINUTES)
+    last = -int(-(offset_minutes + duration_minutes) // GRANULARITY_MINUTES)
+    return day, first, last
+
+
+def _days(first_day: date, last_block: int) -> list[date]:
+    return [first_day + timedelta(days=n) for n in range((last_block - 1) // BLOCKS_PER_DAY + 1)]
+
+
+def _mask(first: int, last: int) -> int:
+    return ((1 << (last - first)) - 1) << first
+
+
+def load(provider_id: int, days: list[date]) -> int:
+    """
+    Concatenate the provider's bitmaps for consecutive ``days`` into one int.
+    Days without a row are treated as fully free.
+    """
+    rows = dict(
+        ProviderDayOccupancy.objects.filter(provider_id=provider_id, day__in=days).values_list('day', 'bits')
+    )
+    value = 0
+    for index, day in enumerate(days):
+        if day in rows:
+            value |= _to_int(rows[day]) << (index * BLOCKS_PER_DAY)
+    return value
+
+
+def is_free(provider_id: int, start: datetime, duration_minutes: int) -> bool:
+    """
+    Check whether [start, start + duration) is free for the provider. One query.
+    """
+    day, first, last = _block_range(start, duration_minutes)
+    return not load(provider_id, _days(day, last)) & _mask(first, last)
+
+
+def _locked_rows(provider_id: int, days: list[date], create: bool = True) -> dict:
+    rows = {
+        row.day: row
+        for row in ProviderDayOccupancy.objects.select_for_update().filter(provider_id=provider_id, day__in=days)
+    }
+    missing = [day for day in days if day not in rows]
+    if missing and create:
+        ProviderDayOccupancy.objects.bulk_create(
+            [ProviderDayOccupancy(provider_id=provider_id, day=day) for day in missing],
+            ignore_conflicts=True
+        )
+        rows.update(
+            (row.day, row)
+            for row in ProviderDayOccupancy.objects.select_for_update().filter(provider_id=provider_id, day__in=missing)
+        )
+    return rows
+
+
+def _apply(provider_id: int, start: datetime, duration_minutes: int, occupy: bool) -> bool:
+    day, first, last = _block_range(start, duration_minutes)
+    days = _days(day, last)
+    mask = _mask(first, last)
+
+    with transaction.atomic():
+        # A day without a row is free, so releasing never creates one (nor
+        # recreates rows deleted along with their provider).
+        rows = _locked_rows(provider_id, days, create=occupy)
+        current = 0
+        for index, row_day in enumerate(days):
+            if row_day in rows:
+                current |= _to_int(rows[row_day].bits) << (index * BLOCKS_PER_DAY)
+
+        if occupy and current & mask:
+            return False
+        updated = current | mask if occupy else current & ~mask
+
+        for index, row_day in enumerate(days):
+            if row_day in rows:
+                rows[row_day].bits = _to_bytes((updated >> (index * BLOCKS_PER_DAY)) & DAY_MASK)
+        ProviderDayOccupancy.objects.bulk_update(list(rows.values()), ['bits'])
+    return True
+
+
+def occupy(provider_id: int, start: datetime, duration_minutes: int) -> bool:
+    """
+    Mark [start, start + duration) as booked if it is entirely free.
+    Locks the provider's day rows; call it inside the booking transaction.
+    Returns False, changing nothing, if any part is already taken.
+    """
+    return _apply(provider_id, start, duration_minutes, occupy=True)
+
+
+def release(provider_id: int, start: datetime, duration_minutes: int) -> None:
+    """
+    Mark [start, start + duration) as free again. Deleting an appointment
+    (or a booked slot) calls this from a post_delete handler.
+    """
+    _apply(provider_id, start, duration_minutes, occupy=False)
+
+
+def rebuild(provider_ids=None, since: date | None = None) -> int:
+    """
+    Recompute bitmaps from booked AvailableTime rows (and slots that carry an
+    appointment). Returns the number of provider-days written.
+    """
+    slots = AvailableTime.objects.filter(
+        Q(is_booked=True) | Q(appointment__isnull=False)
+    ).order_by().values_list('provider_id', 'start_time', 'duration_minutes').distinct()
+    if provider_ids is not None:
+        slots = slots.filter(provider_id__in=provider_ids)
+    if since is not None:
+        slots = slots.filter(end_time__gte=timezone.make_aware(datetime.combine(since, time.min)))
+
+    bitmaps = defaultdict(int)
+    for provider_id, start_time, duration_minutes in slots.iterator(chunk_size=5000):
+        day, first, last = _block_range(start_time, duration_minutes)
+        mask = _mask(first, last)
+        for index, row_day in enumerate(_days(day, last)):
+            bitmaps[provider_id, row_day] |= (mask >> (index * BLOCKS_PER_DAY)) & DAY_MASK
+
+    with transaction.atomic():
+        stale = ProviderDayOccupancy.objects.all()
+        if provider_ids is not None:
+            stale = stale.filter(provider_id__in=provider_ids)
+        if since is not None:
+            stale = stale.filter(day__gte=since)
+        stale.delete()
+
+        ProviderDayOccupancy.objects.bulk_create(
+            (
+                ProviderDayOccupancy(provider_id=provider_id, day=day, bits=_to_bytes(value))
+                for (provider_id, day), value in bitmaps.items()
+                if since is None or day >= since
+            ),
+            batch_size=5000
+        )
+    return len(bitmaps)
@@ -0,0 +1,111 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.utils import timezone
+
+from appointments.models import AvailableTime, ScheduleException, ScheduleTemplate
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _local_datetime(day: date, at) -> datetime:
+    return timezone.make_aware(datetime.combine(day, at))
+
+
+def _exceptions_by_date(start_date: date, end_date: date) -> dict:
+    exceptions = defaultdict(list)
+    for exception in ScheduleException.objects.filter(date__gte=start_date, date__lt=end_date):
+        exceptions[exception.date].append(exception)
+    return exceptions
+
+
+def _slots_in_range(provider_ids: set, start_date: date, end_date: date):
+    """
+    Slots of the providers in the range; re-runs only submit what is missing.
+    """
+    return AvailableTime.objects.filter(
+        provider_id__in=provider_ids,
+        start_time__gte=_local_datetime(start_date, datetime.min.time()),
+        start_time__lt=_local_datetime(end_date, datetime.min.time()),
+    ).order_by()
+
+
+def iter_template_slots(templates, start_date: date, end_date: date, exceptions: dict):
+    """
+    Yield unsaved AvailableTime rows for every template occurrence in
+    [start_date, end_date), skipping exceptions and holidays.
+    """
+    tz = timezone.get_current_timezone()
+
+    for offset in range((end_date - start_date).days):
+        day = start_date + timedelta(days=offset)
+        day_exceptions = exceptions.get(day, ())
+
+        for template in templates:
+            if not template.is_valid_on(day):
+                continue
+
+            duration = template.service.duration_minutes
+            step = timedelta(minutes=duration)
+            slot_start = datetime.combine(day, template.start_time)
+            window_end = datetime.combine(day, template.end_time)
+
+            while slot_start + step <= window_end:
+                slot_end = slot_start + step
+                blocked = any(
+                    exception.applies_to(template.provider_id, template.branch_id)
+                    and exception.blocks(slot_start.time(), slot_end.time())
+                    for exception in day_exceptions
+                )
+                if not blocked:
+                    yield AvailableTime(
+                        provider_id=template.provider_id,
+                        service_id=template.service_id,
+                        branch_id=template.branch_id,
+                        start_time=slot_start.replace(tzinfo=tz),
+                        duration_minutes=duration,
+                    )
+                slot_start = slot_end
+
+
+def generate_slots(
+    start_date: date,
+    weeks: int,
+    templates=None,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """
+    Materialize AvailableTime rows from active schedule templates for the
+    given number of weeks. Existing slots are left untouched, so running it
+    again only fills the gaps. Returns the number of rows created.
+    """
+    if templates is None:
+        templates = ScheduleTemplate.objects.filter(is_active=True)
+    # Duration comes from the service; load it once instead of once per slot.
+    templates = list(templates.select_related('service'))
+    if not templates:
+        return 0
+
+    end_date = start_date + timedelta(weeks=weeks)
+    exceptions = _exceptions_by_date(start_date, end_date)
+    in_range = _slots_in_range({t.provider_id for t in templates}, start_date, end_date)
+    existing = set(in_range.values_list('provider_id', 'start_time'))
+    before = len(existing)
+
+    batch = []
+    for slot in iter_template_slots(templates, start_date, end_date, exceptions):
+        key = (slot.provider_id, slot.start_time)
+        if key in existing:
+            continue
+        existing.add(key)
+        batch.append(slot)
+
+        if len(batch) >= batch_size:
+            AvailableTime.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    if batch:
+        AvailableTime.objects.bulk_create(batch, ignore_conflicts=True)
+
+    # bulk_create(ignore_conflicts=True) does not report skipped rows; count instead.
+    return in_range.count() - before
@@ -0,0 +1,38 @@
+from django.utils import timezone
+
+from appointments.models import AvailableTime
+
+
+def nearest_free_slots(
+    provider: 'accounts.User',
+    service: 'branches.Service',
+    branch: 'branches.Branch',
+    start_time,
+    limit: int = 5,
+    other_providers: bool = False
+) -> list[AvailableTime]:
+    """
+    Return up to ``limit`` free slots closest to ``start_time``, looking both
+    before (but not in the past) and after it, ordered by start time.
+
+    Each side is a single ORDER BY start_time ... LIMIT query on the
+    (provider, is_booked, start_time) index, or on (branch, service, start_time)
+    when ``other_providers`` widens the search to everyone at the branch
+    offering the service.
+    """
+    slots = AvailableTime.objects.filter(
+        service=service,
+        branch=branch,
+        is_booked=False
+    ).select_related('provider', 'service', 'branch')
+    if not other_providers:
+        slots = slots.filter(provider=provider)
+
+    after = list(slots.filter(start_time__gte=start_time).order_by('start_time', 'id')[:limit])
+    before = list(
+        slots.filter(start_time__lt=start_time, start_time__gte=timezone.now())
+        .order_by('-start_time', '-id')[:limit]
+    )
+
+    nearest = sorted(before + after, key=lambda slot: (abs(slot.start_time - start_time), slot.start_time))[:limit]
+    return sorted(nearest, key=lambda slot: (slot.start_time, slot.pk))
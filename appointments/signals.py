@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from Qtime import versioning
+from .services import calendar, calendar_feed, live, occupancy
+
+# Sent after bulk writes to AvailableTime with ``days``: the local dates
+# whose slots were created, changed or removed.
+slots_changed = Signal()
+
+
+def local_days(start_times) -> set:
+    return {timezone.localtime(start_time).date() for start_time in start_times if start_time is not None}
+
+
+def invalidate_availability() -> None:
+    # After commit, like the calendar and feed versions: a listing requested
+    # before then would cache the old rows under the new version.
+    transaction.on_commit(lambda: versioning.bump_version('availability'))
+
+
+@receiver(slots_changed)
+def invalidate_calendar_on_bulk_change(sender, days, **kwargs):
+    calendar.invalidate(days)
+    invalidate_availability()
+
+
+@receiver(post_save, sender='appointments.AvailableTime')
+@receiver(post_delete, sender='appointments.AvailableTime')
+def invalidate_calendar_on_slot_change(sender, instance, **kwargs):
+    calendar.invalidate(local_days([instance.start_time]))
+    invalidate_availability()
+
+
+@receiver(post_save, sender='appointments.ScheduleTemplate')
+@receiver(post_delete, sender='appointments.ScheduleTemplate')
+@receiver(post_save, sender='appointments.ScheduleException')
+@receiver(post_delete, sender='appointments.ScheduleException')
+def invalidate_availability_on_schedule_change(sender, **kwargs):
+    # Virtual availability is computed from templates and exceptions.
+    invalidate_availability()
+
+
+@receiver(post_save, sender='accounts.User')
+def invalidate_availability_on_provider_change(sender, instance, update_fields=None, **kwargs):
+    # Listings show the provider's name; logins only touch last_login.
+    if instance.role == 'provider' and update_fields != frozenset({'last_login'}):
+        invalidate_availability()
+
+
+def _slot_timing(appointment) -> tuple | None:
+    """
+    (provider_id, start_time, duration_minutes) of the appointment's slot.
+    """
+    if 'available_time' in appointment._state.fields_cache:
+        slot = appointment.available_time
+        return slot.provider_id, slot.start_time, slot.duration_minutes
+    from .models import AvailableTime
+    return AvailableTime.objects.filter(pk=appointment.available_time_id).values_list(
+        'provider_id', 'start_time', 'duration_minutes'
+    ).first()
+
+
+@receiver(post_save, sender='appointments.Appointment')
+@receiver(post_delete, sender='appointments.Appointment')
+def invalidate_feeds_on_appointment_change(sender, instance, **kwargs):
+    timing = _slot_timing(instance)
+    calendar_feed.invalidate(provider_ids=[timing[0]] if timing else [], user_ids=[instance.user_id])
+
+
+@receiver(post_delete, sender='appointments.Appointment')
+def release_occupancy_on_appointment_delete(sender, instance, **kwargs):
+    # Every delete path frees the provider's time: BookingEngine.cancel, the
+    # admin, queryset.delete() and cascades from a deleted slot or user.
+    timing = _slot_timing(instance)
+    if timing:
+        occupancy.release(*timing)
+
+
+@receiver(post_delete, sender='appointments.AvailableTime')
+def release_occupancy_on_slot_delete(sender, instance, **kwargs):
+    if instance.is_booked:
+        occupancy.release(instance.provider_id, instance.start_time, instance.duration_minutes)
+
+
+@receiver(post_save, sender='appointments.AvailableTime')
+def invalidate_feeds_on_slot_edit(sender, instance, created, **kwargs):
+    # A booked slot that moves or changes length moves its appointment too.
+    if created or not instance.is_booked:
+        return
+    user_ids = instance.appointment_set.values_list('user_id', flat=True)
+    calendar_feed.invalidate(provider_ids=[instance.provider_id], user_ids=list(user_ids))
+
+
+@receiver(post_save, sender='appointments.AvailableTime')
+def push_slot_change(sender, instance, created, **kwargs):
+    live.publish('created' if created else 'updated', [instance])
+
+
+@receiver(post_delete, sender='appointments.AvailableTime')
+def push_slot_removal(sender, instance, **kwargs):
+    live.publish('removed', [instance])
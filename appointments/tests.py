@@ -1,3 +1,964 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import itertools
+import json
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from appointments import views
+from appointments.models import Appointment, AvailableTime, ScheduleException, ScheduleTemplate
+from appointments.serializers import AvailableTimeSerializer
+from appointments.services import holds, occupancy
+from appointments.services.booking import SlotUnavailable, booking_engine
+from appointments.services.importer import Importer, read_csv, read_ics
+from appointments.services.schedule import generate_slots
+from branches.models import Branch, Service
+from notifications.models import OutboxEvent
+from Qtime import schema, versioning
+from Qtime.checks import check_shared_cache
+from Qtime.fast_serializers import get_fast_serializer
+from Qtime.middleware import CompressionMiddleware
+from Qtime.pubsub import InMemoryBroker, get_broker
+from Qtime.query_budget import QueryBudgetTestMixin
+from Qtime.renderers import FastJSONRenderer
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        branch = Branch.objects.create(name="Main")
+        service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        self.provider = User.objects.create_user(phone='09120000100', role='provider')
+        self.user = User.objects.create_user(phone='09120000001')
+        self.rival = User.objects.create_user(phone='09120000002')
+        self.start = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        self.slot = AvailableTime.objects.create(
+            provider=self.provider, service=service, branch=branch, start_time=self.start, duration_minutes=30
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        booking_engine.reset_stats()
+
+    def assertStats(self, succeeded, lost_race):
+        stats = booking_engine.stats()
+        self.assertEqual((stats.succeeded, stats.lost_race), (succeeded, lost_race))
+
+    def assertNothingBooked(self):
+        self.assertFalse(AvailableTime.objects.get(pk=self.slot.pk).is_booked)
+        self.assertFalse(Appointment.objects.exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertTrue(occupancy.is_free(self.provider.pk, self.start, 30))
+
+    def test_booking_is_won(self):
+        response = self.client.post('/api/appointments/', {'available_time': self.slot.pk}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        appointment = Appointment.objects.get()
+        self.assertEqual((appointment.user, appointment.available_time_id), (self.user, self.slot.pk))
+        self.assertTrue(AvailableTime.objects.get(pk=self.slot.pk).is_booked)
+        self.assertFalse(occupancy.is_free(self.provider.pk, self.start, 30))
+        self.assertEqual(OutboxEvent.objects.get().event_type, OutboxEvent.BOOKED)
+        self.assertStats(1, 0)
+
+    def test_booked_slot_is_409(self):
+        booking_engine.book(self.rival, self.slot.pk)
+
+        response = self.client.post('/api/appointments/', {'available_time': self.slot.pk}, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        with self.assertRaises(SlotUnavailable):
+            booking_engine.book(self.user, self.slot.pk)
+        self.assertStats(1, 1)
+        self.assertEqual(Appointment.objects.get().user, self.rival)
+
+    def test_stale_slot_loses_the_update(self):
+        stale = AvailableTime.objects.get(pk=self.slot.pk)
+        booking_engine.book(self.rival, self.slot.pk)
+        self.assertFalse(stale.is_booked)
+
+        with self.assertRaises(SlotUnavailable):
+            booking_engine.book(self.user, stale)
+        self.assertStats(1, 1)
+        self.assertEqual(Appointment.objects.get().user, self.rival)
+
+    def test_stale_slot_in_the_serializer_is_409(self):
+        # The serializer saw the slot free; the booking's UPDATE finds it taken.
+        with mock.patch('appointments.serializers.AppointmentSerializer.validate_available_time', lambda self, value: value):
+            booking_engine.book(self.rival, self.slot.pk)
+            response = self.client.post('/api/appointments/', {'available_time': self.slot.pk}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertStats(1, 1)
+
+    def test_failed_insert_rolls_the_slot_back(self):
+        with mock.patch('appointments.services.booking.Appointment.objects.create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                booking_engine.book(self.user, self.slot.pk)
+        self.assertNothingBooked()
+
+    def test_failed_outbox_write_rolls_the_booking_back(self):
+        with mock.patch('appointments.services.booking.outbox.record', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                booking_engine.book(self.user, self.slot.pk)
+        self.assertNothingBooked()
+        booking_engine.book(self.user, self.slot.pk)
+
+
+class BatchBookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        branch = Branch.objects.create(name="Main")
+        service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        self.provider = User.objects.create_user(phone='09120000100', role='provider')
+        self.user = User.objects.create_user(phone='09120000001')
+        self.rival = User.objects.create_user(phone='09120000002')
+        start = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        self.free, self.taken, self.overlapping, self.other = AvailableTime.objects.bulk_create(
+            AvailableTime(provider=self.provider, service=service, branch=branch, start_time=start + offset, duration_minutes=30)
+            for offset in (timedelta(0), timedelta(hours=1), timedelta(minutes=10), timedelta(hours=2))
+        )
+        booking_engine.book(self.rival, self.taken.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(cache.clear)
+
+    def batch(self, slot_ids, all_or_nothing=True):
+        return self.client.post('/api/appointments/batch/', {
+            'available_times': slot_ids,
+            'all_or_nothing': all_or_nothing,
+        }, format='json')
+
+    def statuses(self, response):
+        return [(result['available_time'], result['status']) for result in response.json()['results']]
+
+    def assertBooked(self, *slots):
+        booked = set(AvailableTime.objects.filter(is_booked=True).values_list('pk', flat=True))
+        self.assertEqual(booked, {self.taken.pk, *(slot.pk for slot in slots)})
+
+    def test_all_booked(self):
+        response = self.batch([self.free.pk, self.other.pk])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.statuses(response), [(self.free.pk, 'booked'), (self.other.pk, 'booked')])
+        self.assertEqual(response.json()['results'][0]['appointment']['available_time'], self.free.pk)
+        self.assertBooked(self.free, self.other)
+
+    def test_failure_rolls_the_batch_back(self):
+        response = self.batch([self.free.pk, self.taken.pk, 999999])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.statuses(response), [
+            (self.free.pk, 'rolled_back'), (self.taken.pk, 'already_booked'), (999999, 'not_found'),
+        ])
+        self.assertFalse(AvailableTime.objects.get(pk=self.free.pk).is_booked)
+        self.assertFalse(Appointment.objects.filter(user=self.user).exists())
+        self.assertTrue(occupancy.is_free(self.provider.pk, self.free.start_time, 30))
+        self.assertBooked()
+
+    def test_overlap_rolls_the_batch_back(self):
+        response = self.batch([self.free.pk, self.overlapping.pk])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.statuses(response), [(self.free.pk, 'rolled_back'), (self.overlapping.pk, 'overlaps')])
+        self.assertBooked()
+
+    def test_held_slot_skips_the_batch(self):
+        holds.place_hold(self.other.pk, self.rival.pk, 60)
+
+        response = self.batch([self.free.pk, self.other.pk])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.statuses(response), [(self.free.pk, 'skipped'), (self.other.pk, 'held')])
+        self.assertBooked()
+
+    def test_best_effort_books_what_is_free(self):
+        holds.place_hold(self.other.pk, self.rival.pk, 60)
+
+        response = self.batch(
+            [self.free.pk, self.free.pk, self.taken.pk, self.overlapping.pk, self.other.pk, 999999],
+            all_or_nothing=False,
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.statuses(response), [
+            (self.free.pk, 'booked'),
+            (self.free.pk, 'duplicate'),
+            (self.taken.pk, 'already_booked'),
+            (self.overlapping.pk, 'overlaps'),
+            (self.other.pk, 'held'),
+            (999999, 'not_found'),
+        ])
+        self.assertEqual(Appointment.objects.get(user=self.user).available_time_id, self.free.pk)
+        self.assertBooked(self.free)
+
+    def test_best_effort_with_nothing_free_is_409(self):
+        response = self.batch([self.taken.pk], all_or_nothing=False)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.statuses(response), [(self.taken.pk, 'already_booked')])
+
+
+class HoldTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        branch = Branch.objects.create(name="Main")
+        service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        provider = User.objects.create_user(phone='09120000100', role='provider')
+        self.user = User.objects.create_user(phone='09120000001')
+        self.rival = User.objects.create_user(phone='09120000002')
+        self.slot = AvailableTime.objects.create(
+            provider=provider, service=service, branch=branch,
+            start_time=timezone.now().replace(second=0, microsecond=0) + timedelta(days=1), duration_minutes=30
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        holds.place_hold(self.slot.pk, self.rival.pk, 60)
+        self.addCleanup(cache.clear)
+
+    def listed(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return [slot['id'] for slot in client.get('/api/available-times/').json()['results']]
+
+    def test_conflicting_hold_is_refused(self):
+        self.assertFalse(holds.place_hold(self.slot.pk, self.user.pk, 60))
+        self.assertFalse(holds.release_hold(self.slot.pk, self.user.pk))
+        self.assertEqual(holds.get_holder(self.slot.pk), self.rival.pk)
+
+        response = self.client.post(f'/api/available-times/{self.slot.pk}/hold/', {'seconds': 60}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['detail'], views.SlotHeld.default_detail)
+
+    def test_holder_extends_the_hold(self):
+        self.assertTrue(holds.place_hold(self.slot.pk, self.rival.pk, 60))
+        self.assertEqual(holds.get_holder(self.slot.pk), self.rival.pk)
+
+    def test_hold_lapsed_before_touch_is_taken_again(self):
+        def lapse(key, timeout):
+            cache.delete(key)
+            return False
+
+        with mock.patch.object(cache, 'touch', side_effect=lapse):
+            self.assertTrue(holds.place_hold(self.slot.pk, self.rival.pk, 60))
+        self.assertEqual(holds.get_holder(self.slot.pk), self.rival.pk)
+
+    def test_held_slot_is_hidden_from_others(self):
+        self.assertEqual(self.listed(self.user), [])
+        self.assertEqual(self.listed(self.rival), [self.slot.pk])
+
+        self.assertTrue(holds.release_hold(self.slot.pk, self.rival.pk))
+        self.assertEqual(self.listed(self.user), [self.slot.pk])
+
+    def test_booking_a_held_slot_is_409(self):
+        response = self.client.post('/api/appointments/', {'available_time': self.slot.pk}, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['detail'], views.SlotHeld.default_detail)
+        self.assertFalse(AvailableTime.objects.get(pk=self.slot.pk).is_booked)
+        with self.assertRaises(SlotUnavailable):
+            booking_engine.book(self.user, self.slot.pk)
+
+        booking_engine.book(self.rival, self.slot.pk)
+        self.assertIsNone(holds.get_holder(self.slot.pk))
+
+
+@override_settings(AVAILABILITY_MODE='virtual')
+class VirtualBookingTests(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="Main")
+        self.service = Service.objects.create(name="Cut", duration_minutes=20, price=1)
+        self.provider = User.objects.create_user(phone='09120000100', role='provider', full_name="Provider")
+        self.user = User.objects.create_user(phone='09120000001')
+        ScheduleTemplate.objects.bulk_create(
+            ScheduleTemplate(
+                provider=self.provider, service=self.service, branch=self.branch,
+                weekday=weekday, start_time=time(8), end_time=time(12)
+            )
+            for weekday in range(7)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        day = timezone.localdate() + timedelta(days=1)
+        self.window = {
+            'start': timezone.make_aware(datetime.combine(day, time.min)).isoformat(),
+            'end': timezone.make_aware(datetime.combine(day, time(23))).isoformat(),
+        }
+
+    def book(self, start_time):
+        return self.client.post('/api/appointments/', {
+            'provider': self.provider.pk,
+            'service': self.service.pk,
+            'branch': self.branch.pk,
+            'start_time': start_time,
+        }, format='json')
+
+    def test_virtual_slot_is_booked_by_time(self):
+        slots = self.client.get('/api/available-times/', self.window).json()['results']
+        self.assertEqual(len(slots), 12)
+        self.assertIsNone(slots[0]['id'])
+
+        response = self.book(slots[0]['start_time'])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(AvailableTime.objects.get(pk=response.json()['available_time']).is_booked)
+        self.assertEqual(len(self.client.get('/api/available-times/', self.window).json()['results']), 11)
+        self.assertEqual(self.book(slots[0]['start_time']).status_code, 400)
+
+    def test_time_outside_the_templates_is_refused(self):
+        slots = self.client.get('/api/available-times/', self.window).json()['results']
+        start = datetime.fromisoformat(slots[0]['start_time']) + timedelta(minutes=5)
+
+        self.assertEqual(self.book(start.isoformat()).status_code, 400)
+        self.assertFalse(AvailableTime.objects.exists())
+
+
+class ScheduleGenerationTests(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="Main")
+        self.provider = User.objects.create_user(phone='09120000100', role='provider')
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=7 - today.weekday())
+        ScheduleTemplate.objects.create(
+            provider=self.provider, branch=self.branch, weekday=0, start_time=time(8), end_time=time(10),
+            service=Service.objects.create(name="Cut", duration_minutes=30, price=1),
+        )
+
+    def starts(self):
+        return [timezone.localtime(start).time() for start in AvailableTime.objects.values_list('start_time', flat=True)]
+
+    def test_template_is_expanded_every_week(self):
+        self.assertEqual(generate_slots(self.monday, 2), 8)
+        self.assertEqual(self.starts(), [time(8), time(8, 30), time(9), time(9, 30)] * 2)
+        self.assertEqual(
+            {timezone.localtime(start).date() for start in AvailableTime.objects.values_list('start_time', flat=True)},
+            {self.monday, self.monday + timedelta(weeks=1)},
+        )
+
+    def test_exceptions_block_slots(self):
+        ScheduleException.objects.create(
+            date=self.monday, provider=self.provider, start_time=time(8, 30), end_time=time(9, 30)
+        )
+        ScheduleException.objects.create(date=self.monday + timedelta(weeks=1), branch=self.branch)
+
+        self.assertEqual(generate_slots(self.monday, 2), 2)
+        self.assertEqual(self.starts(), [time(8), time(9, 30)])
+
+    def test_rerun_only_fills_gaps(self):
+        generate_slots(self.monday, 1)
+        self.assertEqual(generate_slots(self.monday, 1), 0)
+
+        AvailableTime.objects.filter(start_time__time=time(9)).delete()
+        self.assertEqual(generate_slots(self.monday, 1), 1)
+        self.assertEqual(AvailableTime.objects.count(), 4)
+
+
+class OccupancyReleaseTests(TestCase):
+    def setUp(self):
+        branch = Branch.objects.create(name="Main")
+        service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        self.provider = User.objects.create_user(phone='09120000100', role='provider')
+        self.user = User.objects.create_user(phone='09120000001')
+        self.start = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        self.slot = AvailableTime.objects.create(
+            provider=self.provider, service=service, branch=branch, start_time=self.start, duration_minutes=30
+        )
+
+    def assertFree(self, free=True):
+        self.assertEqual(occupancy.is_free(self.provider.pk, self.start, 30), free)
+
+    def test_cancel_releases(self):
+        booking_engine.cancel(booking_engine.book(self.user, self.slot.pk))
+        self.assertFree()
+        booking_engine.book(self.user, self.slot.pk)
+
+    def test_queryset_delete_releases(self):
+        booking_engine.book(self.user, self.slot.pk)
+        self.assertFree(False)
+
+        Appointment.objects.filter(available_time=self.slot).delete()
+        AvailableTime.objects.filter(pk=self.slot.pk).update(is_booked=False)
+
+        self.assertFree()
+        booking_engine.book(self.user, self.slot.pk)
+
+    def test_slot_delete_cascade_releases(self):
+        booking_engine.book(self.user, self.slot.pk)
+        AvailableTime.objects.get(pk=self.slot.pk).delete()
+        self.assertFree()
+
+
+class CursorTests(TestCase):
+    def setUp(self):
+        branch = Branch.objects.create(name="Main")
+        service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        provider = User.objects.create_user(phone='09120000100', role='provider')
+        start = timezone.now() + timedelta(days=1)
+        AvailableTime.objects.bulk_create(
+            AvailableTime(provider=provider, service=service, branch=branch,
+                          start_time=start + timedelta(minutes=30 * n), duration_minutes=30)
+            for n in range(3)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(phone='09120000001'))
+
+    def get(self, position):
+        cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        return self.client.get('/api/available-times/', {'cursor': cursor})
+
+    def test_next_link_continues(self):
+        first = self.client.get('/api/available-times/', {'page_size': 2}).json()
+        rest = self.client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(rest['results']), 3)
+        self.assertIsNone(rest['next'])
+
+    def test_page_size_settings_apply_at_runtime(self):
+        with override_settings(API_PAGE_SIZE=2):
+            page = self.client.get('/api/available-times/').json()
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNotNone(page['next'])
+
+        with override_settings(API_MAX_PAGE_SIZE=1):
+            self.assertEqual(len(self.client.get('/api/available-times/', {'page_size': 3}).json()['results']), 1)
+
+    def test_malformed_cursor_is_not_found(self):
+        for position in (["not-a-date", 1], ["2026-01-01T00:00:00Z", "abc"], [{"a": 1}, 1], [None, 1], "x"):
+            with self.subTest(position=position):
+                self.assertEqual(self.get(position).status_code, 404)
+
+    @override_settings(AVAILABILITY_MODE='virtual')
+    def test_malformed_cursor_on_computed_slots_is_not_found(self):
+        ScheduleTemplate.objects.create(
+            provider=User.objects.get(role='provider'), service=Service.objects.get(), branch=Branch.objects.get(),
+            weekday=(timezone.localdate() + timedelta(days=1)).weekday(), start_time=time(8), end_time=time(12)
+        )
+        self.assertEqual(self.get([{"a": 1}, 1, 1, 1]).status_code, 404)
+
+
+@override_settings(APPOINTMENT_EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    def setUp(self):
+        branch = Branch.objects.create(name="Main")
+        service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        provider = User.objects.create_user(phone='09120000100', role='provider')
+        user = User.objects.create_user(phone='09120000001')
+        start = timezone.now() + timedelta(days=1)
+        for n in range(5):
+            slot = AvailableTime.objects.create(
+                provider=provider, service=service, branch=branch,
+                start_time=start + timedelta(hours=n), duration_minutes=30
+            )
+            booking_engine.book(user, slot.pk)
+        self.authorization = f"Bearer {AccessToken.for_user(User.objects.create_user(phone='09120000002', role='admin'))}"
+
+    def test_wsgi_streams_sync(self):
+        response = self.client.get('/api/appointments/admin/export/', HTTP_AUTHORIZATION=self.authorization)
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 6)
+
+    async def test_asgi_streams_async_in_batches(self):
+        response = await AsyncClient().get(
+            '/api/appointments/admin/export/', {'export_format': 'ndjson'}, headers={'Authorization': self.authorization}
+        )
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [2, 2, 1])
+
+
+class LiveUpdatesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        get_broker.cache_clear()
+        self.addCleanup(get_broker.cache_clear)
+        self.branch = Branch.objects.create(name="Main")
+        self.service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        self.user = User.objects.create_user(phone='09120000001')
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.slot = AvailableTime.objects.create(
+            provider=User.objects.create_user(phone='09120000100', role='provider', full_name="Provider"),
+            service=self.service, branch=self.branch,
+            start_time=timezone.make_aware(datetime.combine(self.day, time(10))), duration_minutes=30,
+        )
+        self.authorization = f"Bearer {AccessToken.for_user(self.user)}"
+
+    def book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking_engine.book(self.user, self.slot.pk)
+
+    async def test_overflow_ends_the_stream_with_resync(self):
+        with self.settings(PUBSUB_MAX_QUEUED_MESSAGES=2):
+            broker = InMemoryBroker()
+            subscription = broker.subscribe('slots:test')
+        for slot_id in range(5):
+            broker.publish('slots:test', {'event': 'booked', 'data': {'id': slot_id}})
+        await asyncio.sleep(0)  # deliveries are handed over through the event loop
+
+        self.assertTrue(subscription.overflowed)
+        self.assertEqual(subscription.queue.qsize(), 3)
+        events = [event async for event in views.AvailableTimeStreamView().events(subscription, [])]
+
+        self.assertEqual([line for event in events for line in event.splitlines() if line.startswith("event: ")], [
+            "event: snapshot", "event: booked", "event: booked", "event: resync",
+        ])
+        self.assertFalse(broker.has_subscribers('slots:test'))
+
+    async def test_stream_sends_snapshot_then_deltas(self):
+        response = await AsyncClient().get(
+            '/api/available-times/stream/',
+            {'branch': self.branch.pk, 'service': self.service.pk, 'date': self.day.isoformat()},
+            headers={'Authorization': self.authorization},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+
+        retry, snapshot = (await anext(events)).decode().split("\n", 1)
+        self.assertEqual(retry, "retry: 3000")
+        name, data = snapshot.strip().split("\n")
+        self.assertEqual(name, "event: snapshot")
+        self.assertEqual([slot['id'] for slot in json.loads(data.removeprefix("data: "))], [self.slot.pk])
+
+        await sync_to_async(self.book)()
+        delta = await asyncio.wait_for(anext(events), timeout=5)
+        self.assertEqual(delta.decode(), f'event: booked\ndata: {{"id": {self.slot.pk}}}\n\n')
+        await events.aclose()
+
+
+class CalendarFeedTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.provider = User.objects.create_user(phone='09120000100', role='provider')
+        self.client = APIClient()
+        self.client.force_authenticate(self.provider)
+
+    def test_rotation_revokes_old_links(self):
+        old = self.client.get('/api/calendar/feeds/').json()
+        self.assertEqual(self.client.get(old['user']).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new = self.client.post('/api/calendar/feeds/', {'kind': 'user'}).json()
+
+        self.assertEqual(list(new), ['user'])
+        self.assertEqual(self.client.get(old['user']).status_code, 404)
+        self.assertEqual(self.client.get(new['user']).status_code, 200)
+        self.assertEqual(self.client.get(old['provider']).status_code, 200)
+        self.assertEqual(self.client.get('/api/calendar/feeds/').json()['user'], new['user'])
+
+    def test_rotation_survives_cache_loss(self):
+        old = self.client.get('/api/calendar/feeds/').json()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/calendar/feeds/')
+        cache.clear()
+        self.assertEqual(self.client.get(old['provider']).status_code, 404)
+
+    def test_unknown_kind_is_refused(self):
+        user = User.objects.create_user(phone='09120000001')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.post('/api/calendar/feeds/', {'kind': 'provider'}).status_code, 400)
+
+
+class FastSerializerTests(TestCase):
+    def setUp(self):
+        branch = Branch.objects.create(name="شعبه \u2028 مرکزی")
+        service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        for n, full_name in enumerate(["Provider", ""]):
+            provider = User.objects.create_user(phone=f'0912000010{n}', role='provider', full_name=full_name)
+            AvailableTime.objects.create(
+                provider=provider, service=service, branch=branch,
+                start_time=start + timedelta(minutes=45 * n), duration_minutes=30
+            )
+        self.queryset = views.AvailableTimeListView.queryset.order_by('pk')
+
+    def assertSameBytes(self, fields=None):
+        expected = JSONRenderer().render(AvailableTimeSerializer(self.queryset, many=True, fields=fields).data)
+        fast = get_fast_serializer(AvailableTimeSerializer, frozenset(fields) if fields else None)
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            self.assertEqual(renderer.render(fast.to_representation(fast.prepare(self.queryset))), expected)
+
+    def test_bytes_match_model_serializer(self):
+        self.assertSameBytes()
+
+    def test_bytes_match_with_sparse_fields(self):
+        self.assertSameBytes(fields=('start_time', 'branch_name', 'id'))
+
+    def test_compiled_once_per_serializer_and_fields(self):
+        fast = get_fast_serializer(AvailableTimeSerializer, None)
+        self.assertIs(get_fast_serializer(AvailableTimeSerializer, None), fast)
+        self.assertIsNot(get_fast_serializer(AvailableTimeSerializer, frozenset({'id'})), fast)
+
+
+class ResponseFormatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        branch = Branch.objects.create(name="Main")
+        service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        provider = User.objects.create_user(phone='09120000100', role='provider', full_name="Provider")
+        start = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        AvailableTime.objects.bulk_create(
+            AvailableTime(provider=provider, service=service, branch=branch, start_time=start + timedelta(hours=n), duration_minutes=30)
+            for n in range(20)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(phone='09120000001'))
+
+    def test_unknown_field_is_400(self):
+        response = self.client.get('/api/available-times/', {'fields': 'id,secret'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ["Unknown field(s): secret."]})
+
+    def test_fields_prune_keys(self):
+        response = self.client.get('/api/available-times/', {'fields': 'start_time,id'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({tuple(slot) for slot in response.json()['results']}, {('id', 'start_time')})
+
+    def test_gzip_weakens_etag(self):
+        plain = self.client.get('/api/available-times/')
+
+        response = self.client.get('/api/available-times/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], f"W/{plain['ETag']}")
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+        self.assertEqual(
+            self.client.get('/api/available-times/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304
+        )
+
+    def test_brotli_skips_cookie_bound_responses(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br, gzip')
+
+        def respond(vary_cookie):
+            response = HttpResponse(b'{"a": 1}' * 200, content_type='application/json')
+            if vary_cookie:
+                response['Vary'] = 'Cookie'
+            return CompressionMiddleware(lambda request: response)(request)
+
+        with mock.patch('Qtime.middleware.brotli') as brotli:
+            brotli.compress.return_value = b'compressed'
+            self.assertEqual(respond(vary_cookie=False)['Content-Encoding'], 'br')
+            self.assertEqual(respond(vary_cookie=True)['Content-Encoding'], 'gzip')
+
+
+class ImporterTests(TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="Main")
+        self.service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        self.provider = User.objects.create_user(phone='09120000100', role='provider')
+        self.user = User.objects.create_user(phone='09120000001')
+        self.rival = User.objects.create_user(phone='09120000002')
+        self.start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write_csv(self, rows):
+        path = self.path('slots.csv')
+        with open(path, 'w', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['provider', 'branch', 'service', 'start_time', 'duration_minutes', 'user', 'is_confirmed'])
+            writer.writerows(rows)
+        return path
+
+    def row(self, hours, user='', provider='09120000100', start_time=None):
+        start_time = start_time or (self.start + timedelta(hours=hours)).isoformat()
+        return [provider, "main", "cut", start_time, '', user, 'yes' if user else '']
+
+    def test_clean_csv(self):
+        path = self.write_csv([self.row(0), self.row(1, user='09120000001'), self.row(2)])
+
+        progress = Importer(path).run(read_csv(path))
+
+        self.assertEqual((progress.slots, progress.appointments, progress.bad_rows), (3, 1, 0))
+        appointment = Appointment.objects.get()
+        self.assertEqual((appointment.user, appointment.is_confirmed), (self.user, True))
+        self.assertTrue(appointment.available_time.is_booked)
+        self.assertEqual(AvailableTime.objects.filter(is_booked=False).count(), 2)
+        self.assertEqual(set(AvailableTime.objects.values_list('duration_minutes', flat=True)), {30})
+
+        again = Importer(path).run(read_csv(path))
+        self.assertEqual((again.slots, again.existing_slots, again.appointments), (0, 3, 0))
+
+    def test_bad_rows_are_reported(self):
+        path = self.write_csv([
+            self.row(0, user='09120000001'),
+            self.row(1, provider='09129999999'),
+            self.row(2, start_time='tomorrow'),
+            self.row(0, user='09120000002'),
+        ])
+        errors = self.path('errors.csv')
+
+        progress = Importer(path, errors_path=errors).run(read_csv(path))
+
+        self.assertEqual((progress.slots, progress.appointments, progress.bad_rows), (1, 1, 3))
+        with open(errors, newline='') as handle:
+            report = {int(line): error for line, error, _row in list(csv.reader(handle))[1:]}
+        self.assertEqual(report, {
+            3: "unknown provider '09129999999'",
+            4: "invalid start_time 'tomorrow'",
+            5: "slot already has an appointment",
+        })
+        self.assertEqual(Appointment.objects.get().user, self.user)
+
+    def test_resumes_from_checkpoint(self):
+        path = self.write_csv([self.row(hours) for hours in range(4)])
+        checkpoint = self.path('slots.checkpoint')
+
+        interrupted = Importer(path, batch_size=1, checkpoint_path=checkpoint)
+        interrupted.run(itertools.islice(read_csv(path), 2))
+        self.assertEqual(AvailableTime.objects.count(), 2)
+
+        resumed = Importer(path, batch_size=1, checkpoint_path=checkpoint)
+        self.assertTrue(resumed.load_checkpoint())
+        self.assertEqual(resumed.progress.line, 3)
+        progress = resumed.run(read_csv(path))
+
+        # Rows before the checkpoint are skipped, not matched as existing slots.
+        self.assertEqual((progress.slots, progress.existing_slots, progress.line), (4, 0, 5))
+        self.assertEqual(AvailableTime.objects.count(), 4)
+        self.assertFalse(Importer(self.path('other.csv'), checkpoint_path=checkpoint).load_checkpoint())
+
+    def test_ics_events(self):
+        path = self.path('slots.ics')
+        with open(path, 'w') as handle:
+            handle.write("\r\n".join([
+                "BEGIN:VCALENDAR",
+                "BEGIN:VEVENT",
+                "DTSTART;TZID=Asia/Tehran:20300101T090000",
+                "DURATION:PT45M",
+                "X-QTIME-PROVIDER:09120000100",
+                "LOCATION:Main",
+                "SUMMARY:Cut",
+                "END:VEVENT",
+                "BEGIN:VEVENT",
+                "DTSTART:20300101T080000Z",
+                "DTEND:20300101T083000Z",
+                "X-QTIME-PROVIDER:0912000",
+                " 0100",
+                "X-QTIME-SERVICE:Cut",
+                "X-QTIME-BRANCH:Main",
+                "ATTENDEE:tel:09120000001",
+                "STATUS:CONFIRMED",
+                "END:VEVENT",
+                "END:VCALENDAR",
+            ]))
+
+        (first_line, first), (second_line, second) = read_ics(path)
+
+        self.assertEqual((first_line, second_line), (2, 9))
+        self.assertEqual(first['start_time'], datetime(2030, 1, 1, 9, tzinfo=ZoneInfo('Asia/Tehran')))
+        self.assertEqual((first['duration_minutes'], first['branch'], first['service']), (45, "Main", "Cut"))
+        self.assertEqual(second['start_time'], datetime(2030, 1, 1, 8, tzinfo=ZoneInfo('UTC')))
+        self.assertEqual((second['duration_minutes'], second['provider']), (30, '09120000100'))
+        self.assertEqual((second['user'], second['is_confirmed']), ('09120000001', 'true'))
+
+        progress = Importer(path).run(read_ics(path))
+        self.assertEqual((progress.slots, progress.appointments, progress.bad_rows), (2, 1, 0))
+
+    def test_occupancy_is_rebuilt_for_booked_providers(self):
+        path = self.write_csv([self.row(0, user='09120000001'), self.row(1)])
+
+        with mock.patch('appointments.services.importer.occupancy.rebuild', wraps=occupancy.rebuild) as rebuild:
+            Importer(path).run(read_csv(path))
+
+        rebuild.assert_called_once_with(provider_ids=[self.provider.pk])
+        self.assertFalse(occupancy.is_free(self.provider.pk, self.start, 30))
+        self.assertTrue(occupancy.is_free(self.provider.pk, self.start + timedelta(hours=1), 30))
+
+
+class SchemaArtifactTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(OPENAPI_SCHEMA_DIR=directory.name, OPENAPI_SCHEMA_CODE_VERSION='test-1')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Both are per process; start from a clean slate and leave one behind.
+        schema.code_version.cache_clear()
+        self.addCleanup(schema.code_version.cache_clear)
+        current = mock.patch.object(schema, '_current', None)
+        current.start()
+        self.addCleanup(current.stop)
+        self.directory = directory.name
+
+    def test_artifact_is_built_for_the_code_version(self):
+        artifact = schema.build_artifact()
+
+        self.assertEqual(artifact.version, 'test-1')
+        self.assertEqual(sorted(os.listdir(self.directory)), ['openapi-test-1.json', 'openapi-test-1.yaml'])
+        paths = json.loads(artifact.json)['paths']
+        for path in ('/api/available-times/{id}/hold/', '/api/available-times/calendar/', '/api/calendar/feeds/'):
+            self.assertIn(path, paths)
+
+        schema.build_artifact('test-2')
+        self.assertEqual(sorted(os.listdir(self.directory)), ['openapi-test-2.json', 'openapi-test-2.yaml'])
+
+    def test_served_with_etag(self):
+        response = self.client.get('/schema/', {'format': 'json'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"test-1-json"')
+        self.assertEqual(response.content, schema.get_artifact().json)
+        self.assertEqual(self.client.get('/schema/', {'format': 'json'}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class AvailabilityConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.branch = Branch.objects.create(name="Main")
+        self.slot = AvailableTime.objects.create(
+            provider=User.objects.create_user(phone='09120000100', role='provider'),
+            service=Service.objects.create(name="Cut", duration_minutes=30, price=1),
+            branch=self.branch,
+            start_time=timezone.now().replace(second=0, microsecond=0) + timedelta(days=1),
+            duration_minutes=30,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(phone='09120000001'))
+        self.etag = self.client.get('/api/available-times/')['ETag']
+
+    def assertChanged(self):
+        response = self.client.get('/api/available-times/', HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], self.etag)
+        return response
+
+    def test_matching_etag_is_304(self):
+        response = self.client.get('/api/available-times/', HTTP_IF_NONE_MATCH=self.etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+
+    def test_slot_update_changes_etag(self):
+        before = self.client.get('/api/available-times/').json()['results'][0]['start_time']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slot.start_time += timedelta(hours=1)
+            self.slot.save()
+
+        response = self.assertChanged()
+        self.assertNotEqual(response.json()['results'][0]['start_time'], before)
+
+    def test_branch_update_changes_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.branch.name = "Center"
+            self.branch.save()
+
+        self.assertChanged()
+
+
+class VersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.start = timezone.now() + timedelta(days=1)
+        self.scope = f"availability_calendar:{timezone.localtime(self.start).date().isoformat()}"
+
+    def test_bumps_wait_for_commit(self):
+        availability, day = versioning.get_version('availability'), versioning.get_version(self.scope)
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableTime.objects.create(
+                provider=User.objects.create_user(phone='09120000100', role='provider'),
+                service=Service.objects.create(name="Cut", duration_minutes=30, price=1),
+                branch=Branch.objects.create(name="Main"),
+                start_time=self.start, duration_minutes=30,
+            )
+            self.assertEqual(versioning.get_version('availability'), availability)
+            self.assertEqual(versioning.get_version(self.scope), day)
+        self.assertGreater(versioning.get_version('availability'), availability)
+        self.assertGreater(versioning.get_version(self.scope), day)
+
+    def test_evicted_version_is_not_reused(self):
+        versioning.bump_version('availability')
+        issued = versioning.get_version('availability')
+        cache.delete(versioning.get_version_key('availability'))
+        self.assertGreater(versioning.get_version('availability'), issued)
+
+        issued = versioning.get_versions([self.scope])[self.scope]
+        cache.delete(versioning.get_version_key(self.scope))
+        versioning.bump_version(self.scope)
+        self.assertGreater(versioning.get_versions([self.scope])[self.scope], issued)
+
+    def test_process_local_cache_is_flagged_on_deploy(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['Qtime.W001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379/1'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+@override_settings(QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.branch = Branch.objects.create(name="Main")
+        self.service = Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        self.provider = User.objects.create_user(phone='09120000100', role='provider', full_name="Provider")
+        self.user = User.objects.create_user(phone='09120000001')
+        self.admin = User.objects.create_user(phone='09120000002', role='admin')
+        self.start = timezone.now() + timedelta(days=1)
+        self.seeded = 0
+
+    def seed(self, count):
+        """
+        ``count`` free slots, each with its own provider, and as many booked
+        slots of self.provider with an appointment of self.user.
+        """
+        for n in range(self.seeded, self.seeded + count):
+            provider = User.objects.create_user(phone=f'0913{n:07d}', role='provider', full_name=f"Provider {n}")
+            at = self.start + timedelta(hours=n)
+            AvailableTime.objects.create(
+                provider=provider, service=self.service, branch=self.branch, start_time=at, duration_minutes=30
+            )
+            slot = AvailableTime.objects.create(
+                provider=self.provider, service=self.service, branch=self.branch, start_time=at, duration_minutes=30
+            )
+            booking_engine.book(self.user, slot.pk)
+        self.seeded += count
+
+    def test_available_times(self):
+        self.assertBudgetHolds(views.AvailableTimeListView, '/api/available-times/', self.user, self.seed)
+
+    def test_available_times_filtered(self):
+        self.assertBudgetHolds(
+            views.AvailableTimeListView, '/api/available-times/', self.user, self.seed,
+            {'branch': self.branch.pk, 'service': self.service.pk},
+        )
+
+    def test_suggestions(self):
+        self.assertBudgetHolds(
+            views.SlotSuggestionView, '/api/available-times/suggestions/', self.user, self.seed, {
+                'provider': self.provider.pk, 'service': self.service.pk, 'branch': self.branch.pk,
+                'start_time': self.start.isoformat(), 'other_providers': 'true',
+            }
+        )
+
+    def test_calendar(self):
+        self.assertBudgetHolds(
+            views.AvailabilityCalendarView, '/api/available-times/calendar/', self.user, self.seed,
+            {'branch': self.branch.pk},
+        )
+
+    def test_user_appointments(self):
+        self.assertBudgetHolds(views.UserAppointmentView, '/api/appointments/', self.user, self.seed)
+
+    def test_provider_appointments(self):
+        self.assertBudgetHolds(views.ProviderAppointmentListView, '/api/appointments/provider/', self.provider, self.seed)
+
+    def test_admin_appointments(self):
+        self.assertBudgetHolds(views.AdminAppointmentListView, '/api/appointments/admin/', self.admin, self.seed)
@@ -3,9 +3,18 @@ from . import views
 
 urlpatterns = [
     path('appointments/', views.UserAppointmentView.as_view(), name='user-appointments'),
+    path('appointments/batch/', views.BatchAppointmentView.as_view(), name='batch-appointments'),
     path('appointments/admin/', views.AdminAppointmentListView.as_view(), name='admin-appointments'),
+    path('appointments/admin/export/', views.AdminAppointmentExportView.as_view(), name='admin-appointments-export'),
     path('appointments/provider/', views.ProviderAppointmentListView.as_view(), name='provider-appointments'),
+    path('appointments/provider/export/', views.ProviderAppointmentExportView.as_view(), name='provider-appointments-export'),
     path('appointments/<int:pk>/delete/', views.ProviderAppointmentDeleteView.as_view(), name='provider-delete-appointment'),
     path('available-times/', views.AvailableTimeListView.as_view(), name='available-times'),
+    path('available-times/<int:pk>/hold/', views.SlotHoldView.as_view(), name='available-time-hold'),
+    path('available-times/stream/', views.AvailableTimeStreamView.as_view(), name='available-time-stream'),
+    path('available-times/calendar/', views.AvailabilityCalendarView.as_view(), name='available-time-calendar'),
+    path('available-times/suggestions/', views.SlotSuggestionView.as_view(), name='available-time-suggestions'),
+    path('calendar/feeds/', views.CalendarFeedLinksView.as_view(), name='calendar-feed-links'),
+    path('calendar/<str:token>.ics', views.CalendarFeedView.as_view(), name='calendar-feed'),
 
 ]
@@ -1,27 +1,338 @@
-from rest_framework import generics, permissions
-from rest_framework.exceptions import PermissionDenied
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotFound, ValidationError
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from .models import Appointment, AvailableTime
-from .serializers import AppointmentSerializer, AvailableTimeSerializer
-from .filters import AvailableTimeFilter
+from .serializers import (
+    AppointmentSerializer,
+    AvailabilityCountSerializer,
+    AvailableTimeSerializer,
+    BatchBookingResultSerializer,
+    BatchBookingSerializer,
+    CalendarFeedLinksSerializer,
+    CalendarFeedRotateSerializer,
+    LiveSlotsQuerySerializer,
+    SlotHoldResultSerializer,
+    SlotHoldSerializer,
+    SlotSuggestionQuerySerializer,
+)
+from .filters import AppointmentFilter, AvailableTimeFilter
+from .pagination import AppointmentPagination, AvailableTimePagination, VirtualAvailableTimePagination
+from .services import calendar_feed, export, holds, live
+from .services.calendar import availability_calendar
+from .services.booking import booking_engine
+from .services.suggestions import nearest_free_slots
 from accounts.permissions import IsAdmin, IsProvider, IsRegularUser
+from Qtime import versioning
+from Qtime.conditional import ConditionalGetMixin
+from Qtime.async_views import AsyncAPIViewMixin
+from Qtime.fast_serializers import FastListMixin
+from Qtime.pubsub import OVERFLOW, get_broker
+from Qtime.sparse_fields import SparseFieldsetViewMixin
+from Qtime.query_budget import QueryBudgetMixin
+
+
+class SlotHeld(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("This time slot is being held by another user.")
+    default_code = 'slot_held'
 
 
 # ✅ View for listing available slots with filters (branch, provider, service, time range)
-class AvailableTimeListView(generics.ListAPIView):
+class AvailableTimeListView(ConditionalGetMixin, QueryBudgetMixin, FastListMixin, AsyncAPIViewMixin, generics.ListAPIView):
     """
     List all available (not booked) time slots with filtering options.
+
+    Responses carry an ETag built from the availability and catalog change
+    counters, the user and the query string, so polling clients get a 304
+    without a single row being read.
     """
-    queryset = AvailableTime.objects.filter(is_booked=False)
+    queryset = AvailableTime.objects.filter(is_booked=False).select_related('provider', 'service', 'branch')
     serializer_class = AvailableTimeSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_class = AvailableTimeFilter
+    pagination_class = AvailableTimePagination
+    # auth + branch/provider/service filter lookups + one page
+    query_budget = {'GET': 5}
+    # Listings also change with the clock (virtual mode) and as holds lapse;
+    # while either can happen the ETag rolls over every bucket.
+    etag_time_bucket_seconds = 60
+
+    def get_query_budget(self, request):
+        budget = super().get_query_budget(request)
+        if budget is not None and settings.AVAILABILITY_MODE == 'virtual':
+            budget += 2  # templates and exceptions instead of a page of rows
+        return budget
+
+    def get_conditional_validators(self, request):
+        states = [
+            versioning.get_state(scope)
+            for scope in ('availability', 'catalog:branches', 'catalog:services')
+        ]
+        modified = max(changed_at for _version, changed_at in states)
+
+        now = time.time()
+        bucket = None
+        if settings.AVAILABILITY_MODE == 'virtual' or now < holds.holds_active_until():
+            bucket = int(now // self.etag_time_bucket_seconds)
+            modified = max(modified, bucket * self.etag_time_bucket_seconds)
+
+        key = "|".join([
+            ",".join(str(version) for version, _changed_at in states),
+            str(request.user.pk),
+            request.GET.urlencode(),
+            str(bucket),
+        ])
+        etag = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+        return etag, datetime.fromtimestamp(modified, tz=dt_timezone.utc)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        # Hide slots someone else is checking out; one cache round trip per page.
+        held = holds.held_by_others([slot.id for slot in page if slot.id], self.request.user.pk)
+        return [slot for slot in page if slot.id not in held]
+
+    async def apaginate_queryset(self, queryset):
+        page = await super().apaginate_queryset(queryset)
+        held = await holds.aheld_by_others([slot.id for slot in page if slot.id], self.request.user.pk)
+        return [slot for slot in page if slot.id not in held]
+
+    async def aget(self, request, *args, **kwargs):
+        if settings.AVAILABILITY_MODE == 'virtual':
+            # CPU-bound (numpy) computation; keep it off the event loop.
+            return await sync_to_async(self.list)(request, *args, **kwargs)
+        return await self.alist(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if settings.AVAILABILITY_MODE != 'virtual':
+            return super().list(request, *args, **kwargs)
+
+        # Virtual mode: compute free slots from schedule templates instead of
+        # reading materialized rows. Same filters, same response shape.
+        from .services.availability import virtual_available_times
+
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        paginator = VirtualAvailableTimePagination()
+        page = paginator.paginate_queryset(virtual_available_times(**filterset.form.cleaned_data), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+# ✅ Live availability: one snapshot, then deltas over Server-Sent Events
+class AvailableTimeStreamView(View):
+    """
+    ``GET available-times/stream/?branch=&service=&date=YYYY-MM-DD`` as
+    ``text/event-stream``: a ``snapshot`` event with the day's free slots,
+    then a delta event per slot change on that channel (see
+    services/live.py), with keep-alive comments in between. After
+    LIVE_SLOTS_MAX_SECONDS, or a ``resync`` event when the client fell
+    behind, the stream ends and EventSource reconnects for a fresh snapshot.
+
+    Async; needs the ASGI entry point (Qtime/asgi.py), since a WSGI worker
+    would be tied up for the whole connection.
+    """
+
+    def authenticate(self, request):
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        return result[0] if result else None
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'detail': _("Live updates are served by the ASGI application; poll available-times/ instead.")},
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        user = await sync_to_async(self.authenticate)(request)
+        if user is None:
+            return JsonResponse(
+                {'detail': _("Authentication credentials were not provided.")},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        params = LiveSlotsQuerySerializer(data=request.GET)
+        if not await sync_to_async(params.is_valid)():
+            return JsonResponse(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        branch, service, day = (params.validated_data[name] for name in ('branch', 'service', 'date'))
+
+        # Subscribe before reading the snapshot so no change falls in between;
+        # deltas repeating what the snapshot shows are harmless.
+        subscription = get_broker().subscribe(live.get_channel(branch.pk, service.pk, day))
+        try:
+            snapshot = await sync_to_async(live.snapshot)(branch.pk, service.pk, day, user.pk)
+        except BaseException:
+            subscription.close()
+            raise
+
+        response = StreamingHttpResponse(self.events(subscription, snapshot), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering events
+        return response
+
+    @staticmethod
+    def event(name: str, data) -> str:
+        return f"event: {name}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+    async def events(self, subscription, snapshot):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.LIVE_SLOTS_MAX_SECONDS
+        try:
+            yield f"retry: {settings.LIVE_SLOTS_RETRY_MS}\n" + self.event('snapshot', snapshot)
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.get(), timeout=min(settings.LIVE_SLOTS_KEEPALIVE_SECONDS, remaining)
+                    )
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is OVERFLOW:
+                    yield self.event('resync', {})
+                    return
+                yield self.event(message['event'], message['data'])
+        finally:
+            subscription.close()
+
+
+# ✅ View for suggesting the nearest free slots around a requested time
+class SlotSuggestionView(QueryBudgetMixin, generics.GenericAPIView):
+    """
+    Return the K free slots closest to the requested time, before and after it,
+    for one provider or (with other_providers=true) anyone at the branch
+    offering the service.
+    """
+    serializer_class = AvailableTimeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    # auth + provider/service/branch lookups + slots before + slots after
+    query_budget = {'GET': 6}
+
+    def get(self, request):
+        params = SlotSuggestionQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        slots = nearest_free_slots(
+            params.validated_data['provider'],
+            params.validated_data['service'],
+            params.validated_data['branch'],
+            params.validated_data['start_time'],
+            limit=params.validated_data['limit'],
+            other_providers=params.validated_data['other_providers'],
+        )
+        return Response(self.get_serializer(slots, many=True).data)
+
+
+# ✅ View for per-day / per-hour free slot counts (month calendar)
+class AvailabilityCalendarView(QueryBudgetMixin, generics.GenericAPIView):
+    """
+    Count free slots per local day (or hour with ?bucket=hour).
+    Takes the same filters as AvailableTimeListView; start and end are
+    widened to whole local days.
+    """
+    queryset = AvailableTime.objects.filter(is_booked=False)
+    serializer_class = AvailabilityCountSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_class = AvailableTimeFilter
+    # auth + branch/provider/service filter lookups + one GROUP BY on a cache miss
+    query_budget = {'GET': 5}
+
+    @extend_schema(
+        parameters=[OpenApiParameter('bucket', enum=['day', 'hour'], default='day')],
+        responses=AvailabilityCountSerializer(many=True),
+    )
+    def get(self, request):
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in ('day', 'hour'):
+            raise ValidationError({'bucket': [_("Must be 'day' or 'hour'.")]})
+
+        params = filterset.form.cleaned_data
+        first_day = timezone.localtime(params['start']).date() if params['start'] else timezone.localdate()
+        last_day = timezone.localtime(params['end']).date() if params['end'] else first_day + timedelta(days=30)
+        last_day = min(last_day, first_day + timedelta(days=settings.AVAILABILITY_CALENDAR_MAX_DAYS - 1))
+        if last_day < first_day:
+            return Response([])
+
+        return Response(availability_calendar(
+            first_day,
+            last_day,
+            bucket=bucket,
+            branch=params['branch'],
+            provider=params['provider'],
+            service=params['service'],
+        ))
+
+
+# ✅ Regular user can hold a slot for a short time while checking out
+class SlotHoldView(generics.GenericAPIView):
+    """
+    POST places (or extends) a hold on a slot for `seconds`; DELETE releases it.
+    A slot held by someone else is refused from the cache without a query.
+    """
+    serializer_class = SlotHoldSerializer
+    permission_classes = [permissions.IsAuthenticated, IsRegularUser]
+
+    @extend_schema(responses={201: SlotHoldResultSerializer})
+    def post(self, request, pk):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        seconds = serializer.validated_data.get('seconds', settings.SLOT_HOLD_SECONDS)
+        seconds = max(1, min(seconds, settings.SLOT_HOLD_MAX_SECONDS))
+
+        if holds.is_held_by_other(pk, request.user.pk):
+            raise SlotHeld()
+
+        slot = get_object_or_404(AvailableTime.objects.only('is_booked'), pk=pk)
+        if slot.is_booked:
+            raise ValidationError({'detail': _("This time slot is already booked.")})
+
+        if not holds.place_hold(pk, request.user.pk, seconds):
+            raise SlotHeld()
+
+        return Response(
+            {'available_time': pk, 'expires_at': timezone.now() + timedelta(seconds=seconds)},
+            status=status.HTTP_201_CREATED
+        )
+
+    @extend_schema(request=None, responses={204: None})
+    def delete(self, request, pk):
+        holds.release_hold(pk, request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 # ✅ Regular user can view and create their own appointments
-class UserAppointmentView(generics.ListCreateAPIView):
+class UserAppointmentView(QueryBudgetMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     Allow users to:
     - See their appointments
@@ -29,28 +340,68 @@ class UserAppointmentView(generics.ListCreateAPIView):
     """
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated, IsRegularUser]
+    query_budget = {'GET': 2}
 
     def get_queryset(self):
         return Appointment.objects.filter(user=self.request.user)
 
+    def create(self, request, *args, **kwargs):
+        # Refuse slots held by someone else before the serializer loads the row.
+        try:
+            slot_id = int(request.data.get('available_time'))
+        except (TypeError, ValueError):
+            slot_id = None
+        if slot_id is not None and holds.is_held_by_other(slot_id, request.user.pk):
+            raise SlotHeld()
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        available_time = serializer.validated_data.get('available_time')
-        if available_time.is_booked:
-            raise PermissionDenied("This time slot is already booked.")
-        available_time.mark_as_booked()
+        # The slot is reserved and the appointment created atomically in
+        # AppointmentSerializer.create; a lost race surfaces as a 409.
         serializer.save(user=self.request.user)
 
 
+# ✅ Regular user can book several slots in one request
+class BatchAppointmentView(generics.GenericAPIView):
+    """
+    Book a list of slots in one transaction.
+    - all_or_nothing=true (default): either every slot is booked or none is (409).
+    - all_or_nothing=false: book what is free and report the rest.
+    """
+    serializer_class = BatchBookingSerializer
+    permission_classes = [permissions.IsAuthenticated, IsRegularUser]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = booking_engine.book_many(
+            request.user,
+            serializer.validated_data['available_times'],
+            all_or_nothing=serializer.validated_data['all_or_nothing'],
+        )
+
+        booked = any(result.booked for result in results)
+        return Response(
+            {'results': BatchBookingResultSerializer(results, many=True, context=self.get_serializer_context()).data},
+            status=status.HTTP_201_CREATED if booked else status.HTTP_409_CONFLICT
+        )
+
+
 # ✅ Provider can view their appointments
-class ProviderAppointmentListView(generics.ListAPIView):
+class ProviderAppointmentListView(QueryBudgetMixin, FastListMixin, generics.ListAPIView):
     """
     Allow service providers to list appointments that belong to them.
     """
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated, IsProvider]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AppointmentFilter
+    pagination_class = AppointmentPagination
+    query_budget = {'GET': 2}
 
     def get_queryset(self):
-        return Appointment.objects.filter(available_time__provider=self.request.user)
+        return Appointment.objects.filter(available_time__provider=self.request.user).select_related('available_time')
 
 
 # ✅ Provider can delete only their own appointments
@@ -65,15 +416,142 @@ class ProviderAppointmentDeleteView(generics.DestroyAPIView):
         return Appointment.objects.filter(available_time__provider=self.request.user)
 
     def perform_destroy(self, instance):
-        instance.available_time.mark_as_available()
-        instance.delete()
+        booking_engine.cancel(instance)
 
 
 # ✅ Admin can view all appointments in the system
-class AdminAppointmentListView(generics.ListAPIView):
+class AdminAppointmentListView(QueryBudgetMixin, FastListMixin, generics.ListAPIView):
     """
     Admin view for listing all appointments.
     """
-    queryset = Appointment.objects.all()
+    queryset = Appointment.objects.select_related('available_time')
     serializer_class = AppointmentSerializer
-    permission_classes = [permissions.IsAuthenticated, IsAdmin]
\ No newline at end of file
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AppointmentFilter
+    pagination_class = AppointmentPagination
+    query_budget = {'GET': 2}
+
+
+class AppointmentExportMixin:
+    """
+    Stream the filtered appointments as CSV (default) or NDJSON
+    (``?export_format=ndjson``) with provider, service and branch names joined in.
+    Rows are read in chunks and written as they arrive, so memory stays flat;
+    under ASGI the lines are handed over as an async iterator for the same reason.
+    """
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AppointmentFilter
+
+    @extend_schema(
+        parameters=[OpenApiParameter('export_format', enum=list(export.EXPORT_FORMATS), default='csv')],
+        responses={(200, content_type): OpenApiTypes.STR for content_type, _extension in export.EXPORT_FORMATS.values()},
+    )
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in export.EXPORT_FORMATS:
+            raise ValidationError({'export_format': _("Choose one of: %s.") % ", ".join(export.EXPORT_FORMATS)})
+
+        content_type, extension = export.EXPORT_FORMATS[export_format]
+        queryset = self.filter_queryset(self.get_queryset())
+        lines = export.render(queryset, export_format)
+        if isinstance(request._request, ASGIRequest):
+            lines = export.astream(lines)
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="appointments.{extension}"'
+        return response
+
+
+# ✅ Admin can export all appointments
+class AdminAppointmentExportView(AppointmentExportMixin, generics.GenericAPIView):
+    """
+    Admin export of all appointments.
+    """
+    queryset = Appointment.objects.all()
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+
+# ✅ Provider can export their appointments
+class ProviderAppointmentExportView(AppointmentExportMixin, generics.GenericAPIView):
+    """
+    Provider export of appointments that belong to them.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsProvider]
+
+    def get_queryset(self):
+        return Appointment.objects.filter(available_time__provider=self.request.user)
+
+
+class ICalendarRenderer(BaseRenderer):
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+# ✅ Links to the caller's iCalendar feeds
+class CalendarFeedLinksView(generics.GenericAPIView):
+    """
+    Return the secret feed URLs of the authenticated user: their own
+    appointments and, for providers, the appointments booked with them.
+    POST rotates the feeds (or only ``kind``), revoking the old URLs,
+    and returns the new ones.
+    """
+    serializer_class = CalendarFeedLinksSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_kinds(self) -> list[str]:
+        return ['user', 'provider'] if self.request.user.role == 'provider' else ['user']
+
+    def get_links(self, tokens: dict) -> Response:
+        return Response({
+            kind: reverse('calendar-feed', kwargs={'token': token}, request=self.request)
+            for kind, token in tokens.items()
+        })
+
+    def get(self, request):
+        return self.get_links({
+            kind: calendar_feed.get_feed_token(kind, request.user.pk) for kind in self.get_kinds()
+        })
+
+    @extend_schema(request=CalendarFeedRotateSerializer, responses=CalendarFeedLinksSerializer)
+    def post(self, request):
+        kinds = self.get_kinds()
+        kind = request.data.get('kind')
+        if kind is not None:
+            if kind not in kinds:
+                raise ValidationError({'kind': _("Choose one of: %s.") % ", ".join(kinds)})
+            kinds = [kind]
+        return self.get_links({
+            kind: calendar_feed.rotate_feed_token(kind, request.user.pk) for kind in kinds
+        })
+
+
+# ✅ iCalendar feed addressed by its token, for calendar apps to poll
+class CalendarFeedView(ConditionalGetMixin, APIView):
+    """
+    Serve a provider's or user's appointments as text/calendar.
+    The body is cached per feed version and the version is the ETag, so
+    polls between changes get a 304 without touching the database.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    renderer_classes = [ICalendarRenderer]
+
+    def get_feed_owner(self) -> tuple[str, int]:
+        owner = calendar_feed.read_feed_token(self.kwargs['token'])
+        if owner is None:
+            raise NotFound()
+        return owner
+
+    def get_conditional_validators(self, request):
+        kind, owner_id = self.get_feed_owner()
+        version, modified = calendar_feed.get_state(kind, owner_id)
+        return f"{kind}-{owner_id}-{version}", datetime.fromtimestamp(modified, tz=dt_timezone.utc)
+
+    @extend_schema(responses={(200, 'text/calendar'): OpenApiTypes.STR})
+    def get(self, request, token):
+        body = calendar_feed.get_feed(*self.get_feed_owner())
+        return HttpResponse(body, content_type='text/calendar; charset=utf-8')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from branches.services import catalog
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the branch and service catalog cache."
+
+    def handle(self, *args, **options):
+        for name, counters in catalog.stats().items():
+            self.stdout.write(
+                f"{name}: hits={counters['hits']} misses={counters['misses']} "
+                f"ratio={counters['ratio']:.2%} version={counters['version']}"
+            )
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated at'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated at'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0002_branch_updated_at_service_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='reminder_lead_minutes',
+            field=models.JSONField(blank=True, help_text='e.g. [1440, 120]. Leave blank to use the default. Empty list: no reminders.', null=True, verbose_name='Reminder lead times (minutes)'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='reminder_lead_minutes',
+            field=models.JSONField(blank=True, help_text='e.g. [1440, 120]. Leave blank to use the branch setting. Empty list: no reminders.', null=True, verbose_name='Reminder lead times (minutes)'),
+        ),
+    ]
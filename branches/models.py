@@ -26,6 +26,18 @@ class Branch(models.Model):
         verbose_name=_("Phone number")
     )
 
+    reminder_lead_minutes: Optional[list] = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name=_("Reminder lead times (minutes)"),
+        help_text=_("e.g. [1440, 120]. Leave blank to use the default. Empty list: no reminders.")
+    )
+
+    updated_at: models.DateTimeField = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Updated at")
+    )
+
     def __str__(self) -> str:
         return f"{self.name} - {self.location or 'No location'}"
 
@@ -56,5 +68,17 @@ class Service(models.Model):
         help_text=_("Enter the price in Toman, without decimals")
     )
 
+    reminder_lead_minutes: Optional[list] = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name=_("Reminder lead times (minutes)"),
+        help_text=_("e.g. [1440, 120]. Leave blank to use the branch setting. Empty list: no reminders.")
+    )
+
+    updated_at: models.DateTimeField = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Updated at")
+    )
+
     def __str__(self) -> str:
         return f"{self.name} - {self.duration_minutes} min"
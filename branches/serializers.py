@@ -1,9 +1,10 @@
 from rest_framework import serializers
+from Qtime.sparse_fields import SparseFieldsetMixin
 from .models import Branch, Service
 from django.utils.translation import gettext_lazy as _
 
 
-class BranchSerializer(serializers.ModelSerializer):
+class BranchSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for reading and writing Branch data.
     Only admin users should be allowed to create or update via views.
@@ -19,7 +20,7 @@ class BranchSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']  # id is auto-generated
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for services offered in branches.
     """
@@ -0,0 +1,110 @@
+from typing import Awaitable, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from Qtime import versioning
+
+CATALOGS = ('branches', 'services')
+
+
+def get_counter_key(catalog: str, outcome: str) -> str:
+    """
+    Construct cache key for a catalog's hit or miss counter.
+    """
+    return f"catalog:{catalog}:{outcome}"
+
+
+def get_version(catalog: str) -> int:
+    """
+    Current version of a catalog.
+    """
+    return versioning.get_version(f"catalog:{catalog}")
+
+
+def get_state(catalog: str) -> tuple[int, float]:
+    """
+    Version and last change time of a catalog.
+    """
+    return versioning.get_state(f"catalog:{catalog}")
+
+
+def bump_version(catalog: str) -> None:
+    """
+    Invalidate every cached entry of a catalog in O(1): entries are keyed by
+    version, so old ones are simply never read again and expire on their own.
+    """
+    versioning.bump_version(f"catalog:{catalog}")
+
+
+def _count(catalog: str, outcome: str) -> None:
+    key = get_counter_key(catalog, outcome)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def get_or_build(catalog: str, part: str, build: Callable[[], bytes]) -> bytes:
+    """
+    Read-through cache for rendered catalog responses.
+    ``part`` identifies the entry within the catalog (e.g. "list" or an id).
+    """
+    key = f"catalog:{catalog}:{get_version(catalog)}:{part}"
+    body = cache.get(key)
+    if body is not None:
+        _count(catalog, 'hits')
+        return body
+
+    _count(catalog, 'misses')
+    body = build()
+    cache.set(key, body, timeout=settings.CATALOG_CACHE_SECONDS)
+    return body
+
+
+async def _acount(catalog: str, outcome: str) -> None:
+    key = get_counter_key(catalog, outcome)
+    if not await cache.aadd(key, 1, timeout=None):
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, timeout=None)
+
+
+async def aget_or_build(catalog: str, part: str, build: Callable[[], Awaitable[bytes]]) -> bytes:
+    """
+    Async counterpart of ``get_or_build()``; ``build`` is a coroutine function.
+    """
+    key = f"catalog:{catalog}:{await versioning.aget_version(f'catalog:{catalog}')}:{part}"
+    body = await cache.aget(key)
+    if body is not None:
+        await _acount(catalog, 'hits')
+        return body
+
+    await _acount(catalog, 'misses')
+    body = await build()
+    await cache.aset(key, body, timeout=settings.CATALOG_CACHE_SECONDS)
+    return body
+
+
+def stats() -> dict:
+    """
+    Hit/miss counters and hit ratio per catalog.
+    """
+    counters = cache.get_many([
+        get_counter_key(catalog, outcome)
+        for catalog in CATALOGS
+        for outcome in ('hits', 'misses')
+    ])
+    result = {}
+    for catalog in CATALOGS:
+        hits = counters.get(get_counter_key(catalog, 'hits'), 0)
+        misses = counters.get(get_counter_key(catalog, 'misses'), 0)
+        result[catalog] = {
+            'hits': hits,
+            'misses': misses,
+            'ratio': hits / (hits + misses) if hits + misses else 0.0,
+            'version': get_version(catalog),
+        }
+    return result
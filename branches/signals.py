@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Branch, Service
+from .services import catalog
+
+
+# Bumped once the transaction commits, like calendar_feed.invalidate(): a
+# request in between would cache the old catalog under the new version.
+
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_branch_catalog(sender, **kwargs):
+    transaction.on_commit(lambda: catalog.bump_version('branches'))
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_service_catalog(sender, **kwargs):
+    transaction.on_commit(lambda: catalog.bump_version('services'))
@@ -1,3 +1,131 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from branches import views
+from branches.models import Branch, Service
+from branches.services import catalog
+from Qtime.query_budget import QueryBudgetTestMixin
+
+
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_waits_for_commit(self):
+        version = catalog.get_version('branches')
+        with self.captureOnCommitCallbacks(execute=True):
+            Branch.objects.create(name="Main")
+            self.assertEqual(catalog.get_version('branches'), version)
+        self.assertGreater(catalog.get_version('branches'), version)
+
+    def test_uncommitted_change_keeps_version(self):
+        version = catalog.get_version('services')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Service.objects.create(name="Cut", duration_minutes=30, price=1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(catalog.get_version('services'), version)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    async def build(self):
+        self.builds += 1
+        return f"body {self.builds}".encode()
+
+    async def test_aget_or_build_builds_once_per_version(self):
+        self.assertEqual(await catalog.aget_or_build('branches', 'list', self.build), b"body 1")
+        self.assertEqual(await catalog.aget_or_build('branches', 'list', self.build), b"body 1")
+        self.assertEqual(await catalog.aget_or_build('branches', 'detail:1', self.build), b"body 2")
+
+        await sync_to_async(catalog.bump_version)('branches')
+        self.assertEqual(await catalog.aget_or_build('branches', 'list', self.build), b"body 3")
+        stats = await sync_to_async(catalog.stats)()
+        self.assertEqual((stats['branches']['hits'], stats['branches']['misses']), (1, 3))
+
+    async def test_sync_and_async_share_entries(self):
+        body = await sync_to_async(catalog.get_or_build)('services', 'list', lambda: b"sync body")
+        self.assertEqual(await catalog.aget_or_build('services', 'list', self.build), body)
+        self.assertEqual(self.builds, 0)
+
+
+class AsyncDispatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Branch.objects.create(name="Main", location="x")
+
+    @override_settings(ASYNC_API_VIEWS=True)
+    async def test_asgi_runs_the_async_handler(self):
+        view = views.BranchViewSet.as_view({'get': 'list'})
+        self.assertTrue(iscoroutinefunction(view))
+
+        with mock.patch.object(views.BranchViewSet, 'list', side_effect=AssertionError("sync handler")):
+            response = await view(AsyncRequestFactory().get('/api/branches/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([branch['name'] for branch in json.loads(response.content)], ["Main"])
+
+    @override_settings(ASYNC_API_VIEWS=False)
+    def test_wsgi_runs_the_sync_handler(self):
+        view = views.BranchViewSet.as_view({'get': 'list'})
+        self.assertFalse(iscoroutinefunction(view))
+
+        with mock.patch.object(views.BranchViewSet, 'alist', side_effect=AssertionError("async handler")):
+            response = view(RequestFactory().get('/api/branches/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([branch['name'] for branch in json.loads(response.content)], ["Main"])
+
+
+class CatalogConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.branch = Branch.objects.create(name="Main", location="x")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(phone='09120000001'))
+
+    def test_matching_etag_is_304(self):
+        etag = self.client.get('/api/branches/')['ETag']
+
+        response = self.client.get('/api/branches/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_branch_update_changes_etag(self):
+        etag = self.client.get('/api/branches/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.branch.name = "Center"
+            self.branch.save()
+
+        response = self.client.get('/api/branches/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([branch['name'] for branch in response.json()], ["Center"])
+
+
+@override_settings(QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone='09120000001')
+
+    def seed_branches(self, count):
+        Branch.objects.bulk_create(Branch(name=f"Branch {n}", location="x") for n in range(count))
+
+    def seed_services(self, count):
+        Service.objects.bulk_create(Service(name=f"Service {n}", duration_minutes=30, price=1) for n in range(count))
+
+    def test_branches(self):
+        self.assertBudgetHolds(views.BranchViewSet, '/api/branches/', self.user, self.seed_branches)
+
+    def test_services(self):
+        self.assertBudgetHolds(views.ServiceViewSet, '/api/services/', self.user, self.seed_services)
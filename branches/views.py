@@ -1,10 +1,86 @@
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
 from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.viewsets import ModelViewSet
 from branches.models import Service, Branch
 from branches.serializers import ServiceSerializer, BranchSerializer
+from branches.services import catalog
+from Qtime.async_views import AsyncAPIViewMixin
+from Qtime.conditional import ConditionalGetMixin
+from Qtime.fast_serializers import get_fast_serializer
+from Qtime.renderers import FastJSONRenderer
+from Qtime.sparse_fields import requested_fields
+from Qtime.query_budget import QueryBudgetMixin
+
+
+class CachedCatalogMixin:
+    """
+    Serve list and retrieve from the versioned catalog cache as pre-rendered
+    JSON. Any save or delete of the model bumps the version (branches/signals.py).
+    The same version is the ETag, so unchanged catalogs answer 304 from the cache alone.
+    Under ASGI (with AsyncAPIViewMixin) reads are async and a cache miss is
+    built with the async ORM.
+    """
+    catalog_name: str = ''
+
+    def get_conditional_validators(self, request):
+        version, modified = catalog.get_state(self.catalog_name)
+        return f"{self.catalog_name}-{version}", datetime.fromtimestamp(modified, tz=timezone.utc)
+
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def _cached(self, part: str, build) -> HttpResponse:
+        body = catalog.get_or_build(self.catalog_name, part, lambda: FastJSONRenderer().render(build()))
+        return HttpResponse(body, content_type='application/json')
+
+    async def _acached(self, part: str, build) -> HttpResponse:
+        async def render():
+            return FastJSONRenderer().render(await build())
+
+        body = await catalog.aget_or_build(self.catalog_name, part, render)
+        return HttpResponse(body, content_type='application/json')
+
+    def _fields_part(self) -> str:
+        fields = requested_fields(self.request)
+        return f":fields={','.join(sorted(fields))}" if fields else ''
+
+    def _fast_serializer(self):
+        fields = requested_fields(self.request)
+        return get_fast_serializer(self.get_serializer_class(), frozenset(fields) if fields else None)
+
+    def list(self, request, *args, **kwargs):
+        fast = self._fast_serializer()
+        return self._cached(
+            f"list{self._fields_part()}",
+            lambda: fast.to_representation(fast.prepare(self.get_queryset()))
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        fast = self._fast_serializer()
+
+        async def build():
+            return fast.to_representation([row async for row in fast.prepare(self.get_queryset())])
+
+        return await self._acached(f"list{self._fields_part()}", build)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(
+            f"detail:{kwargs[self.lookup_field]}{self._fields_part()}",
+            lambda: self.get_serializer(self.get_object()).data
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        # get_object() runs the lookup and object permission checks synchronously.
+        return await self._acached(
+            f"detail:{kwargs[self.lookup_field]}{self._fields_part()}",
+            sync_to_async(lambda: self.get_serializer(self.get_object()).data)
+        )
 
 
-class ServiceViewSet(ModelViewSet):
+class ServiceViewSet(CachedCatalogMixin, ConditionalGetMixin, QueryBudgetMixin, AsyncAPIViewMixin, ModelViewSet):
     """
     ViewSet for managing services.
     - Admins can create, update, delete.
@@ -12,6 +88,8 @@ class ServiceViewSet(ModelViewSet):
     """
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
+    catalog_name = 'services'
+    query_budget = {'GET': 2}
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -19,7 +97,7 @@ class ServiceViewSet(ModelViewSet):
         return [IsAdminUser()]
 
 
-class BranchViewSet(ModelViewSet):
+class BranchViewSet(CachedCatalogMixin, ConditionalGetMixin, QueryBudgetMixin, AsyncAPIViewMixin, ModelViewSet):
     """
     ViewSet for managing branches.
     - Admins can create, update, delete.
@@ -27,8 +105,10 @@ class BranchViewSet(ModelViewSet):
     """
     queryset = Branch.objects.all()
     serializer_class = BranchSerializer
+    catalog_name = 'branches'
+    query_budget = {'GET': 2}
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [IsAuthenticatedOrReadOnly()]  # anyone can read
-        return [IsAdminUser()]  # only admin can write
\ No newline at end of file
+        return [IsAdminUser()]  # only admin can write
@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'user', 'status', 'attempts', 'available_at', 'delivered_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('user__phone',)
+    list_select_related = ('user',)
+    readonly_fields = ('delivered_channels', 'last_error', 'claim_token', 'claimed_until', 'created_at')
@@ -0,0 +1,12 @@
+import django_filters
+from .models import Notification
+
+
+class NotificationFilter(django_filters.FilterSet):
+    """
+    Filter for the notification inbox by read state.
+    """
+
+    class Meta:
+        model = Notification
+        fields = ['is_read']
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.services.outbox import dispatch_once
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued appointment notifications in batches. Runs until stopped, "
+        "polling when the outbox is empty; --once drains it and exits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATION_DISPATCH_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when nothing is due.")
+        parser.add_argument('--once', action='store_true', help="Exit once no event is due.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        totals = {'delivered': 0, 'retried': 0, 'failed': 0}
+        try:
+            while True:
+                result = dispatch_once(options['batch_size'])
+                for key in totals:
+                    totals[key] += getattr(result, key)
+                if result.claimed:
+                    self.stdout.write(
+                        f"Batch of {result.claimed}: {result.delivered} delivered, "
+                        f"{result.retried} to retry, {result.failed} failed."
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['delivered']} delivered, {totals['retried']} to retry, {totals['failed']} failed."
+        ))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from notifications.services.inbox import prune
+
+
+class Command(BaseCommand):
+    help = "Delete notifications older than the retention period, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--days must be at least 0 and --batch-size at least 1.")
+
+        before = timezone.now() - timedelta(days=options['days'])
+        deleted = prune(before, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} notification(s) sent before {before:%Y-%m-%d %H:%M}."))
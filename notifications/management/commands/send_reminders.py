@@ -0,0 +1,45 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications.services.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue appointment reminders as they fall due. Sweeps new appointments every "
+        "REMINDER_SWEEP_SECONDS and sleeps until the next reminder in between; "
+        "--once sweeps, queues what is due and exits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true')
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler()
+        sweep_every = timedelta(seconds=settings.REMINDER_SWEEP_SECONDS)
+        next_sweep = timezone.now()
+        try:
+            while True:
+                now = timezone.now()
+                if now >= next_sweep:
+                    swept = scheduler.sweep(now)
+                    next_sweep = now + sweep_every
+                    if swept.scheduled:
+                        self.stdout.write(
+                            f"Scheduled {swept.scheduled} reminder(s) for {swept.scanned} appointment(s); "
+                            f"{len(scheduler)} waiting."
+                        )
+                fired = scheduler.fire(now)
+                if fired.queued or fired.dropped:
+                    self.stdout.write(f"Queued {fired.queued} reminder(s), dropped {fired.dropped}.")
+                if options['once']:
+                    break
+
+                wake_at = min(filter(None, [next_sweep, scheduler.next_due()]))
+                time.sleep(max((wake_at - timezone.now()).total_seconds(), 0.1))
+        except KeyboardInterrupt:
+            pass
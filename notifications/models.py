@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from typing import Optional
 from django.utils.translation import gettext_lazy as _
 
@@ -28,8 +29,180 @@ class Notification(models.Model):
         verbose_name=_("Is read")
     )
 
+    class Meta:
+        indexes = [
+            # Inbox pages, newest first, in keyset order.
+            models.Index(fields=['user', 'sent_at', 'id'], name='notif_user_sent'),
+            # Unread lists and counter rebuilds, and "mark read up to" updates.
+            models.Index(fields=['user', 'is_read', 'sent_at'], name='notif_user_read_sent'),
+            # Retention pruning across all users.
+            models.Index(fields=['sent_at'], name='notif_sent'),
+        ]
+
     def __str__(self) -> str:
         """
         Return a string representation of the notification.
         """
         return f"Notification for {self.user} at {self.sent_at}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Appointment event waiting to be delivered to its user.
+    Written in the same transaction as the change it describes and delivered
+    later by the ``dispatch_notifications`` worker.
+    event_type, user, appointment_id, payload, dedup_key, status, attempts, delivered_channels
+    """
+    BOOKED = 'booked'
+    CANCELLED = 'cancelled'
+    CONFIRMED = 'confirmed'
+    REMINDER = 'reminder'
+    EVENT_TYPE_CHOICES = (
+        (BOOKED, _('Booked')),
+        (CANCELLED, _('Cancelled')),
+        (CONFIRMED, _('Confirmed')),
+        (REMINDER, _('Reminder')),
+    )
+
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DELIVERED = 'delivered'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (PROCESSING, _('Processing')),
+        (DELIVERED, _('Delivered')),
+        (FAILED, _('Failed')),
+    )
+
+    event_type: str = models.CharField(
+        max_length=20,
+        choices=EVENT_TYPE_CHOICES,
+        verbose_name=_("Event type")
+    )
+
+    user: 'models.ForeignKey' = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        verbose_name=_("User")
+    )
+
+    # Plain id: a cancelled appointment is deleted before its event is sent.
+    appointment_id: Optional[int] = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Appointment id")
+    )
+
+    payload: dict = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_("Payload")
+    )
+
+    # Events that must be queued at most once (e.g. one reminder per
+    # appointment and lead time) carry a key; the rest leave it null.
+    dedup_key: Optional[str] = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name=_("Deduplication key")
+    )
+
+    status: str = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name=_("Status")
+    )
+
+    attempts: int = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_("Attempts")
+    )
+
+    delivered_channels: list = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_("Delivered channels")
+    )
+
+    last_error: str = models.TextField(
+        blank=True,
+        verbose_name=_("Last error")
+    )
+
+    available_at: models.DateTimeField = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("Available at")
+    )
+
+    claim_token: str = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name=_("Claim token")
+    )
+
+    claimed_until: Optional[models.DateTimeField] = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Claimed until")
+    )
+
+    created_at: models.DateTimeField = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("Created at")
+    )
+
+    delivered_at: Optional[models.DateTimeField] = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Delivered at")
+    )
+
+    class Meta:
+        verbose_name = _("Outbox event")
+        verbose_name_plural = _("Outbox events")
+        indexes = [
+            # The dispatcher's claim query: due rows of one status, oldest first.
+            models.Index(fields=['status', 'available_at', 'id'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event_type} event for {self.user_id} ({self.status})"
+
+
+class ReminderWatermark(models.Model):
+    """
+    How far the reminder scheduler has swept (single row).
+    horizon: appointments starting up to here have been scheduled.
+    last_appointment_id: appointments up to this id have been seen.
+    slots_changed_at: slot changes up to here have been rescheduled.
+    """
+    horizon: models.DateTimeField = models.DateTimeField(
+        verbose_name=_("Horizon")
+    )
+
+    last_appointment_id: int = models.BigIntegerField(
+        default=0,
+        verbose_name=_("Last appointment id")
+    )
+
+    slots_changed_at: Optional[models.DateTimeField] = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Slots changed at")
+    )
+
+    updated_at: models.DateTimeField = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Updated at")
+    )
+
+    class Meta:
+        verbose_name = _("Reminder watermark")
+        verbose_name_plural = _("Reminder watermarks")
+
+    def __str__(self) -> str:
+        return f"Reminders scheduled up to {self.horizon} (appointment {self.last_appointment_id})"
@@ -0,0 +1,8 @@
+from Qtime.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    """
+    Pages of a user's notifications, newest first.
+    """
+    ordering = ('-sent_at', '-id')
@@ -0,0 +1,36 @@
+from rest_framework import serializers
+from Qtime.sparse_fields import SparseFieldsetMixin
+from django.conf import settings
+from .models import Notification
+
+
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Serializer for the user's notification inbox (read only).
+    """
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'message', 'sent_at', 'is_read']
+        read_only_fields = fields
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """
+    Which notifications to mark as read: the given ids, else everything
+    sent up to ``up_to`` (default: now).
+    """
+    up_to = serializers.DateTimeField(required=False)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=settings.API_MAX_PAGE_SIZE
+    )
+
+
+class UnreadCountSerializer(serializers.Serializer):
+    """
+    Unread notification count of the authenticated user.
+    """
+    unread = serializers.IntegerField()
@@ -0,0 +1,165 @@
+"""
+Unread counters, bulk mark-read and retention for the notification inbox.
+
+The unread count per user lives in the cache so the badge shown on every
+screen costs no query. It is built once from the (user, is_read, sent_at)
+index on a miss and from then on adjusted with atomic incr/decr: up when
+notifications are created, down when they are read or pruned unread. A
+counter that cannot be adjusted (expired or evicted) is simply rebuilt on
+the next read.
+
+Adjustments run after commit, so a rebuild can count a change whose
+adjustment is still to come. To tell, writes and rebuilds draw numbers
+from a per-user sequence: a write before its transaction commits, a rebuild
+after its COUNT. A delta is applied only to a counter built before the
+write; otherwise the counter may already include it and is dropped to be
+recounted.
+"""
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import Notification
+from Qtime import versioning
+
+
+def get_unread_cache_key(user_id: int) -> str:
+    """
+    Construct cache key for the unread notification count of a user.
+    """
+    return f"notifications:unread:{user_id}"
+
+
+def get_built_cache_key(user_id: int) -> str:
+    """
+    Construct cache key for the sequence number of the last counter rebuild of a user.
+    """
+    return f"notifications:unread:{user_id}:built"
+
+
+def get_sequence_cache_key(user_id: int) -> str:
+    """
+    Construct cache key for the change sequence of a user's counter.
+    """
+    return f"notifications:unread:{user_id}:sequence"
+
+
+def _next_sequence(user_id: int) -> int:
+    key = get_sequence_cache_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Seeded like a version, so an evicted sequence never goes back.
+        cache.add(key, versioning.new_version(), timeout=None)
+        return cache.incr(key)
+
+
+def unread_count(user_id: int) -> int:
+    """
+    Return the user's unread count, counting from the database on a miss.
+    """
+    key = get_unread_cache_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        # Stamped before it is stored, so an adjustment racing with the
+        # add() below always sees that a rebuild happened.
+        cache.set(get_built_cache_key(user_id), _next_sequence(user_id),
+                  timeout=settings.NOTIFICATION_UNREAD_CACHE_SECONDS)
+        # add(), not set(): an adjustment made meanwhile wins over our count.
+        cache.add(key, count, timeout=settings.NOTIFICATION_UNREAD_CACHE_SECONDS)
+        count = cache.get(key, count)
+    return max(count, 0)
+
+
+def _adjust(deltas: Counter, written: dict[int, int]) -> None:
+    for user_id, delta in deltas.items():
+        if not delta:
+            continue
+        key, built_key = get_unread_cache_key(user_id), get_built_cache_key(user_id)
+        built = cache.get(built_key)
+        if built is None or user_id not in written or built > written[user_id]:
+            # Built after the change was written: it may be counted already.
+            cache.delete(key)
+            continue
+        try:
+            if delta > 0:
+                cache.incr(key, delta)
+            else:
+                cache.decr(key, -delta)
+        except ValueError:
+            continue  # not cached; rebuilt on the next read
+        if cache.get(built_key) != built:
+            # Rebuilt while we adjusted; the new count may include the change twice.
+            cache.delete(key)
+
+
+def reserve_sequence(user_ids) -> dict[int, int]:
+    """
+    Sequence numbers for a change about to be written, for ``adjust_unread()``.
+    """
+    return {user_id: _next_sequence(user_id) for user_id in set(user_ids)}
+
+
+def adjust_unread(deltas: Counter, written: dict[int, int] | None = None) -> None:
+    """
+    Apply per-user unread deltas once the current transaction commits.
+
+    ``written`` holds sequence numbers drawn before the change became
+    visible: from ``reserve_sequence()`` before writing, or drawn here when
+    called inside the still open transaction. Outside one the change is
+    already committed, so the counters are dropped instead of adjusted.
+    """
+    deltas = Counter({user_id: delta for user_id, delta in deltas.items() if delta})
+    if written is None:
+        written = reserve_sequence(deltas) if transaction.get_connection().in_atomic_block else {}
+    transaction.on_commit(lambda: _adjust(deltas, written))
+
+
+def notifications_created(notifications) -> None:
+    """
+    Count new unread notifications; needed after bulk_create, which sends no signals.
+    """
+    adjust_unread(Counter(notification.user_id for notification in notifications if not notification.is_read))
+
+
+def mark_read(user_id: int, up_to: datetime | None = None, ids=None) -> int:
+    """
+    Mark the user's unread notifications sent up to ``up_to`` (or the given
+    ids) as read with a single UPDATE. Returns how many were marked.
+    """
+    queryset = Notification.objects.filter(user_id=user_id, is_read=False)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    else:
+        queryset = queryset.filter(sent_at__lte=up_to or timezone.now())
+    written = reserve_sequence([user_id])
+    marked = queryset.update(is_read=True)
+    adjust_unread(Counter({user_id: -marked}), written)
+    return marked
+
+
+def prune(before: datetime, batch_size: int = 1000) -> int:
+    """
+    Delete notifications sent before ``before``, one batch per transaction,
+    so no single statement locks or logs the whole backlog. Returns the
+    number deleted.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Notification.objects.filter(sent_at__lt=before)
+                .order_by('sent_at')
+                .values_list('pk', 'user_id', 'is_read')[:batch_size]
+            )
+            if not batch:
+                return deleted
+            Notification.objects.filter(pk__in=[pk for pk, user_id, is_read in batch]).delete()
+            unread = Counter(user_id for pk, user_id, is_read in batch if not is_read)
+            adjust_unread(Counter({user_id: -count for user_id, count in unread.items()}))
+        deleted += len(batch)
@@ -0,0 +1,217 @@
+"""
+Transactional outbox for appointment notifications.
+
+Booking, cancellation and confirmation write an OutboxEvent row inside the
+transaction of the change itself (``record``), so an event exists exactly
+when the change was committed and the request never waits on delivery.
+
+The ``dispatch_notifications`` worker claims due rows in batches with a
+conditional UPDATE (so concurrent workers never take the same row), fans
+each batch out to the configured channels and records the result. Failed
+events are retried with exponential backoff until NOTIFICATION_MAX_ATTEMPTS;
+a channel that already delivered an event is not repeated on retry. A
+worker that dies mid-batch loses its lease and the rows are claimed again.
+"""
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from accounts.services.sms import send_sms
+from notifications.models import Notification, OutboxEvent
+from notifications.services import inbox
+
+MESSAGE_MAX_LENGTH = 255
+
+
+def record(event_type: str, appointments) -> None:
+    """
+    Queue one event per appointment. Call it inside the transaction that
+    makes the change, before a cancelled appointment is deleted.
+    """
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(
+            event_type=event_type,
+            user_id=appointment.user_id,
+            appointment_id=appointment.pk,
+            payload={'available_time': appointment.available_time_id},
+        )
+        for appointment in appointments
+    ])
+
+
+def _due(now) -> Q:
+    return (
+        Q(status=OutboxEvent.PENDING, available_at__lte=now)
+        | Q(status=OutboxEvent.PROCESSING, claimed_until__lt=now)
+    )
+
+
+def claim(batch_size: int) -> list[OutboxEvent]:
+    """
+    Lease up to ``batch_size`` due events (oldest first) to this worker.
+    """
+    now = timezone.now()
+    candidates = list(
+        OutboxEvent.objects.filter(_due(now)).order_by('available_at', 'id').values_list('pk', flat=True)[:batch_size]
+    )
+    if not candidates:
+        return []
+
+    token = uuid.uuid4().hex
+    # Re-checking "due" in the UPDATE makes a row claimable by one worker only.
+    OutboxEvent.objects.filter(_due(now), pk__in=candidates).update(
+        status=OutboxEvent.PROCESSING,
+        claim_token=token,
+        claimed_until=now + timedelta(seconds=settings.NOTIFICATION_DISPATCH_LEASE_SECONDS),
+    )
+    return list(
+        OutboxEvent.objects.filter(claim_token=token, status=OutboxEvent.PROCESSING)
+        .select_related('user').order_by('available_at', 'id')
+    )
+
+
+MESSAGES = {
+    OutboxEvent.BOOKED: _("Your appointment for {service} at {branch} on {start} is booked."),
+    OutboxEvent.CANCELLED: _("Your appointment for {service} at {branch} on {start} was cancelled."),
+    OutboxEvent.CONFIRMED: _("Your appointment for {service} at {branch} on {start} is confirmed."),
+    OutboxEvent.REMINDER: _("Reminder: your appointment for {service} at {branch} is on {start}."),
+}
+
+
+def render_messages(events: list[OutboxEvent]) -> dict[int, str]:
+    """
+    Message text per event id; the slots behind the batch are read in one query.
+    """
+    from appointments.models import AvailableTime
+
+    slot_ids = {event.payload.get('available_time') for event in events}
+    slots = AvailableTime.objects.select_related('service', 'branch').in_bulk(
+        [slot_id for slot_id in slot_ids if slot_id is not None]
+    )
+
+    messages = {}
+    for event in events:
+        slot = slots.get(event.payload.get('available_time'))
+        text = str(MESSAGES[event.event_type]).format(
+            service=slot.service.name if slot else _("your service"),
+            branch=slot.branch.name if slot else _("our branch"),
+            start=timezone.localtime(slot.start_time).strftime('%Y-%m-%d %H:%M') if slot else _("the booked time"),
+        )
+        messages[event.pk] = text[:MESSAGE_MAX_LENGTH]
+    return messages
+
+
+def deliver_in_app(events: list[OutboxEvent], messages: dict[int, str]) -> dict[int, str]:
+    notifications = Notification.objects.bulk_create(
+        [Notification(user_id=event.user_id, message=messages[event.pk]) for event in events]
+    )
+    inbox.notifications_created(notifications)
+    return {}
+
+
+def deliver_sms(events: list[OutboxEvent], messages: dict[int, str]) -> dict[int, str]:
+    errors = {}
+    for event in events:
+        try:
+            send_sms(event.user.phone, messages[event.pk])
+        except Exception as exc:
+            errors[event.pk] = f"{type(exc).__name__}: {exc}"
+    return errors
+
+
+# Channel name -> callable(events, messages) returning {event id: error} for failures.
+CHANNELS = {
+    'in_app': deliver_in_app,
+    'sms': deliver_sms,
+}
+
+# Channels that only write to our own database: the write and the event's
+# delivered_channels are committed together, so they happen exactly once.
+TRANSACTIONAL_CHANNELS = {'in_app'}
+
+
+@dataclass
+class DispatchResult:
+    """
+    Outcome of one dispatched batch.
+    """
+    claimed: int = 0
+    delivered: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.NOTIFICATION_RETRY_MAX_SECONDS))
+
+
+def dispatch(events: list[OutboxEvent]) -> DispatchResult:
+    """
+    Deliver a claimed batch through every configured channel and record the
+    outcome of each event.
+    """
+    result = DispatchResult(claimed=len(events))
+    if not events:
+        return result
+
+    messages = render_messages(events)
+    errors: dict[int, list[str]] = {}
+    for name in settings.NOTIFICATION_CHANNELS:
+        pending = [event for event in events if name not in event.delivered_channels]
+        if not pending:
+            continue
+        with transaction.atomic() if name in TRANSACTIONAL_CHANNELS else nullcontext():
+            try:
+                failures = CHANNELS[name](pending, messages)
+            except Exception as exc:
+                failures = {event.pk: f"{type(exc).__name__}: {exc}" for event in pending}
+            delivered = [event for event in pending if event.pk not in failures]
+            for event in delivered:
+                event.delivered_channels.append(name)
+            OutboxEvent.objects.bulk_update(delivered, ['delivered_channels'])
+        for event_id, error in failures.items():
+            errors.setdefault(event_id, []).append(f"{name}: {error}")
+
+    now = timezone.now()
+    done = [event.pk for event in events if event.pk not in errors]
+    if done:
+        # Filtering on the claim token skips rows whose lease ran out and
+        # were claimed by another worker meanwhile.
+        result.delivered = OutboxEvent.objects.filter(pk__in=done, claim_token=events[0].claim_token).update(
+            status=OutboxEvent.DELIVERED, delivered_at=now, claimed_until=None, last_error=''
+        )
+
+    for event in events:
+        if event.pk not in errors:
+            continue
+        attempts = event.attempts + 1
+        given_up = attempts >= settings.NOTIFICATION_MAX_ATTEMPTS
+        recorded = OutboxEvent.objects.filter(pk=event.pk, claim_token=event.claim_token).update(
+            status=OutboxEvent.FAILED if given_up else OutboxEvent.PENDING,
+            attempts=attempts,
+            available_at=now if given_up else now + retry_delay(attempts),
+            claimed_until=None,
+            last_error='\n'.join(errors[event.pk]),
+        )
+        if not recorded:
+            continue
+        if given_up:
+            result.failed += 1
+        else:
+            result.retried += 1
+    return result
+
+
+def dispatch_once(batch_size: int | None = None) -> DispatchResult:
+    """
+    Claim and dispatch one batch.
+    """
+    return dispatch(claim(batch_size or settings.NOTIFICATION_DISPATCH_BATCH_SIZE))
@@ -0,0 +1,252 @@
+"""
+Appointment reminders ("your appointment is in 2 hours").
+
+Lead times come from the appointment's service, else its branch, else
+APPOINTMENT_REMINDER_LEAD_MINUTES. Instead of scanning every appointment on
+each tick, ReminderScheduler sweeps forward from a stored watermark
+(ReminderWatermark):
+
+- appointments whose start time newly entered the horizon
+  (now + longest lead + REMINDER_LOOKAHEAD_SECONDS),
+- appointments created since the last sweep that start inside the horizon
+  swept already, and
+- appointments whose slot changed (AvailableTime.updated_at) since the
+  last sweep; their waiting reminders are replaced, so a slot moved earlier
+  is reminded of on time rather than when the old reminder falls due,
+
+so each sweep reads only rows new or changed since the last one. Their
+reminders wait in an in-memory heap ordered by due time and are popped as
+they fall due. On process start the heap is rebuilt from the current
+horizon window only.
+
+Due reminders are re-checked against the database (cancelled appointments
+and slots moved after the last sweep are dropped or rescheduled) and
+queued in the notification outbox with a per appointment and lead time
+key, so they are queued at most once even across restarts or concurrent
+schedulers. The outbox worker
+delivers them as Notification rows (and SMS).
+"""
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from appointments.models import Appointment, AvailableTime
+from notifications.models import OutboxEvent, ReminderWatermark
+
+
+def lead_times(service_leads, branch_leads) -> list[int]:
+    """
+    Effective lead times in minutes: the service's, else the branch's, else the default.
+    """
+    for leads in (service_leads, branch_leads):
+        if leads is not None:
+            return sorted({int(minutes) for minutes in leads if int(minutes) > 0})
+    return sorted(set(settings.APPOINTMENT_REMINDER_LEAD_MINUTES))
+
+
+def max_lead() -> timedelta:
+    """
+    Upper bound on any configured lead time, which sets the sweep horizon.
+    """
+    from branches.models import Branch, Service
+
+    longest = max(settings.APPOINTMENT_REMINDER_LEAD_MINUTES, default=0)
+    for model in (Service, Branch):
+        for leads in model.objects.filter(reminder_lead_minutes__isnull=False).values_list('reminder_lead_minutes', flat=True):
+            longest = max([longest, *(int(minutes) for minutes in leads)])
+    return timedelta(minutes=longest)
+
+
+def get_dedup_key(appointment_id: int, lead_minutes: int) -> str:
+    return f"reminder:{appointment_id}:{lead_minutes}"
+
+
+@dataclass(order=True, frozen=True)
+class Reminder:
+    due_at: datetime
+    appointment_id: int
+    lead_minutes: int
+    start_time: datetime
+
+
+@dataclass
+class SweepResult:
+    """
+    Outcome of one sweep or fire step.
+    """
+    scanned: int = 0
+    scheduled: int = 0
+    queued: int = 0
+    dropped: int = 0
+
+
+REMINDER_COLUMNS = (
+    'pk',
+    'available_time__start_time',
+    'available_time__service__reminder_lead_minutes',
+    'available_time__branch__reminder_lead_minutes',
+)
+
+
+class ReminderScheduler:
+    """
+    Watermark sweep feeding an in-memory heap of due reminders.
+    One instance per worker process.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[Reminder] = []
+        self._recovered = False
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def next_due(self) -> datetime | None:
+        return self._heap[0].due_at if self._heap else None
+
+    def sweep(self, now: datetime | None = None) -> SweepResult:
+        """
+        Schedule the reminders of appointments not seen before and
+        reschedule those whose slot changed.
+        """
+        now = now or timezone.now()
+        result = SweepResult()
+        horizon = now + max_lead() + timedelta(seconds=settings.REMINDER_LOOKAHEAD_SECONDS)
+        max_id = Appointment.objects.aggregate(max_id=Max('pk'))['max_id'] or 0
+        changed_until = AvailableTime.objects.aggregate(changed_until=Max('updated_at'))['changed_until']
+        watermark = ReminderWatermark.objects.filter(pk=1).first()
+
+        if watermark is None:
+            swept_until, last_id = now, max_id
+            window = Appointment.objects.filter(available_time__start_time__gt=now)
+        else:
+            swept_until = max(watermark.horizon, now)
+            # After a restart the heap is empty: reload everything inside the
+            # horizon already swept, not only appointments created since.
+            last_id = 0 if not self._recovered else watermark.last_appointment_id
+            window = Appointment.objects.filter(available_time__start_time__gt=swept_until)
+
+        batches = [
+            # Start time newly inside the horizon.
+            window.filter(pk__lte=max_id, available_time__start_time__lte=horizon),
+            # Created since the last sweep, starting inside the old horizon.
+            Appointment.objects.filter(
+                pk__gt=last_id,
+                pk__lte=max_id,
+                available_time__start_time__gt=now,
+                available_time__start_time__lte=swept_until,
+            ),
+        ]
+        changed = None
+        if self._recovered and watermark.slots_changed_at is not None and changed_until is not None:
+            # Slot saved since the last sweep. The overlap catches changes
+            # committed late with an earlier updated_at; redoing one is harmless.
+            changed = Appointment.objects.filter(
+                pk__lte=max_id,
+                available_time__start_time__gt=now,
+                available_time__updated_at__gt=watermark.slots_changed_at - timedelta(seconds=settings.REMINDER_SWEEP_SECONDS),
+                available_time__updated_at__lte=changed_until,
+            )
+            batches.append(changed)
+
+        rows, changed_ids = {}, set()
+        for queryset in batches:
+            for row in queryset.values_list(*REMINDER_COLUMNS).iterator(chunk_size=2000):
+                if queryset is changed:
+                    changed_ids.add(row[0])
+                    if row[1] > horizon:
+                        # Picked up again once its start enters the horizon.
+                        continue
+                rows[row[0]] = row
+
+        if changed_ids:
+            # Replace what is waiting for those appointments with their current start.
+            self._heap = [reminder for reminder in self._heap if reminder.appointment_id not in changed_ids]
+            heapq.heapify(self._heap)
+
+        for appointment_id, start_time, service_leads, branch_leads in rows.values():
+            result.scanned += 1
+            for lead in lead_times(service_leads, branch_leads):
+                if self._push(Reminder(start_time - timedelta(minutes=lead), appointment_id, lead, start_time), now):
+                    result.scheduled += 1
+
+        if watermark is None:
+            watermark = ReminderWatermark(pk=1)
+        watermark.horizon, watermark.last_appointment_id = max(horizon, swept_until), max_id
+        watermark.slots_changed_at = changed_until or watermark.slots_changed_at
+        watermark.save()
+        self._recovered = True
+        return result
+
+    @staticmethod
+    def _is_timely(reminder: Reminder, now: datetime) -> bool:
+        # Leads that were already over when the appointment was seen (e.g. a
+        # 24h reminder for a booking made an hour ahead) are skipped.
+        return reminder.due_at >= now - timedelta(seconds=settings.REMINDER_GRACE_SECONDS)
+
+    def _push(self, reminder: Reminder, now: datetime) -> bool:
+        if not self._is_timely(reminder, now):
+            return False
+        heapq.heappush(self._heap, reminder)
+        return True
+
+    def fire(self, now: datetime | None = None) -> SweepResult:
+        """
+        Queue every reminder due by ``now`` in the notification outbox.
+        """
+        now = now or timezone.now()
+        result = SweepResult()
+        due = []
+        while self._heap and self._heap[0].due_at <= now:
+            due.append(heapq.heappop(self._heap))
+        if not due:
+            return result
+
+        current = {
+            appointment_id: (user_id, slot_id, start_time)
+            for appointment_id, user_id, slot_id, start_time in Appointment.objects.filter(
+                pk__in={reminder.appointment_id for reminder in due}
+            ).values_list('pk', 'user_id', 'available_time_id', 'available_time__start_time')
+        }
+
+        events, keys = [], set()
+        for reminder in due:
+            if reminder.appointment_id not in current:
+                result.dropped += 1  # cancelled
+                continue
+            user_id, slot_id, start_time = current[reminder.appointment_id]
+            if start_time != reminder.start_time:
+                # The slot moved; go by its new start time.
+                moved = Reminder(start_time - timedelta(minutes=reminder.lead_minutes), reminder.appointment_id,
+                                 reminder.lead_minutes, start_time)
+                if moved.due_at > now:
+                    self._push(moved, now)
+                    continue
+                if start_time <= now or not self._is_timely(moved, now):
+                    result.dropped += 1
+                    continue
+            key = get_dedup_key(reminder.appointment_id, reminder.lead_minutes)
+            if key in keys:
+                continue
+            keys.add(key)
+            events.append(OutboxEvent(
+                event_type=OutboxEvent.REMINDER,
+                user_id=user_id,
+                appointment_id=reminder.appointment_id,
+                payload={'available_time': slot_id, 'lead_minutes': reminder.lead_minutes},
+                dedup_key=key,
+            ))
+
+        if not events:
+            return result
+        # The unique dedup key turns a second queueing into a no-op.
+        # bulk_create(ignore_conflicts=True) does not report skipped rows; count instead.
+        queued = OutboxEvent.objects.filter(dedup_key__in=keys)
+        before = queued.count()
+        OutboxEvent.objects.bulk_create(events, ignore_conflicts=True)
+        result.queued = queued.count() - before
+        return result
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .services import inbox
+
+
+@receiver(post_save, sender='notifications.Notification')
+def count_unread_on_create(sender, instance, created, **kwargs):
+    if created:
+        inbox.notifications_created([instance])
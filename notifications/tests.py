@@ -1,3 +1,223 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.services import sms
+from appointments.models import AvailableTime
+from appointments.services.booking import booking_engine
+from branches.models import Branch, Service
+from notifications import views
+from notifications.models import Notification, OutboxEvent
+from notifications.services import inbox, outbox
+from notifications.services.reminders import ReminderScheduler
+from Qtime.query_budget import QueryBudgetTestMixin
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(phone='09120000001')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, count=1):
+        notifications = Notification.objects.bulk_create(Notification(user=self.user, message="Hi") for _ in range(count))
+        inbox.notifications_created(notifications)
+        return notifications
+
+    def test_counter_follows_creates_and_reads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(2)
+        self.assertEqual(inbox.unread_count(self.user.pk), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.notify()[0]
+        with self.assertNumQueries(0):
+            self.assertEqual(inbox.unread_count(self.user.pk), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inbox.mark_read(self.user.pk, ids=[first.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(inbox.unread_count(self.user.pk), 2)
+
+    def test_create_counted_by_a_rebuild_is_not_added_twice(self):
+        self.assertEqual(inbox.unread_count(self.user.pk), 0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.notify()
+        # Rebuilt after the commit, before the increment ran.
+        cache.delete(inbox.get_unread_cache_key(self.user.pk))
+        self.assertEqual(inbox.unread_count(self.user.pk), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(inbox.unread_count(self.user.pk), 1)
+
+    def test_read_counted_by_a_rebuild_is_not_subtracted_twice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            read = [notification.pk for notification in self.notify(2)]
+            self.notify()
+        self.assertEqual(inbox.unread_count(self.user.pk), 3)
+        with self.captureOnCommitCallbacks() as callbacks:
+            inbox.mark_read(self.user.pk, ids=read)
+        cache.delete(inbox.get_unread_cache_key(self.user.pk))
+        self.assertEqual(inbox.unread_count(self.user.pk), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(inbox.unread_count(self.user.pk), 1)
+
+    def test_mark_read_endpoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, *rest = self.notify(3)
+        self.assertEqual(inbox.unread_count(self.user.pk), 3)
+
+        # The counter is adjusted on commit, which the test transaction defers
+        # past the response, so the count is checked after each request.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/notifications/mark-read/', {'ids': [first.pk]}, format='json')
+        self.assertEqual(response.json()['marked'], 1)
+        self.assertEqual(self.client.get('/api/notifications/unread-count/').json(), {'unread': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/notifications/mark-read/', {}, format='json')
+        self.assertEqual(response.json()['marked'], 2)
+        self.assertEqual(self.client.get('/api/notifications/unread-count/').json(), {'unread': 0})
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+
+@override_settings(
+    SMS_BACKEND='accounts.services.sms.LocMemBackend',
+    NOTIFICATION_CHANNELS=('in_app', 'sms'),
+    NOTIFICATION_MAX_ATTEMPTS=3,
+    NOTIFICATION_RETRY_BASE_SECONDS=30,
+    NOTIFICATION_RETRY_MAX_SECONDS=45,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        sms.get_backend.cache_clear()
+        self.addCleanup(sms.get_backend.cache_clear)
+        sms.LocMemBackend.outbox, sms.LocMemBackend.failures = [], 0
+        self.user = User.objects.create_user(phone='09120000001')
+        self.event = OutboxEvent.objects.create(event_type=OutboxEvent.BOOKED, user=self.user)
+
+    def expire(self, **fields):
+        OutboxEvent.objects.filter(pk=self.event.pk).update(**fields)
+
+    def test_claim_is_exclusive(self):
+        self.assertEqual([event.pk for event in outbox.claim(10)], [self.event.pk])
+        self.assertEqual(outbox.claim(10), [])
+
+    def test_expired_lease_is_delivered_again(self):
+        stale = outbox.claim(10)
+        self.expire(claimed_until=timezone.now() - timedelta(seconds=1))
+        fresh = outbox.claim(10)
+        self.assertEqual([event.pk for event in fresh], [self.event.pk])
+
+        # At least once: the worker that lost its lease still sends, but only
+        # the current holder records the outcome.
+        self.assertEqual(outbox.dispatch(stale).delivered, 0)
+        self.assertEqual(outbox.dispatch(fresh).delivered, 1)
+        self.assertEqual(len(sms.LocMemBackend.outbox), 2)
+        self.assertEqual(OutboxEvent.objects.get().status, OutboxEvent.DELIVERED)
+
+    def test_failed_channel_is_retried_with_backoff(self):
+        sms.LocMemBackend.failures = 1
+        before = timezone.now()
+        self.assertEqual(outbox.dispatch_once().retried, 1)
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.status, event.attempts, event.delivered_channels), (OutboxEvent.PENDING, 1, ['in_app']))
+        self.assertGreaterEqual(event.available_at, before + timedelta(seconds=30))
+        self.assertIn('TransientSMSError', event.last_error)
+        self.assertEqual(outbox.claim(10), [])
+
+        self.expire(available_at=timezone.now())
+        self.assertEqual(outbox.dispatch_once().delivered, 1)
+        # The in-app channel already delivered and is not repeated.
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(len(sms.LocMemBackend.outbox), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        sms.LocMemBackend.failures = 10
+        for _ in range(3):
+            self.expire(available_at=timezone.now())
+            outbox.dispatch_once()
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.FAILED, 3))
+        self.assertEqual(outbox.claim(10), [])
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertEqual([outbox.retry_delay(n).total_seconds() for n in (1, 2, 3)], [30, 45, 45])
+
+
+@override_settings(APPOINTMENT_REMINDER_LEAD_MINUTES=(120,), REMINDER_LOOKAHEAD_SECONDS=5 * 60)
+class ReminderTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now().replace(microsecond=0)
+        self.slot = AvailableTime.objects.create(
+            provider=User.objects.create_user(phone='09120000100', role='provider'),
+            service=Service.objects.create(name="Cut", duration_minutes=30, price=1),
+            branch=Branch.objects.create(name="Main"),
+            start_time=self.at(124), duration_minutes=30,
+        )
+        booking_engine.book(User.objects.create_user(phone='09120000001'), self.slot.pk)
+        self.scheduler = ReminderScheduler()
+        self.scheduler.sweep(self.now)
+        self.assertEqual(self.scheduler.next_due(), self.at(4))
+
+    def at(self, minutes):
+        return self.now + timedelta(minutes=minutes)
+
+    def move(self, minutes):
+        self.slot.refresh_from_db()
+        self.slot.start_time = self.at(minutes)
+        self.slot.save()
+
+    def test_slot_moved_earlier_is_rescheduled_on_next_sweep(self):
+        self.move(121)
+        self.scheduler.sweep(self.at(0.5))
+
+        self.assertEqual((len(self.scheduler), self.scheduler.next_due()), (1, self.at(1)))
+        self.assertEqual(self.scheduler.fire(self.at(1)).queued, 1)
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_slot_moved_past_the_horizon_waits_for_it(self):
+        self.move(150)
+        self.scheduler.sweep(self.at(0.5))
+
+        self.assertEqual(len(self.scheduler), 0)
+        self.scheduler.sweep(self.at(26))
+        self.assertEqual(self.scheduler.next_due(), self.at(30))
+        self.assertEqual(self.scheduler.fire(self.at(30)).queued, 1)
+
+    def test_reminder_queued_elsewhere_is_not_counted(self):
+        self.assertEqual(self.scheduler.fire(self.at(4)).queued, 1)
+
+        # A restarted scheduler sees the same reminder again.
+        restarted = ReminderScheduler()
+        restarted.sweep(self.at(4))
+        self.assertEqual(restarted.fire(self.at(4)).queued, 0)
+        self.assertEqual(OutboxEvent.objects.filter(event_type=OutboxEvent.REMINDER).count(), 1)
+
+
+@override_settings(QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(phone='09120000001')
+
+    def seed(self, count):
+        Notification.objects.bulk_create(Notification(user=self.user, message="Hi") for _ in range(count))
+
+    def test_list(self):
+        self.assertBudgetHolds(views.NotificationListView, '/api/notifications/', self.user, self.seed)
+
+    def test_list_unread(self):
+        self.assertBudgetHolds(
+            views.NotificationListView, '/api/notifications/', self.user, self.seed, {'is_read': 'false'}
+        )
+
+    def test_unread_count(self):
+        self.assertBudgetHolds(views.UnreadCountView, '/api/notifications/unread-count/', self.user, self.seed)
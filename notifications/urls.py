@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('notifications/', views.NotificationListView.as_view(), name='notifications'),
+    path('notifications/unread-count/', views.UnreadCountView.as_view(), name='notifications-unread-count'),
+    path('notifications/mark-read/', views.MarkReadView.as_view(), name='notifications-mark-read'),
+]
@@ -1,3 +1,64 @@
-from django.shortcuts import render
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from Qtime.fast_serializers import FastListMixin
+from Qtime.query_budget import QueryBudgetMixin
+from .filters import NotificationFilter
+from .models import Notification
+from .pagination import NotificationPagination
+from .serializers import MarkReadSerializer, NotificationSerializer, UnreadCountSerializer
+from .services import inbox
+
+
+# ✅ Users page through their own notifications, newest first
+class NotificationListView(QueryBudgetMixin, FastListMixin, generics.ListAPIView):
+    """
+    List the authenticated user's notifications with keyset pagination over
+    (sent_at, id); filter with ``?is_read=false`` for unread ones.
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = NotificationFilter
+    pagination_class = NotificationPagination
+    query_budget = {'GET': 2}
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user)
+
+
+# ✅ Badge count of unread notifications, served from the cache
+class UnreadCountView(QueryBudgetMixin, APIView):
+    """
+    Return ``{"unread": n}`` for the authenticated user.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'GET': 2}
+
+    @extend_schema(responses=UnreadCountSerializer)
+    def get(self, request):
+        return Response({'unread': inbox.unread_count(request.user.pk)})
+
+
+# ✅ Mark notifications read in one UPDATE
+class MarkReadView(generics.GenericAPIView):
+    """
+    Mark the given ids, or everything sent up to ``up_to`` (default: now),
+    as read. Returns how many were marked and the new unread count.
+    """
+    serializer_class = MarkReadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        marked = inbox.mark_read(
+            request.user.pk,
+            up_to=serializer.validated_data.get('up_to'),
+            ids=serializer.validated_data.get('ids'),
+        )
+        return Response({'marked': marked, 'unread': inbox.unread_count(request.user.pk)})